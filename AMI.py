@@ -1,10 +1,10 @@
 # app.py
 import streamlit as st
-import pandas as pd
-import os
-import uuid
 from datetime import datetime
 
+from vigior_engine import get_engine
+from vigior_models import get_model
+
 # -------------------------
 # CONFIG / INIT
 # -------------------------
@@ -13,19 +13,12 @@ st.set_page_config(page_title="VIGIOR-H", layout="wide")
 if "page" not in st.session_state:
     st.session_state.page = "Home"
 
-PATIENTS_CSV = "patients.csv"
+ENGINE = get_engine()
+REGISTRY = ENGINE.store("humerus")  # partition patients.csv
 
 # Load or initialize patients dataframe
-if "patients" not in st.session_state:
-    if os.path.exists(PATIENTS_CSV):
-        st.session_state.patients = pd.read_csv(PATIENTS_CSV)
-    else:
-        st.session_state.patients = pd.DataFrame(columns=[
-            "ID", "Date", "Age", "Tabac", "Comorbidities", "BoneQuality",
-            "Fragments", "HSA", "Gap", "Tuberosities_Irreparable",
-            "S_AVN", "S_PSEU", "S_FAIL_FIX", "S_SURG",
-            "Treatment", "Justification"
-        ])
+# Registre partagé par toutes les sessions du processus (lecture seule, copie sur écriture)
+st.session_state.patients = ENGINE.frame("humerus")
 
 # -------------------------
 # RESEARCH REFERENCES (ENREGISTRÉES)
@@ -58,65 +51,22 @@ RESEARCH_REFS = [
 # UTILS
 # -------------------------
 def generate_patient_id():
-    return f"H-{str(uuid.uuid4())[:8].upper()}"
+    return ENGINE.next_id("humerus")
 
-def save_patients():
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+def save_patients(row=None):
+    # Nouvelle évaluation : un seul enregistrement ajouté ; sinon réécriture complète
+    if row is not None:
+        ENGINE.append("humerus", row)
+    else:
+        ENGINE.write_snapshot("humerus", st.session_state.patients)
+    st.session_state.patients = ENGINE.frame("humerus")
 
 # -------------------------
 # SCORE CALCULS (FORMULES)
 # -------------------------
-def compute_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities, tuberosities_irreparable):
-    """
-    Retourne S_AVN, S_PSEU, S_FAIL_FIX, S_SURG (tous arrondis à 1 décimale)
-    Formules décrites dans la spécification du projet (poids inspirés des méta-analyses / PHARON).
-    """
-    # Binary indicators
-    I_age_gt_65 = 1 if age > 65 else 0
-    I_age_gt_70 = 1 if age > 70 else 0
-    I_tabac = 1 if tabac else 0
-    I_bone_poor = 1 if bone_quality == "poor" else 0
-    I_comorb = 1 if comorbidities >= 1 else 0
-    # S_AVN: probabilité relative de nécrose
-    S_AVN = 10
-    S_AVN += 6 * I_age_gt_65
-    S_AVN += 7 * I_tabac
-    S_AVN += 3 * fragments
-    # HSA effect: lower HSA (below 130) increases risk; if HSA>130 effect negative
-    # We use (130 - HSA) so positive when HSA < 130, negative otherwise
-    S_AVN += 0.3 * (130 - HSA)
-    S_AVN += 1.5 * gap
-    S_AVN += 10 * I_bone_poor
-    # Tuberosities irreparable increases chance arthroplastie, add to AVN as surrogate risk
-    if tuberosities_irreparable:
-        S_AVN += 6
-
-    # S_PSEU: pseudarthrose / non-union risk
-    S_PSEU = 8
-    S_PSEU += 2 * fragments
-    S_PSEU += 2 * gap
-    S_PSEU += 4 * I_age_gt_70
-    S_PSEU += 5 * I_tabac
-    S_PSEU += 8 * I_bone_poor
-
-    # S_FAIL_FIX: risque d'échec de fixation / perte de réduction
-    S_FAIL_FIX = 5
-    S_FAIL_FIX += 4 * I_bone_poor
-    S_FAIL_FIX += 3 * fragments
-    S_FAIL_FIX += 2 * I_comorb
-    S_FAIL_FIX += 1.5 * gap
-
-    # Composite surgical score (pondération)
-    S_SURG = 0.4 * S_AVN + 0.35 * S_PSEU + 0.25 * S_FAIL_FIX
-
-    # Clip to reasonable bounds (0..100)
-    for varname in ["S_AVN", "S_PSEU", "S_FAIL_FIX", "S_SURG"]:
-        val = locals()[varname]
-        if val < 0: val = 0
-        if val > 100: val = 100
-        locals()[varname] = round(val, 1)
-
-    return round(S_AVN,1), round(S_PSEU,1), round(S_FAIL_FIX,1), round(S_SURG,1)
+# Modèle "vigior_h_ami" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("vigior_h_ami")
+compute_scores = SCORING_MODEL.scalar
 
 # -------------------------
 # DECISION RULES (propose_treatment)
@@ -283,8 +233,7 @@ def page_new_patient():
             "Treatment": treatment,
             "Justification": justification
         }
-        st.session_state.patients = pd.concat([st.session_state.patients, pd.DataFrame([new_row])], ignore_index=True)
-        save_patients()
+        save_patients(new_row)
         st.success(f"Patient enregistré : **{patient_id}**")
 
     if st.button("⬅️ Retour Home", use_container_width=True):
@@ -294,9 +243,8 @@ def page_research():
     st.title("📚 Research & Patients")
     st.subheader("Patients enregistrés")
     query = st.text_input("🔎 Rechercher (ID, âge, traitement…)", "")
-    df = st.session_state.patients.copy()
-    if query:
-        df = df[df.apply(lambda row: query.lower() in row.astype(str).str.lower().to_string(), axis=1)]
+    # Filtre délégué au registre (requête SQL indexée avec le backend SQLite)
+    df = REGISTRY.search(query) if query else st.session_state.patients
     st.dataframe(df, height=300)
 
     st.markdown("---")
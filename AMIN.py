@@ -1,16 +1,16 @@
 # app_final.py
 import streamlit as st
-import pandas as pd
-import os
-import uuid
 from datetime import datetime
 
+from vigior_engine import get_engine
+from vigior_models import get_model
+
 st.set_page_config(page_title="VIGIOR-H", layout="wide")
 
 # -----------------------
 # Constants / Files
 # -----------------------
-PATIENTS_CSV = "patients.csv"
+ENGINE = get_engine()
 
 RESEARCH_REFS = [
     {"title": "PHARON model (Goudie et al.) - predictors of nonunion/complications in PHF", "citation": "Goudie EB et al., JBJS, 2021"},
@@ -26,71 +26,26 @@ RESEARCH_REFS = [
 if "page" not in st.session_state:
     st.session_state.page = "Home"
 
-if "patients" not in st.session_state:
-    if os.path.exists(PATIENTS_CSV):
-        st.session_state.patients = pd.read_csv(PATIENTS_CSV)
-    else:
-        st.session_state.patients = pd.DataFrame(columns=[
-            "ID","Date","Age","Tabac","Comorbidities","BoneQuality",
-            "Fragments","HSA","Gap","S_AVN","S_PSEU","S_FAIL_FIX","S_SURG",
-            "Treatment","Justification"
-        ])
+# Registre partagé par toutes les sessions du processus (lecture seule, copie sur écriture)
+st.session_state.patients = ENGINE.frame("humerus")
 
-def save_patients():
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+def save_patients(row=None):
+    # Nouvelle évaluation : un seul enregistrement ajouté ; sinon réécriture complète
+    if row is not None:
+        ENGINE.append("humerus", row)
+    else:
+        ENGINE.write_snapshot("humerus", st.session_state.patients)
+    st.session_state.patients = ENGINE.frame("humerus")
 
 def generate_patient_id():
-    return f"H-{str(uuid.uuid4())[:8].upper()}"
+    return ENGINE.next_id("humerus")
 
 # -----------------------
 # Scoring functions (detailed formulas)
 # -----------------------
-def compute_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities):
-    """
-    Retourne S_AVN, S_PSEU, S_FAIL_FIX, S_SURG
-    Formules calibrées sur nos approximations basées sur PHARON / méta-analyses.
-    """
-    # Binary indicators
-    I_age_gt_65 = 1 if age > 65 else 0
-    I_age_gt_70 = 1 if age > 70 else 0
-    I_tabac = 1 if tabac else 0
-    I_bone_poor = 1 if bone_quality == "poor" else 0
-    I_comorb = 1 if comorbidities >= 1 else 0
-
-    # --- S_AVN ---
-    S_AVN = 10
-    S_AVN += 6 * I_age_gt_65
-    S_AVN += 7 * I_tabac
-    S_AVN += 3 * fragments
-    S_AVN += 0.3 * (130 - HSA)    # if HSA <130 increases risk; if HSA>130 decreases
-    S_AVN += 1.5 * gap
-    S_AVN += 10 * I_bone_poor
-
-    # --- S_PSEU ---
-    S_PSEU = 8
-    S_PSEU += 2 * fragments
-    S_PSEU += 2 * gap
-    S_PSEU += 4 * I_age_gt_70
-    S_PSEU += 5 * I_tabac
-    S_PSEU += 8 * I_bone_poor
-
-    # --- S_FAIL_FIX ---
-    S_FAIL_FIX = 5
-    S_FAIL_FIX += 4 * I_bone_poor
-    S_FAIL_FIX += 3 * fragments
-    S_FAIL_FIX += 2 * I_comorb
-    S_FAIL_FIX += 1.5 * gap
-
-    # Composite
-    S_SURG = 0.4 * S_AVN + 0.35 * S_PSEU + 0.25 * S_FAIL_FIX
-
-    # Clip and round
-    def clip_round(x):
-        if x < 0: x = 0
-        if x > 100: x = 100
-        return round(x,1)
-
-    return clip_round(S_AVN), clip_round(S_PSEU), clip_round(S_FAIL_FIX), clip_round(S_SURG)
+# Modèle "vigior_h" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("vigior_h")
+compute_scores = SCORING_MODEL.scalar
 
 # -----------------------
 # Decision rules (with Orthopédique priority for elderly osteoporotic)
@@ -223,8 +178,7 @@ def page_new_patient():
             "Treatment": treatment,
             "Justification": justification
         }
-        st.session_state.patients = pd.concat([st.session_state.patients, pd.DataFrame([row])], ignore_index=True)
-        save_patients()
+        save_patients(row)
         st.success(f"Patient enregistré : {patient_id}")
 
     if st.button("Retour Home", use_container_width=True):
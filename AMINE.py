@@ -1,4 +1,5 @@
 import streamlit as st
+from vigior_models import get_model
 
 # -------------------------------
 # Language System
@@ -71,50 +72,9 @@ gap = st.slider("", 0, 20, 3)
 # -------------------------------
 # RISK MODEL
 # -------------------------------
-def compute_risks(age, bone_quality, comorbid, nb_frag, HSA, gap):
-    nec = 8
-    nonunion = 6
-    stiff = 10
-
-    # Age effect
-    if age >= 70:
-        nec += 6
-        nonunion += 5
-        stiff += 7
-    if age >= 80:
-        nec += 4
-        nonunion += 4
-
-    # Bone quality
-    if bone_quality == "Moderate":
-        nonunion += 4
-    if bone_quality == "Poor":
-        nec += 6
-        nonunion += 12
-        stiff += 6
-
-    # Comorbidities
-    if comorbid == "Significant":
-        nonunion += 5
-        stiff += 4
-
-    # Fragments
-    if nb_frag == "3-part":
-        nec += 6
-    if nb_frag == "4-part":
-        nec += 12
-        nonunion += 10
-
-    # Radiologic parameters
-    if HSA < 120:
-        nec += 10
-        stiff += 5
-    if gap > 6:
-        nonunion += 12
-    if gap > 12:
-        nec += 8
-
-    return min(nec, 90), min(nonunion, 90), min(stiff, 90)
+# Modèle "amine" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("amine")
+compute_risks = SCORING_MODEL.scalar
 
 
 if st.button(translate("Evaluate", LANG)):
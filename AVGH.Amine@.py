@@ -1,16 +1,17 @@
 # app_final_v3.py
 import streamlit as st
 import pandas as pd
-import os
-import uuid
 from datetime import datetime
 
+from vigior_engine import get_engine
+from vigior_models import get_model
+
 st.set_page_config(page_title="VIGIOR-H", layout="wide")
 
 # -----------------------
 # Constants / Files
 # -----------------------
-PATIENTS_CSV = "patients.csv"
+ENGINE = get_engine()
 
 RESEARCH_REFS = [
     {"title": "PHARON model (Goudie et al.) - predictors of nonunion/complications in PHF", "citation": "Goudie EB et al., JBJS, 2021"},
@@ -26,25 +27,19 @@ RESEARCH_REFS = [
 if "page" not in st.session_state:
     st.session_state.page = "Home"
 
-if "patients" not in st.session_state:
-    if os.path.exists(PATIENTS_CSV):
-        st.session_state.patients = pd.read_csv(PATIENTS_CSV)
-    else:
-        st.session_state.patients = pd.DataFrame(columns=[
-            "ID","Date","Age","Tabac","Comorbidities","BoneQuality",
-            "Fragments","HSA","Gap","S_AVN","S_PSEU","S_FAIL_FIX","S_SURG",
-            "Treatment","Justification","Notes"
-        ])
-
-if "Notes" not in st.session_state.patients.columns:
-    st.session_state.patients["Notes"] = ""
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+# Registre partagé par toutes les sessions du processus (lecture seule, copie sur écriture)
+st.session_state.patients = ENGINE.frame("humerus")
 
-def save_patients():
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+def save_patients(row=None):
+    # Nouvelle évaluation : un seul enregistrement ajouté ; sinon réécriture complète
+    if row is not None:
+        ENGINE.append("humerus", row)
+    else:
+        ENGINE.write_snapshot("humerus", st.session_state.patients)
+    st.session_state.patients = ENGINE.frame("humerus")
 
 def generate_patient_id():
-    return f"H-{str(uuid.uuid4())[:8].upper()}"
+    return ENGINE.next_id("humerus")
 
 # -----------------------
 # Language Switcher
@@ -56,22 +51,9 @@ def tr(text_en, text_fr):
 # -----------------------
 # Scoring functions
 # -----------------------
-def compute_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities):
-    I_age_gt_65 = 1 if age > 65 else 0
-    I_age_gt_70 = 1 if age > 70 else 0
-    I_tabac = 1 if tabac else 0
-    I_bone_poor = 1 if bone_quality == "poor" else 0
-    I_comorb = 1 if comorbidities >= 1 else 0
-
-    S_AVN = 10 + 6 * I_age_gt_65 + 7 * I_tabac + 3 * fragments + 0.3 * (130 - HSA) + 1.5 * gap + 10 * I_bone_poor
-    S_PSEU = 8 + 2 * fragments + 2 * gap + 4 * I_age_gt_70 + 5 * I_tabac + 8 * I_bone_poor
-    S_FAIL_FIX = 5 + 4 * I_bone_poor + 3 * fragments + 2 * I_comorb + 1.5 * gap
-    S_SURG = 0.4 * S_AVN + 0.35 * S_PSEU + 0.25 * S_FAIL_FIX
-
-    def clip_round(x):
-        return round(min(max(x, 0), 100), 1)
-
-    return clip_round(S_AVN), clip_round(S_PSEU), clip_round(S_FAIL_FIX), clip_round(S_SURG)
+# Modèle "vigior_h" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("vigior_h")
+compute_scores = SCORING_MODEL.scalar
 
 # -----------------------
 # Decision rules
@@ -183,11 +165,7 @@ def page_new_patient():
             "Notes": ""
         }
 
-        st.session_state.patients = pd.concat(
-            [st.session_state.patients, pd.DataFrame([row])],
-            ignore_index=True
-        )
-        save_patients()
+        save_patients(row)
         st.success(tr(f"Patient saved: {patient_id}",f"Patient enregistré : {patient_id}"))
 
     if st.button(tr("Back Home","Retour Home"), use_container_width=True):
@@ -200,7 +178,7 @@ def page_registered_patients():
     st.title(tr("Registered Patients","Patients enregistrés"))
 
     q = st.text_input(tr("Search (ID, age, treatment...)","Rechercher (ID, âge, traitement...)"))
-    df = st.session_state.patients.copy()
+    df = st.session_state.patients
     if q:
         df = df[df.apply(lambda r: q.lower() in r.astype(str).str.lower().to_string(), axis=1)]
 
@@ -216,16 +194,14 @@ def page_registered_patients():
     patient_row = df[df["ID"] == selected_id].iloc[0]
     notes = st.text_area(
         tr("Surgeon clinical notes","Notes cliniques du chirurgien"),
-        value=patient_row.get("Notes",""),
+        value=patient_row.get("Notes") if pd.notna(patient_row.get("Notes")) else "",
         height=200
     )
     if st.button(tr("Save notes","Sauvegarder les notes")):
-        st.session_state.patients.loc[
-            st.session_state.patients["ID"] == selected_id, "Notes"
-        ] = notes
-        save_patients()
+        ENGINE.update("humerus", selected_id, {"Notes": notes})
+        st.session_state.patients = ENGINE.frame("humerus")
         st.success(tr("Notes saved","Notes sauvegardées"))
-        df = st.session_state.patients.copy()  # <-- IMPORTANT pour utiliser les notes à jour
+        df = st.session_state.patients  # <-- IMPORTANT pour utiliser les notes à jour
 
     # -----------------------
     # Registry Analysis (simplified)
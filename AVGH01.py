@@ -1,16 +1,20 @@
 import streamlit as st
 import pandas as pd
-import os
-import uuid
 from datetime import datetime
+
+from vigior_engine import get_engine
 import matplotlib.pyplot as plt
+from vigior_models import get_model
+from vigior_uncertainty import GAP_SD, HSA_SD, simulate
+from vigior_whatif import heatmap_figure, sensitivity_grid
 
 st.set_page_config(page_title="VIGIOR-H", layout="wide")
 
 # -----------------------
 # Constants / Files
 # -----------------------
-PATIENTS_CSV = "patients.csv"
+ENGINE = get_engine()
+REGISTRY = ENGINE.store("humerus")  # partition patients.csv
 
 RESEARCH_REFS = [
     {"title": "PHARON model (Goudie et al.) - predictors of nonunion/complications in PHF", "citation": "Goudie EB et al., JBJS, 2021"},
@@ -26,26 +30,20 @@ RESEARCH_REFS = [
 if "page" not in st.session_state:
     st.session_state.page = "Home"
 
-if "patients" not in st.session_state:
-    if os.path.exists(PATIENTS_CSV):
-        st.session_state.patients = pd.read_csv(PATIENTS_CSV)
-    else:
-        st.session_state.patients = pd.DataFrame(columns=[
-            "ID","Date","Age","Tabac","Comorbidities","BoneQuality",
-            "Fragments","HSA","Gap","S_AVN","S_PSEU","S_FAIL_FIX","S_SURG",
-            "Treatment","Justification","Notes"
-        ])
+# La colonne Notes des anciens registres est ajoutée par la migration v1 du moteur (à la lecture)
 
-# Ensure Notes column exists (retro-compatibility)
-if "Notes" not in st.session_state.patients.columns:
-    st.session_state.patients["Notes"] = ""
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+# Page Research : tableau, recherche, notes et statistiques lus dans cette projection (snapshot colonnaire) ;
+# les lignes complètes ne sont lues que pour la page affichée de la vue détaillée
+ANALYSIS_COLUMNS = ["Age", "Fragments", "HSA", "BoneQuality", "Notes"]
+VIEW_COLUMNS = ["ID", "Date", "Age", "Fragments", "HSA", "BoneQuality", "Treatment", "Notes"]
+PAGE_SIZE = 50
 
-def save_patients():
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+def save_patients(row):
+    # Nouvelle évaluation : un seul enregistrement ajouté (journal)
+    ENGINE.append("humerus", row)
 
 def generate_patient_id():
-    return f"H-{str(uuid.uuid4())[:8].upper()}"
+    return ENGINE.next_id("humerus")
 
 # -----------------------
 # Language Switcher
@@ -58,22 +56,9 @@ def tr(text_en, text_fr):
 # -----------------------
 # Scoring functions
 # -----------------------
-def compute_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities):
-    I_age_gt_65 = 1 if age > 65 else 0
-    I_age_gt_70 = 1 if age > 70 else 0
-    I_tabac = 1 if tabac else 0
-    I_bone_poor = 1 if bone_quality == "poor" else 0
-    I_comorb = 1 if comorbidities >= 1 else 0
-
-    S_AVN = 10 + 6 * I_age_gt_65 + 7 * I_tabac + 3 * fragments + 0.3 * (130 - HSA) + 1.5 * gap + 10 * I_bone_poor
-    S_PSEU = 8 + 2 * fragments + 2 * gap + 4 * I_age_gt_70 + 5 * I_tabac + 8 * I_bone_poor
-    S_FAIL_FIX = 5 + 4 * I_bone_poor + 3 * fragments + 2 * I_comorb + 1.5 * gap
-    S_SURG = 0.4 * S_AVN + 0.35 * S_PSEU + 0.25 * S_FAIL_FIX
-
-    def clip_round(x):
-        return round(min(max(x, 0), 100), 1)
-
-    return clip_round(S_AVN), clip_round(S_PSEU), clip_round(S_FAIL_FIX), clip_round(S_SURG)
+# Modèle "vigior_h" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("vigior_h")
+compute_scores = SCORING_MODEL.scalar
 
 # -----------------------
 # Decision rules
@@ -165,6 +150,19 @@ def page_new_patient():
         st.success(f"➡️ {treatment}")
         st.write(justification)
 
+        # Erreur de mesure de HSA / gap : tirages Monte Carlo évalués en un seul lot
+        mc = simulate(age, tabac, fragments, HSA, gap, bone_quality, comorbidities,
+                      lang="en" if LANG == "English" else "fr")
+        with st.expander(tr(f"Measurement uncertainty (HSA ± {HSA_SD:g}°, gap ± {GAP_SD:g} mm)",
+                            f"Incertitude de mesure (HSA ± {HSA_SD:g}°, gap ± {GAP_SD:g} mm)")):
+            ci = mc.intervals().round(1)
+            ci.columns = [tr("Entered","Saisi"), tr("Mean","Moyenne"), tr("95% CI low","IC 95 % bas"),
+                          tr("95% CI high","IC 95 % haut")]
+            st.dataframe(ci)
+            st.write(tr(f"Probability that the recommendation changes: **{mc.flip_probability:.0%}**",
+                        f"Probabilité que la recommandation change : **{mc.flip_probability:.0%}**"))
+            st.bar_chart(mc.treatment_probabilities())
+
         patient_id = generate_patient_id()
         row = {
             "ID": patient_id,
@@ -185,13 +183,31 @@ def page_new_patient():
             "Notes": ""
         }
 
-        st.session_state.patients = pd.concat(
-            [st.session_state.patients, pd.DataFrame([row])],
-            ignore_index=True
-        )
-        save_patients()
+        save_patients(row)
         st.success(tr(f"Patient saved: {patient_id}",f"Patient enregistré : {patient_id}"))
 
+        st.session_state.whatif = {"age": age, "tabac": tabac, "fragments": fragments, "bone_quality": bone_quality,
+                                   "comorbidities": comorbidities, "HSA": HSA, "gap": gap}
+
+    # Sensibilité HSA × écart : grille calculée une fois par patient, les widgets ne font que la relire
+    if "whatif" in st.session_state:
+        p = st.session_state.whatif
+        with st.expander(tr("What if? HSA × gap sensitivity","Et si ? Sensibilité HSA × écart"), expanded=submitted):
+            c1, c2 = st.columns(2)
+            with c1:
+                score = st.selectbox(tr("Score shown","Score affiché"), SCORING_MODEL.outputs, index=3)
+            with c2:
+                sweep_age = st.checkbox(tr("Also vary age","Faire aussi varier l'âge"))
+            grid = sensitivity_grid(p["age"], p["tabac"], p["fragments"], p["bone_quality"], p["comorbidities"],
+                                    sweep_age=sweep_age, lang="en" if LANG == "English" else "fr")
+            age_shown = None
+            if sweep_age:
+                ages = [int(a) for a in grid.ages]
+                age_shown = st.select_slider(tr("Age","Âge"), options=ages, value=ages[grid.age_index(p["age"])])
+            st.pyplot(heatmap_figure(grid, score, age=age_shown, patient=(p["HSA"], p["gap"])))
+            st.caption(tr("Lines: boundaries of the proposed treatment. Cross: current patient.",
+                          "Lignes : limites du traitement proposé. Croix : patient actuel."))
+
     if st.button(tr("Back Home","Retour Home"), use_container_width=True):
         st.session_state.page = "Home"
 
@@ -200,12 +216,19 @@ def page_research():
     st.subheader(tr("Registered patients","Patients enregistrés"))
 
     q = st.text_input(tr("Search (ID, age, treatment...)","Rechercher (ID, âge, traitement...)"))
-    df = st.session_state.patients.copy()
+    df = REGISTRY.load_columns(VIEW_COLUMNS)
     if q:
-        df = df[df.apply(lambda r: q.lower() in r.astype(str).str.lower().to_string(), axis=1)]
+        df = df[df.astype(str).apply(lambda col: col.str.lower().str.contains(q.lower(), regex=False)).any(axis=1)]
 
     st.dataframe(df, height=300)
 
+    # Vue détaillée (toutes les colonnes), une page à la fois
+    pages = max(1, -(-len(df) // PAGE_SIZE))
+    page = st.number_input(tr("Full records — page","Dossiers complets — page"), 1, pages, step=1)
+    with st.expander(tr(f"Full records (page {page}/{pages})", f"Dossiers complets (page {page}/{pages})")):
+        start = (page - 1) * PAGE_SIZE
+        st.dataframe(ENGINE.rows("humerus", df["ID"].iloc[start:start + PAGE_SIZE]), height=300)
+
     st.markdown("---")
     st.subheader(tr("Patient clinical notes","Notes cliniques du patient"))
 
@@ -218,15 +241,12 @@ def page_research():
 
     notes = st.text_area(
         tr("Surgeon clinical notes","Notes cliniques du chirurgien"),
-        value=patient_row.get("Notes",""),
+        value=patient_row.get("Notes") if pd.notna(patient_row.get("Notes")) else "",
         height=200
     )
 
     if st.button(tr("Save notes","Sauvegarder les notes")):
-        st.session_state.patients.loc[
-            st.session_state.patients["ID"] == selected_id, "Notes"
-        ] = notes
-        save_patients()
+        ENGINE.update("humerus", selected_id, {"Notes": notes})
         st.success(tr("Notes saved","Notes sauvegardées"))
 
     # -----------------------
@@ -235,32 +255,35 @@ def page_research():
     st.markdown("---")
     st.subheader("Analyse du registre")
 
-    if len(df) > 0:
+    # Même projection que le tableau (filtrée par la recherche)
+    stats = df[ANALYSIS_COLUMNS]
+
+    if len(stats) > 0:
         col1, col2 = st.columns(2)
 
         # Age
         with col1:
             fig, ax = plt.subplots()
-            ax.hist(df["Age"].dropna(), bins=10)
+            ax.hist(stats["Age"].dropna(), bins=10)
             ax.set_title("Distribution de l’âge")
             st.pyplot(fig)
 
         # Fragments
         with col2:
             fig, ax = plt.subplots()
-            df["Fragments"].value_counts().sort_index().plot(kind="bar", ax=ax)
+            stats["Fragments"].value_counts().sort_index().plot(kind="bar", ax=ax)
             ax.set_title("Nombre de fragments")
             st.pyplot(fig)
 
         # HSA mean
-        st.write(f"**Angle HSA moyen :** {round(df['HSA'].mean(),1)}°")
+        st.write(f"**Angle HSA moyen :** {round(stats['HSA'].mean(),1)}°")
 
         # Osteoporosis
-        osteoporose = (df["BoneQuality"] == "poor").mean() * 100
+        osteoporose = (stats["BoneQuality"] == "poor").mean() * 100
         st.write(f"**Ostéoporose (os poor) :** {round(osteoporose,1)} %")
 
         # Complications from notes
-        notes = df["Notes"].fillna("").str.lower()
+        notes = stats["Notes"].fillna("").str.lower()
 
         infection = notes.str.contains("infection").sum()
         pseudarthrose = notes.str.contains("pseudarthrose|nonunion").sum()
@@ -1,15 +1,16 @@
 import streamlit as st
-import pandas as pd
-import os
 import uuid
 from datetime import datetime
 
+from vigior_engine import get_engine
+from vigior_models import get_model
+
 st.set_page_config(page_title="VIGIOR-H", layout="wide")
 
 # -----------------------
 # Constants / Files
 # -----------------------
-PATIENTS_CSV = "patients.csv"
+ENGINE = get_engine()  # partition humerus : patients.csv
 
 # -----------------------
 # Session State & Data
@@ -20,21 +21,13 @@ if "page" not in st.session_state:
 if "selected_patient" not in st.session_state:
     st.session_state.selected_patient = None
 
-if os.path.exists(PATIENTS_CSV):
-    patients_df = pd.read_csv(PATIENTS_CSV)
-else:
-    patients_df = pd.DataFrame(columns=[
-        "ID","Date","Age","Tabac","Comorbidities","BoneQuality",
-        "Fragments","HSA","Gap",
-        "S_AVN","S_PSEU","S_FAIL_FIX","S_SURG",
-        "Treatment","Justification","Notes"
-    ])
-
-st.session_state.patients = patients_df
+# Registre partagé par toutes les sessions (rechargé seulement si le fichier a changé)
+st.session_state.patients = ENGINE.frame("humerus")
 
 
-def save_patients():
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+def save_patients(row):
+    ENGINE.append("humerus", row)
+    st.session_state.patients = ENGINE.frame("humerus")
 
 
 def generate_patient_id():
@@ -51,20 +44,9 @@ def tr(en, fr):
 # -----------------------
 # Scores
 # -----------------------
-def compute_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities):
-    I_age_gt_65 = 1 if age > 65 else 0
-    I_age_gt_70 = 1 if age > 70 else 0
-    I_tabac = 1 if tabac else 0
-    I_bone_poor = 1 if bone_quality == "poor" else 0
-    I_comorb = 1 if comorbidities >= 1 else 0
-
-    S_AVN = 10 + 6*I_age_gt_65 + 7*I_tabac + 3*fragments + 0.3*(130-HSA) + 1.5*gap + 10*I_bone_poor
-    S_PSEU = 8 + 2*fragments + 2*gap + 4*I_age_gt_70 + 5*I_tabac + 8*I_bone_poor
-    S_FAIL_FIX = 5 + 4*I_bone_poor + 3*fragments + 2*I_comorb + 1.5*gap
-    S_SURG = 0.4*S_AVN + 0.35*S_PSEU + 0.25*S_FAIL_FIX
-
-    def clip(x): return round(min(max(x,0),100),1)
-    return clip(S_AVN), clip(S_PSEU), clip(S_FAIL_FIX), clip(S_SURG)
+# Modèle "vigior_h" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("vigior_h")
+compute_scores = SCORING_MODEL.scalar
 
 # -----------------------
 # Pages
@@ -123,11 +105,7 @@ def page_new_patient():
             "Notes": ""
         }
 
-        st.session_state.patients = pd.concat(
-            [st.session_state.patients, pd.DataFrame([row])],
-            ignore_index=True)
-
-        save_patients()
+        save_patients(row)
         st.success(f"Patient saved: {pid}")
 
         # 🔍 Similar patients
@@ -177,10 +155,8 @@ def page_registry():
     )
 
     if st.button(tr("Save notes","Sauvegarder notes")):
-        st.session_state.patients.loc[
-            st.session_state.patients["ID"] == pid, "Notes"
-        ] = notes
-        save_patients()
+        ENGINE.update("humerus", pid, {"Notes": notes})
+        st.session_state.patients = ENGINE.frame("humerus")
         st.success(tr("Notes saved","Notes sauvegardées"))
 
     if st.button(tr("Back Home","Retour accueil")):
@@ -1,12 +1,13 @@
 import streamlit as st
 import pandas as pd
-import os
-import uuid
 from datetime import datetime
 
+from vigior_engine import get_engine
+from vigior_models import get_model
+
 st.set_page_config(page_title="VIGIOR-H", layout="wide")
 
-PATIENTS_CSV = "patients.csv"
+ENGINE = get_engine()
 
 # -----------------------
 # Session State & Data
@@ -14,25 +15,20 @@ PATIENTS_CSV = "patients.csv"
 if "page" not in st.session_state:
     st.session_state.page = "Home"
 
-if "patients" not in st.session_state:
-    if os.path.exists(PATIENTS_CSV):
-        st.session_state.patients = pd.read_csv(PATIENTS_CSV)
-    else:
-        st.session_state.patients = pd.DataFrame(columns=[
-            "ID","Date","Age","Tabac","Comorbidities","BoneQuality",
-            "Fragments","HSA","Gap","S_AVN","S_PSEU","S_FAIL_FIX","S_SURG",
-            "Treatment","Justification","Notes"
-        ])
-
-if "Notes" not in st.session_state.patients.columns:
-    st.session_state.patients["Notes"] = ""
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+# Registre partagé par toutes les sessions du processus (lecture seule, copie sur écriture) ;
+# la colonne Notes des anciens registres est ajoutée par la migration v1 du moteur (à la lecture)
+st.session_state.patients = ENGINE.frame("humerus")
 
-def save_patients():
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+def save_patients(row=None):
+    # Nouvelle évaluation : un seul enregistrement ajouté ; sinon réécriture complète
+    if row is not None:
+        ENGINE.append("humerus", row)
+    else:
+        ENGINE.write_snapshot("humerus", st.session_state.patients)
+    st.session_state.patients = ENGINE.frame("humerus")
 
 def generate_patient_id():
-    return f"H-{str(uuid.uuid4())[:8].upper()}"
+    return ENGINE.next_id("humerus")
 
 # -----------------------
 # Language
@@ -45,19 +41,9 @@ def tr(en, fr):
 # -----------------------
 # Scores
 # -----------------------
-def compute_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities):
-    I_age_gt_65 = age > 65
-    I_age_gt_70 = age > 70
-    I_tabac = tabac
-    I_bone_poor = bone_quality == "poor"
-    I_comorb = comorbidities >= 1
-
-    S_AVN = 10 + 6*I_age_gt_65 + 7*I_tabac + 3*fragments + 0.3*(130-HSA) + 1.5*gap + 10*I_bone_poor
-    S_PSEU = 8 + 2*fragments + 2*gap + 4*I_age_gt_70 + 5*I_tabac + 8*I_bone_poor
-    S_FAIL_FIX = 5 + 4*I_bone_poor + 3*fragments + 2*I_comorb + 1.5*gap
-    S_SURG = 0.4*S_AVN + 0.35*S_PSEU + 0.25*S_FAIL_FIX
-
-    return [round(min(max(x,0),100),1) for x in [S_AVN,S_PSEU,S_FAIL_FIX,S_SURG]]
+# Modèle "vigior_h" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("vigior_h")
+compute_scores = SCORING_MODEL.scalar
 
 # -----------------------
 # Pages
@@ -86,11 +72,13 @@ def page_registered():
     st.subheader(tr("Patient clinical notes","Notes cliniques"))
 
     pid = st.selectbox("Patient ID", df["ID"])
-    notes = st.text_area("Notes", df[df["ID"]==pid]["Notes"].values[0], height=150)
+    current = df[df["ID"]==pid]["Notes"].values[0]
+    notes = st.text_area("Notes", current if pd.notna(current) else "", height=150)
 
     if st.button(tr("Save notes","Sauvegarder les notes")):
-        st.session_state.patients.loc[df["ID"]==pid,"Notes"] = notes
-        save_patients()
+        # Patch d'un seul patient, sans réécrire le registre
+        ENGINE.update("humerus", pid, {"Notes": notes})
+        st.session_state.patients = ENGINE.frame("humerus")
         st.success(tr("Saved","Sauvegardé"))
 
     # ---------------- Analyse du registre ----------------
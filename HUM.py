@@ -1,13 +1,17 @@
 import streamlit as st
 import pandas as pd
 import os
-import uuid
+
+from vigior_storage import IdAllocator
+from vigior_models import get_model
 
 # ---------------------------
 # INITIALISATION DU FICHIER
 # ---------------------------
 
 DATA_FILE = "patients.csv"
+# Série patient_id (H-001...) : compteur distinct de celui de la colonne ID du moteur (patients.csv.seq)
+ID_ALLOCATOR = IdAllocator(DATA_FILE, seed_column="patient_id", counter_path=DATA_FILE + ".patient_id.seq")
 
 if not os.path.exists(DATA_FILE):
     df_init = pd.DataFrame(columns=[
@@ -23,24 +27,15 @@ if not os.path.exists(DATA_FILE):
 # ---------------------------
 
 def generate_patient_id():
-    df = pd.read_csv(DATA_FILE)
-    if df.empty:
-        return "H-001"
-    else:
-        last_id = df["patient_id"].iloc[-1]
-        num = int(last_id.split("-")[1]) + 1
-        return f"H-{num:03d}"
+    return ID_ALLOCATOR.next_id()
 
 # ---------------------------
 # FONCTION : MODELE DE RISQUES (SIMPLIFIÉ POUR DEMO)
 # ---------------------------
 
-def compute_risks(age, fragments, HSA_angle, smoker):
-    # ► Ces formules seront remplacées par les données publiées (méta-analyses PubMed/Elsevier)
-    risk_necrosis = min(95, (fragments * 15) + max(0, 120 - HSA_angle) + (10 if smoker == "Yes" else 0))
-    risk_nonunion = min(85, fragments * 12 + (5 if smoker == "Yes" else 0))
-    risk_stiffness = min(70, (age / 2) + fragments * 5)
-    return risk_necrosis, risk_nonunion, risk_stiffness
+# Modèle "hum" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("hum")
+compute_risks = SCORING_MODEL.scalar
 
 # ---------------------------
 # FONCTION : RECOMMANDATION TRAITEMENT
@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
-import os
+from vigior_engine import get_engine
+from vigior_models import get_model
 
 # ---------------------------------------------
 # INITIALISATION SESSION STATE
@@ -8,49 +8,24 @@ import os
 if "page" not in st.session_state:
     st.session_state.page = "Home"
 
-if "patients" not in st.session_state:
-    # Dossier local pour enregistrer
-    if os.path.exists("patients.csv"):
-        st.session_state.patients = pd.read_csv("patients.csv")
-    else:
-        st.session_state.patients = pd.DataFrame(columns=[
-            "ID", "Age", "Tabac", "Fragments", "HSA", "Gap",
-            "Necrose", "Pseudo", "Raideur", "Treatment", "Justification"
-        ])
+# Registre partagé (patients.csv, partition humérus) : colonnes Necrose / Pseudo / Raideur conservées
+ENGINE = get_engine()
+st.session_state.patients = ENGINE.frame("humerus")
 
 # ---------------------------------------------
 # FONCTION UTILITAIRE
 # ---------------------------------------------
 def generate_patient_id():
-    n = len(st.session_state.patients) + 1
-    return f"H-{n:03d}"
+    return ENGINE.next_id("humerus")
 
-def save_patients():
-    st.session_state.patients.to_csv("patients.csv", index=False)
+def save_patients(row):
+    # Un seul enregistrement ajouté au journal (verrou, index des clés)
+    ENGINE.append("humerus", row)
+    st.session_state.patients = ENGINE.frame("humerus")
 
-def compute_risks(age, tabac, fragments, HSA, gap):
-    """Modèle simple simulé en attendant ton modèle statistique final"""
-
-    base_necrose = 10
-    base_pseudo = 8
-    base_raideur = 12
-
-    # Facteurs plausibles inspirés de littérature
-    necrose = base_necrose + fragments*3 + (HSA - 130)*0.3 + gap*1.5
-    if tabac:
-        necrose += 7
-    if age > 65:
-        necrose += 6
-
-    pseudo = base_pseudo + gap*2 + fragments*2
-    if age > 70:
-        pseudo += 4
-
-    raideur = base_raideur + fragments*1.5 + (HSA - 130)*0.2
-    if age > 60:
-        raideur += 3
-
-    return round(necrose,1), round(pseudo,1), round(raideur,1)
+# Modèle "am" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("am")
+compute_risks = SCORING_MODEL.scalar
 
 def propose_treatment(necrose, pseudo, raideur):
     """Proposition IA simple"""
@@ -121,7 +96,7 @@ elif st.session_state.page == "New Patient":
         # Sauvegarde patient
         patient_id = generate_patient_id()
 
-        new_row = pd.DataFrame([{
+        new_row = {
             "ID": patient_id,
             "Age": age,
             "Tabac": "Oui" if tabac else "Non",
@@ -133,10 +108,9 @@ elif st.session_state.page == "New Patient":
             "Raideur": raideur,
             "Treatment": treatment,
             "Justification": justification
-        }])
+        }
 
-        st.session_state.patients = pd.concat([st.session_state.patients, new_row], ignore_index=True)
-        save_patients()
+        save_patients(new_row)
 
         st.success(f"Patient enregistré : **{patient_id}**")
 
@@ -4,11 +4,16 @@ import pandas as pd
 import os
 from datetime import datetime
 
+from vigior_storage import IdAllocator
+from vigior_models import get_model
+
 # -------------------------
 # Config & Data file
 # -------------------------
 st.set_page_config(page_title="VIGIOR", layout="centered")
 DATA_FILE = "patients.csv"
+# Série patient_id (H-001...) : compteur distinct de celui de la colonne ID du moteur (patients.csv.seq)
+ID_ALLOCATOR = IdAllocator(DATA_FILE, seed_column="patient_id", counter_path=DATA_FILE + ".patient_id.seq")
 
 # Create data file if missing
 if not os.path.exists(DATA_FILE):
@@ -24,41 +29,11 @@ if not os.path.exists(DATA_FILE):
 # Helpers
 # -------------------------
 def generate_patient_id():
-    df = pd.read_csv(DATA_FILE)
-    if df.empty:
-        return "H-001"
-    else:
-        # take last patient_id, increment numeric part
-        try:
-            last_id = df["patient_id"].iloc[-1]
-            num = int(last_id.split("-")[1]) + 1
-        except Exception:
-            num = len(df) + 1
-        return f"H-{num:03d}"
-
-def compute_risks(age, fragments, gap_mm, HSA_angle, smoker):
-    """
-    Retourne trois risques (en pourcentages) : nécrose, pseudarthrose, raideur.
-    Formules heuristiques (demo) : pondération des facteurs cliniques.
-    """
-    # base selon nombre de fragments
-    base_frag = fragments * 12.0  # chaque fragment augmente le risque
-    # HSA impact (plus bas = plus de risque de nécrose)
-    hsa_penalty = max(0, 120 - HSA_angle) * 0.9
-    # gap increases nonunion and necrosis slightly
-    gap_penalty_nec = gap_mm * 2.0
-    gap_penalty_non = gap_mm * 3.0
-    # age mostly contributes to stiffness
-    age_penalty = max(0, (age - 50) * 0.6)
-    # smoking
-    smoke_pen = 10.0 if smoker == "Yes" else 0.0
-
-    risk_necrosis = min(95.0, base_frag + hsa_penalty + gap_penalty_nec + smoke_pen)
-    risk_nonunion = min(95.0, fragments * 9.0 + gap_penalty_non + (5.0 if smoker == "Yes" else 0.0))
-    risk_stiffness = min(95.0, 10.0 + age_penalty + fragments * 4.0 + gap_mm * 0.8)
+    return ID_ALLOCATOR.next_id()
 
-    # round to one decimal for display / storage
-    return round(risk_necrosis, 1), round(risk_nonunion, 1), round(risk_stiffness, 1)
+# Modèle "sr" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("sr")
+compute_risks = SCORING_MODEL.scalar
 
 def propose_treatment_and_justification(age, fragments, gap_mm, HSA_angle, risks):
     """
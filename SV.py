@@ -2,11 +2,16 @@ import streamlit as st
 import pandas as pd
 import os
 
+from vigior_storage import IdAllocator
+from vigior_models import get_model
+
 # -------------------------------------
 # INITIALISATION FICHIER
 # -------------------------------------
 
 DATA_FILE = "patients.csv"
+# Série patient_id (H-001...) : compteur distinct de celui de la colonne ID du moteur (patients.csv.seq)
+ID_ALLOCATOR = IdAllocator(DATA_FILE, seed_column="patient_id", counter_path=DATA_FILE + ".patient_id.seq")
 if not os.path.exists(DATA_FILE):
     df_init = pd.DataFrame(columns=[
         "patient_id", "age", "sex", "smoker",
@@ -20,22 +25,14 @@ if not os.path.exists(DATA_FILE):
 # GENERATION DES IDS PATIENTS
 # -------------------------------------
 def generate_patient_id():
-    df = pd.read_csv(DATA_FILE)
-    if df.empty:
-        return "H-001"
-    else:
-        last_id = df["patient_id"].iloc[-1]
-        num = int(last_id.split("-")[1]) + 1
-        return f"H-{num:03d}"
+    return ID_ALLOCATOR.next_id()
 
 # -------------------------------------
 # MODELES DE RISQUES (SIMPLIFIÉS)
 # -------------------------------------
-def compute_risks(age, fragments, gap_mm, HSA_angle, smoker):
-    risk_necrosis = min(95, fragments * 12 + max(0, 120 - HSA_angle) + gap_mm * 2 + (10 if smoker == "Yes" else 0))
-    risk_nonunion = min(80, fragments * 10 + gap_mm * 3 + (5 if smoker == "Yes" else 0))
-    risk_stiffness = min(75, (age / 2) + fragments * 4 + gap_mm)
-    return risk_necrosis, risk_nonunion, risk_stiffness
+# Modèle "sv" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("sv")
+compute_risks = SCORING_MODEL.scalar
 
 # -------------------------------------
 # RECOMMANDATION THÉRAPEUTIQUE
@@ -1,15 +1,18 @@
 import streamlit as st
 import pandas as pd
-import os
-import uuid
 from datetime import datetime
 
+from vigior_engine import get_engine
+from vigior_models import get_model
+
 st.set_page_config(page_title="VIGIOR-H", layout="wide")
 
 # -----------------------
 # File
 # -----------------------
-PATIENTS_CSV = "patients.csv"
+# Partition humérus (patients.csv) : les colonnes anglaises historiques de ce module
+# ("Patient ID", "Surgeon notes"...) sont renommées par la migration v2 du moteur
+ENGINE = get_engine()
 
 # -----------------------
 # Session state
@@ -23,26 +26,18 @@ if "selected_patient" not in st.session_state:
 # -----------------------
 # Load data
 # -----------------------
-if os.path.exists(PATIENTS_CSV):
-    st.session_state.patients = pd.read_csv(PATIENTS_CSV)
-else:
-    st.session_state.patients = pd.DataFrame(columns=[
-        "Patient ID","Date",
-        "Age","Smoking status","Number of comorbidities","Bone quality",
-        "Number of fracture fragments","HSA angle","Interfragmentary gap",
-        "Risk of avascular necrosis (%)",
-        "Risk of nonunion (%)",
-        "Risk of fixation failure (%)",
-        "Recommended treatment",
-        "Recommendation justification",
-        "Surgeon notes"
-    ])
-
-def save_patients():
-    st.session_state.patients.to_csv(PATIENTS_CSV, index=False)
+st.session_state.patients = ENGINE.frame("humerus")
+
+def save_patients(row=None):
+    # Nouvelle évaluation : un seul enregistrement ajouté ; sinon réécriture complète
+    if row is not None:
+        ENGINE.append("humerus", row)
+    else:
+        ENGINE.write_snapshot("humerus", st.session_state.patients)
+    st.session_state.patients = ENGINE.frame("humerus")
 
 def generate_patient_id():
-    return f"H-{str(uuid.uuid4())[:8].upper()}"
+    return ENGINE.next_id("humerus")
 
 # -----------------------
 # Language
@@ -55,20 +50,9 @@ def tr(en, fr):
 # -----------------------
 # Scoring
 # -----------------------
-def compute_scores(age, smoking, fragments, HSA, gap, bone_quality, comorbidities):
-    I_age_65 = 1 if age > 65 else 0
-    I_age_70 = 1 if age > 70 else 0
-    I_smoking = 1 if smoking else 0
-    I_poor_bone = 1 if bone_quality == "poor" else 0
-    I_comorb = 1 if comorbidities >= 1 else 0
-
-    risk_avn = 10 + 6*I_age_65 + 7*I_smoking + 3*fragments + 0.3*(130-HSA) + 1.5*gap + 10*I_poor_bone
-    risk_nonunion = 8 + 2*fragments + 2*gap + 4*I_age_70 + 5*I_smoking + 8*I_poor_bone
-    risk_fix_failure = 5 + 4*I_poor_bone + 3*fragments + 2*I_comorb + 1.5*gap
-
-    def clip(x): return round(min(max(x,0),100),1)
-
-    return clip(risk_avn), clip(risk_nonunion), clip(risk_fix_failure)
+# Modèle "vigior_h" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("vigior_h")
+compute_scores = SCORING_MODEL.scalar
 
 # -----------------------
 # Recommendation logic (UNCHANGED)
@@ -142,7 +126,7 @@ def page_new_patient():
         submitted = st.form_submit_button(tr("Evaluate","Évaluer"))
 
     if submitted:
-        risk_avn, risk_nonunion, risk_fix_failure = compute_scores(
+        risk_avn, risk_nonunion, risk_fix_failure, risk_surgery = compute_scores(
             age, smoking, fragments, HSA, gap, bone_quality, comorbidities)
 
         treatment, justification = propose_treatment(
@@ -170,28 +154,25 @@ def page_new_patient():
 
         pid = generate_patient_id()
         row = {
-            "Patient ID": pid,
+            "ID": pid,
             "Date": datetime.utcnow().isoformat(),
             "Age": age,
-            "Smoking status": smoking,
-            "Number of comorbidities": comorbidities,
-            "Bone quality": bone_quality,
-            "Number of fracture fragments": fragments,
-            "HSA angle": HSA,
-            "Interfragmentary gap": gap,
-            "Risk of avascular necrosis (%)": risk_avn,
-            "Risk of nonunion (%)": risk_nonunion,
-            "Risk of fixation failure (%)": risk_fix_failure,
-            "Recommended treatment": treatment,
-            "Recommendation justification": justification,
-            "Surgeon notes": ""
+            "Tabac": smoking,
+            "Comorbidities": comorbidities,
+            "BoneQuality": bone_quality,
+            "Fragments": fragments,
+            "HSA": HSA,
+            "Gap": gap,
+            "S_AVN": risk_avn,
+            "S_PSEU": risk_nonunion,
+            "S_FAIL_FIX": risk_fix_failure,
+            "S_SURG": risk_surgery,
+            "Treatment": treatment,
+            "Justification": justification,
+            "Notes": ""
         }
 
-        st.session_state.patients = pd.concat(
-            [st.session_state.patients, pd.DataFrame([row])],
-            ignore_index=True)
-
-        save_patients()
+        save_patients(row)
         st.success(tr(f"Patient saved: {pid}","Patient enregistré : ") + pid)
 
     if st.button(tr("Back to home","Retour accueil")):
@@ -205,18 +186,15 @@ def page_registry():
     st.dataframe(df, height=300)
 
     st.markdown("---")
-    pid = st.selectbox(tr("Select a patient","Sélectionner un patient"), df["Patient ID"].tolist())
-    patient = df[df["Patient ID"] == pid].iloc[0]
+    pid = st.selectbox(tr("Select a patient","Sélectionner un patient"), df["ID"].tolist())
+    patient = df[df["ID"] == pid].iloc[0]
 
     st.subheader(tr("Surgeon clinical notes","Notes cliniques du chirurgien"))
-    notes = st.text_area("", value=patient["Surgeon notes"], height=200)
+    notes = st.text_area("", value=patient["Notes"] if pd.notna(patient["Notes"]) else "", height=200)
 
     if st.button(tr("Save notes","Sauvegarder les notes")):
-        st.session_state.patients.loc[
-            st.session_state.patients["Patient ID"] == pid,
-            "Surgeon notes"
-        ] = notes
-        save_patients()
+        ENGINE.update("humerus", pid, {"Notes": notes})
+        st.session_state.patients = ENGINE.frame("humerus")
         st.success(tr("Notes saved","Notes sauvegardées"))
 
     if st.button(tr("Back to home","Retour accueil")):
@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
-import uuid
-import os
+
+from vigior_engine import get_engine
+from vigior_models import get_model
 
 # ------------------------------------------------------
 # PAGE CONFIG
@@ -11,7 +12,7 @@ st.set_page_config(
     layout="wide",
 )
 
-DATAFILE = "vigior_data.csv"
+ENGINE = get_engine()  # partition humerus_neer : vigior_data.csv
 
 # ------------------------------------------------------
 # STYLE PREMIUM
@@ -85,52 +86,22 @@ st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 # ------------------------------------------------------
 
 def load_data():
-    if not os.path.exists(DATAFILE):
-        df = pd.DataFrame()
-        df.to_csv(DATAFILE, index=False)
-        return df
-    try:
-        return pd.read_csv(DATAFILE)
-    except:
+    if not ENGINE.exists("humerus_neer"):
         return pd.DataFrame()
+    return ENGINE.load("humerus_neer")
 
-def save_data(df):
-    df.to_csv(DATAFILE, index=False)
-
-def generate_patient_code(prefix="H"):
-    number = str(len(load_data()) + 1).zfill(3)
-    return f"{prefix}-{number}"
+def generate_patient_code():
+    return ENGINE.next_id("humerus_neer")
 
 # ------------------------------------------------------
 # RISK MODEL (placeholder logic)
 # ------------------------------------------------------
 
+SCORING_MODEL = get_model("neer", 1)
+
+
 def compute_risks(data):
-    age = data["age"]
-    neer = data["neer"]
-    displacement = data["displacement"]
-
-    necrose = min(90, 8 + age * 0.35 + neer * 10)
-    pseudo = min(75, displacement * 3 + neer * 8)
-    stiff = min(70, 5 + age * 0.25)
-
-    score = (necrose + pseudo + stiff) / 3
-
-    if neer >= 3:
-        conduct = "Ostéosynthèse recommandée (ou prothèse selon âge et mobilité)."
-        reason = "Fracture multi-fragmentaire avec risque élevé de complications."
-    else:
-        conduct = "Traitement conservateur envisageable."
-        reason = "Fracture peu déplacée avec bon potentiel fonctionnel."
-
-    return {
-        "score": round(score, 1),
-        "necrose": round(necrose, 1),
-        "pseudoarthrose": round(pseudo, 1),
-        "raideur": round(stiff, 1),
-        "suggestion": conduct,
-        "reason": reason
-    }
+    return SCORING_MODEL.score(age=data["age"], neer=data["neer"], displacement=data["displacement"])
 
 # ------------------------------------------------------
 # HOME PAGE — PREMIUM DESIGN
@@ -236,14 +207,11 @@ def shoulder_form():
         notes = st.text_area("Ex : Ostéosynthèse par plaque DP, infection précoce traitée…", height=200)
 
         if st.button("💾 Enregistrer le patient"):
-            df = load_data()
             entry = data.copy()
             entry.update(result)
             entry["code"] = code
             entry["notes"] = notes
-
-            df = pd.concat([df, pd.DataFrame([entry])], ignore_index=True)
-            save_data(df)
+            ENGINE.append("humerus_neer", entry)
 
             st.success("Patient enregistré avec succès !")
 
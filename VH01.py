@@ -2,9 +2,14 @@
 import streamlit as st
 import pandas as pd
 import uuid
-import os
 from datetime import datetime
 
+from vigior_engine import get_engine
+from vigior_models import get_model
+
+ENGINE = get_engine()  # partition humerus_interactive : vigior_humerus_db.csv
+SCORING_MODEL = get_model("vh01")
+
 # ========== Page config ==========
 st.set_page_config(page_title="VIGIOR-H — Épaule interactive", layout="wide", initial_sidebar_state="auto")
 
@@ -197,24 +202,10 @@ if st.session_state.get('shoulder_clicked', False):
     if submit:
         # small "processing" animation
         with st.spinner("Analyse en cours…"):
-            # compute base score (same logic que ton modèle)
-            base_score = 0
-            base_score += 2 if age > 65 else 0
-            base_score += 2 if (fumeur == "Oui" and pa > 10) else 0
-            base_score += 3 if n_fragments == 4 else 0
-            base_score += 2 if (hsa < 120 or hsa > 145) else 0
-            base_score += 2 if ecart == "Oui" else 0
-            base_score += 2 if luxation == "Oui" else 0
-            base_score += 2 if osteoporosis == "Oui" else 0
-
-            # Risks (fictifs / demo)
-            ortho_necrose = min(5 + base_score * 2, 95)
-            ortho_pseudo = min(8 + base_score * 1.5, 95)
-            ortho_raideur = min(10 + base_score * 2.5, 95)
-
-            chir_necrose = min(15 + base_score * 1.2, 95)
-            chir_pseudo = min(10 + base_score * 1.0, 90)
-            chir_raideur = min(7 + base_score * 2.0, 90)
+            # Risques ortho / chir : modèle "vh01" du registre partagé (vigior_models.py)
+            (ortho_necrose, ortho_pseudo, ortho_raideur,
+             chir_necrose, chir_pseudo, chir_raideur) = SCORING_MODEL.scalar(
+                age, fumeur, pa, n_fragments, hsa, ecart, luxation, osteoporosis)
 
         # show results in two-column cards
         c1, c2 = st.columns(2)
@@ -268,14 +259,7 @@ if st.session_state.get('shoulder_clicked', False):
         }
 
         df_new = pd.DataFrame([data])
-        file_path = "vigior_humerus_db.csv"
-        if os.path.exists(file_path):
-            df_old = pd.read_csv(file_path)
-            df = pd.concat([df_old, df_new], ignore_index=True)
-        else:
-            df = df_new
-
-        df.to_csv(file_path, index=False)
+        ENGINE.append("humerus_interactive", data)
         st.success("📁 Données sauvegardées localement.")
 
         # small download link
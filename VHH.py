@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import uuid
 import os
+from vigior_models import get_model
 
 # ------------------------------------------------------
 # CONFIGURATION
@@ -35,32 +36,11 @@ def generate_patient_code(prefix="H"):
 # RISK MODEL (placeholder)
 # ------------------------------------------------------
 
+SCORING_MODEL = get_model("neer", 1)
+
+
 def compute_risks(data):
-    age = data["age"]
-    neer = data["neer"]
-    displacement = data["displacement"]
-
-    necrose = min(90, 8 + age * 0.35 + neer * 10)
-    pseudo = min(75, displacement * 3 + neer * 8)
-    stiff = min(70, 5 + age * 0.25)
-
-    score = (necrose + pseudo + stiff) / 3
-
-    if neer >= 3:
-        conduct = "Ostéosynthèse recommandée (ou prothèse selon âge et mobilité)."
-        reason = "Fracture multi-fragmentaire avec risque élevé de complications."
-    else:
-        conduct = "Traitement conservateur envisageable."
-        reason = "Fracture peu déplacée avec bon potentiel fonctionnel."
-
-    return {
-        "score": round(score, 1),
-        "necrose": round(necrose, 1),
-        "pseudoarthrose": round(pseudo, 1),
-        "raideur": round(stiff, 1),
-        "suggestion": conduct,
-        "reason": reason
-    }
+    return SCORING_MODEL.score(age=data["age"], neer=data["neer"], displacement=data["displacement"])
 
 # ------------------------------------------------------
 # HOME PAGE WITH LARGE CARDS
@@ -1,55 +1,29 @@
 import streamlit as st
-import uuid
 import pandas as pd
-import os
 
-DATAFILE = "vigior_data.csv"
+from vigior_engine import get_engine
+from vigior_models import get_model
+
+ENGINE = get_engine()  # partition humerus_neer : vigior_data.csv
 
 # -----------------------------------------------------
 # UTILITIES
 # -----------------------------------------------------
 
 def load_data():
-    if not os.path.exists(DATAFILE):
+    if not ENGINE.exists("humerus_neer"):
         return pd.DataFrame()
-    return pd.read_csv(DATAFILE)
-
-def save_data(df):
-    df.to_csv(DATAFILE, index=False)
+    return ENGINE.load("humerus_neer")
 
-def generate_patient_code(prefix="H"):
-    number = str(len(load_data()) + 1).zfill(3)
-    return f"{prefix}-{number}"
+def generate_patient_code():
+    return ENGINE.next_id("humerus_neer")
 
 # Basic mock “risk model” – replace later with real meta-analysis data
+SCORING_MODEL = get_model("neer", 2)
+
+
 def compute_risks(data):
-    age = data["age"]
-    neer = data["neer"]
-    displacement = data["displacement"]
-
-    # Mock logic
-    necrose = min(95, 10 + age * 0.4 + neer * 8)
-    pseudoarthrose = min(80, 5 + displacement * 4 + neer * 5)
-    raideur = min(70, 10 + age * 0.2)
-
-    global_score = (necrose + pseudoarthrose + raideur) / 3
-
-    # Suggested management (mock rules)
-    if neer >= 3 or displacement > 5:
-        suggestion = "Traitement chirurgical recommandé (ostéosynthèse ou prothèse selon âge et mobilité)."
-        reason = "Fragments multiples / déplacement important → risque élevé d’échec conservateur."
-    else:
-        suggestion = "Traitement conservateur envisageable."
-        reason = "Fracture peu déplacée avec bon profil fonctionnel."
-
-    return {
-        "score": round(global_score, 2),
-        "necrose": round(necrose, 1),
-        "pseudoarthrose": round(pseudoarthrose, 1),
-        "raideur": round(raideur, 1),
-        "suggestion": suggestion,
-        "reason": reason
-    }
+    return SCORING_MODEL.score(age=data["age"], neer=data["neer"], displacement=data["displacement"])
 
 
 # -----------------------------------------------------
@@ -151,13 +125,11 @@ def shoulder_form():
         notes = st.text_area("Compte-rendu / évolution clinique", height=200)
 
         if st.button("Save patient"):
-            df = load_data()
             entry = data.copy()
             entry.update(result)
             entry["code"] = code
             entry["notes"] = notes
-            df = pd.concat([df, pd.DataFrame([entry])], ignore_index=True)
-            save_data(df)
+            ENGINE.append("humerus_neer", entry)
             st.success("Patient enregistré.")
 
 
@@ -1,8 +1,13 @@
 import streamlit as st
-import pandas as pd
-import os
 import uuid
 
+from vigior_engine import get_engine
+from vigior_models import get_model
+
+ENGINE = get_engine()
+SCORING_MODEL = get_model("sdl")
+REGISTRY = ENGINE.store("tibial_plateau")  # partition vigior_database.csv
+
 st.set_page_config(page_title="VIGIOR Simple", layout="centered")
 
 st.title("🦾 VIGIOR — Évaluation du Risque de Syndrome de Loges")
@@ -20,14 +25,7 @@ with st.form("vigior_form"):
 
 if submitted:
     # --- Calcul du score ---
-    score = 0
-    if age < 40: score += 2
-    elif age < 60: score += 1
-    if sexe == "Homme": score += 1
-    if schatzker >= 5: score += 3
-    if n_fragments >= 3: score += 2
-    if largeur >= 30: score += 2
-    if ratio < 1.0: score += 3
+    score = SCORING_MODEL.scalar(age, sexe, schatzker, n_fragments, largeur, ratio)
 
     risque = round((score / 15) * 100, 1)
 
@@ -63,13 +61,7 @@ if submitted:
         'outcome_reel': None
     }
 
-    df_new = pd.DataFrame([data])
-    if os.path.exists("vigior_database.csv"):
-        df_old = pd.read_csv("vigior_database.csv")
-        df = pd.concat([df_old, df_new], ignore_index=True)
-    else:
-        df = df_new
-    df.to_csv("vigior_database.csv", index=False)
+    ENGINE.append("tibial_plateau", data)
 
 # --- Section ajout retour clinique ---
 st.markdown("---")
@@ -80,11 +72,9 @@ with st.form("retour_form"):
     retour_submitted = st.form_submit_button("Ajouter le retour")
 
 if retour_submitted:
-    if os.path.exists("vigior_database.csv"):
-        df = pd.read_csv("vigior_database.csv")
-        if code in df['code_patient'].values:
-            df.loc[df['code_patient'] == code, 'outcome_reel'] = retour
-            df.to_csv("vigior_database.csv", index=False)
+    if REGISTRY.exists():
+        # Patch d'un seul patient, sans relire ni réécrire la base
+        if REGISTRY.update(code, {'outcome_reel': retour}):
             st.success(f"✅ Retour ajouté pour le patient {code}")
         else:
             st.error("❌ Code patient introuvable.")
@@ -1,5 +1,7 @@
 import streamlit as st
 
+from vigior_models import get_model
+
 st.title("VIGIOR Simplifié - Prédiction du risque de syndrome de loge")
 
 st.write("Entrez les paramètres pour estimer le risque et la prise en charge adaptée.")
@@ -12,49 +14,8 @@ n_fragments = st.number_input("Nombre de fragments osseux", min_value=1, max_val
 largeur_fracture_mm = st.number_input("Largeur de la fracture (mm)", min_value=1.0, max_value=100.0, value=15.0)
 ratio_muscle_graisse = st.slider("Ratio muscle/graisse (%)", 0, 100, 60)
 
-# Calcul de risque (formule fictive simplifiée inspirée des études)
-score = 0
-
-# Age
-if age < 30:
-    score += 1
-elif age < 60:
-    score += 2
-else:
-    score += 3
-
-# Sexe
-if sexe == "Masculin":
-    score += 2
-else:
-    score += 1
-
-# Schatzker
-score += schatzker  # Plus élevé = plus risqué
-
-# Nombre de fragments
-if n_fragments <= 3:
-    score += 1
-elif n_fragments <= 6:
-    score += 2
-else:
-    score += 3
-
-# Largeur fracture
-if largeur_fracture_mm < 10:
-    score += 1
-elif largeur_fracture_mm < 30:
-    score += 2
-else:
-    score += 3
-
-# Ratio muscle/graisse
-if ratio_muscle_graisse > 70:
-    score += 1
-elif ratio_muscle_graisse > 40:
-    score += 2
-else:
-    score += 3
+# Calcul de risque (formule fictive simplifiée inspirée des études) : modèle "sdl_simplified" (vigior_models.py)
+score = get_model("sdl_simplified").scalar(age, sexe, schatzker, n_fragments, largeur_fracture_mm, ratio_muscle_graisse)
 
 # Normalisation du score max possible = 17
 risque = min(score / 17, 1.0)
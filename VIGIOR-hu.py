@@ -1,46 +1,10 @@
 import streamlit as st
+from vigior_counterfactual import surgical_risks
+from vigior_models import get_model
 
-def calcul_risque(age, tabac_pa, nb_fragments, angle_hsa, deplacement):
-    """
-    Calculs simplifiés et fictifs des risques (%) basés sur les paramètres.
-    En vrai, on utilisera un modèle statistique basé sur les données extraites.
-    """
-    risque_necrose = 0
-    risque_pseudarthrose = 0
-    risque_raideur = 0
-
-    if age > 65:
-        risque_necrose += 25
-    if tabac_pa > 10:
-        risque_necrose += 20
-    if nb_fragments > 3:
-        risque_necrose += 15
-    if angle_hsa < 120 or angle_hsa > 150:
-        risque_necrose += 15
-    if deplacement > 5:
-        risque_necrose += 10
-
-    if age < 50:
-        risque_pseudarthrose += 20
-    if tabac_pa > 5:
-        risque_pseudarthrose += 20
-    if nb_fragments > 4:
-        risque_pseudarthrose += 25
-    if deplacement > 5:
-        risque_pseudarthrose += 15
-
-    if age > 60:
-        risque_raideur += 30
-    if deplacement > 5:
-        risque_raideur += 20
-    if nb_fragments > 3:
-        risque_raideur += 20
-
-    risque_necrose = min(risque_necrose, 90)
-    risque_pseudarthrose = min(risque_pseudarthrose, 90)
-    risque_raideur = min(risque_raideur, 90)
-
-    return risque_necrose, risque_pseudarthrose, risque_raideur
+# Modèle "vigior_hu" du registre partagé (vigior_models.py)
+SCORING_MODEL = get_model("vigior_hu")
+calcul_risque = SCORING_MODEL.scalar
 
 def proposition_traitement(age, risque_necrose, risque_pseudarthrose, risque_raideur):
     seuil_arthroplastie = 50
@@ -91,10 +55,12 @@ def main():
         st.markdown(f"- Pseudarthrose : {risque_pseudarthrose}%")
         st.markdown(f"- Raideur fonctionnelle : {risque_raideur}%")
 
+        necrose_chir, pseudarthrose_chir, raideur_chir = surgical_risks(
+            risque_necrose, risque_pseudarthrose, risque_raideur)
         st.markdown("**Réduction chirurgicale et ostéosynthèse :**")
-        st.markdown(f"- Nécrose de la tête humérale : {max(risque_necrose - 15, 5)}%")
-        st.markdown(f"- Pseudarthrose : {max(risque_pseudarthrose - 20, 5)}%")
-        st.markdown(f"- Raideur fonctionnelle : {max(risque_raideur - 10, 5)}%")
+        st.markdown(f"- Nécrose de la tête humérale : {necrose_chir}%")
+        st.markdown(f"- Pseudarthrose : {pseudarthrose_chir}%")
+        st.markdown(f"- Raideur fonctionnelle : {raideur_chir}%")
 
         traitement, raison = proposition_traitement(age, risque_necrose, risque_pseudarthrose, risque_raideur)
 
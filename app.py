@@ -1,11 +1,17 @@
 # app.py
 
+import os
+
 import streamlit as st
-import joblib
-import numpy as np
 
-# Charger le modèle
-model = joblib.load("model_loges.pkl")
+from vigior_features import SCHATZKER, FeatureTransformer
+from vigior_serving import get_predictor
+
+# Modèle chargé une seule fois par processus (partagé entre reruns et sessions) ;
+# forêt exportée à plat par train_model_loges.py si elle existe (inférence NumPy, sans sklearn)
+model = get_predictor("model_loges.forest" if os.path.isdir("model_loges.forest") else "model_loges.pkl")
+# Transformation sauvegardée avec le modèle ; modèle plus ancien : codes Schatzker I..VI -> 0..5
+features = model.features or FeatureTransformer(SCHATZKER)
 
 # Titre de l'app
 st.title("🧠 VIGIOR — Prédiction du syndrome de loges")
@@ -16,19 +22,16 @@ st.write("Remplissez les informations du patient pour estimer le risque de syndr
 age = st.slider("Âge", 10, 90, 35)
 sexe = st.radio("Sexe", ["H", "F"])
 energie = st.radio("Type de traumatisme", ["haute", "basse"])
-pression_diast = st.slider("Pression diastolique", 40, 120, 80)
-fracture_type = st.selectbox("Type de fracture", ["Schatzker I", "II", "III", "IV", "V", "VI"])
+polytrauma = st.radio("Polytraumatisme", ["Non", "Oui"])
+fracture_type = st.selectbox("Type de fracture", features.labels("fracture_type"))
 nb_fragments = st.slider("Nombre de fragments osseux", 1, 10, 3)
 largeur = st.slider("Largeur de l’hématome (en mm)", 0, 100, 25)
 ratio_muscle_graisse = st.slider("Ratio muscle/graisse", 0.1, 5.0, 1.5)
 
-# Convertir les inputs
-sexe_val = 1 if sexe == "H" else 0
-energie_val = 1 if energie == "haute" else 0
-fracture_code = {"Schatzker I": 0, "II": 1, "III": 2, "IV": 3, "V": 4, "VI": 5}[fracture_type]
-
-# Créer un tableau pour le modèle
-X_input = np.array([[age, sexe_val, energie_val, pression_diast, fracture_code, nb_fragments, largeur, ratio_muscle_graisse]])
+# Créer un tableau pour le modèle (même transformation qu'à l'entraînement)
+X_input = features.transform_one(age=age, sexe=sexe, energie=energie, polytrauma=int(polytrauma == "Oui"),
+                                 fracture_type=fracture_type, fragments=nb_fragments, largeur_hematome=largeur,
+                                 ratio_muscle_graisse=ratio_muscle_graisse)
 
 # Prédire
 if st.button("📊 Estimer le risque"):
@@ -41,3 +44,7 @@ if st.button("📊 Estimer le risque"):
     else:
         st.info("✅ Risque faible — continuer la surveillance standard.")
 
+    metrics = model.metrics()
+    st.caption(f"Modèle chargé en {metrics['load_ms']:.0f} ms (une fois par processus) ; "
+               f"prédiction médiane {metrics['latency_p50_ms']:.1f} ms sur {metrics['predictions']} appel(s).")
+
@@ -1,29 +1,78 @@
 # train_model_loges.py
+#
+#   python train_model_loges.py                      # forêt n_estimators=100, coupe 80/20
+#   python train_model_loges.py --search             # validation croisée + grille (vigior_training)
+#   python train_model_loges.py --stream             # lecture par morceaux, mémoire bornée (gros CSV)
+
+import argparse
+import sys
 
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 import joblib
 
-# Charger les données
-df = pd.read_csv("vigior_base_donnees.csv")
+from vigior_features import FeatureTransformer, features_path
+from vigior_forest import export_forest
+from vigior_training import CACHE_DIR, CHUNKSIZE, FOLDS, LEADERBOARD, fit_best, search, train_streaming
+
+parser = argparse.ArgumentParser(description="Entraînement du modèle de loges (app.py).")
+mode = parser.add_mutually_exclusive_group()
+mode.add_argument("--search", action="store_true",
+                  help="recherche n_estimators / max_depth / min_samples_leaf en validation croisée stratifiée")
+mode.add_argument("--stream", action="store_true",
+                  help="forêt construite morceau par morceau, sans charger tout le CSV")
+parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="lignes par morceau (--stream)")
+parser.add_argument("--folds", type=int, default=FOLDS)
+parser.add_argument("--workers", type=int, help="processus pour les essais (défaut : tous les cœurs)")
+parser.add_argument("--leaderboard", default=LEADERBOARD, help="classement CSV des essais")
+parser.add_argument("--cache", default=CACHE_DIR, help="cache des essais (vide : désactivé)")
+args = parser.parse_args()
 
-# Encodage simple des variables catégorielles
-df["sexe"] = df["sexe"].map({"H": 1, "F": 0})
-df["energie"] = df["energie"].map({"haute": 1, "basse": 0})
-df["fracture_type"] = df["fracture_type"].astype('category').cat.codes
+if args.stream:
+    # Même encodage, appliqué morceau par morceau avec les catégories du fichier entier
+    result = train_streaming("vigior_base_donnees.csv", chunksize=args.chunksize, n_estimators=100)
+    model, transformer = result.model, result.transformer
+    print(f"✅ {result.rows} lignes en {result.chunks} morceau(x) de {args.chunksize}, "
+          f"{len(model.estimators_)} arbres, {result.seconds:.1f} s")
+else:
+    # Charger les données
+    df = pd.read_csv("vigior_base_donnees.csv")
 
-# Définir les variables
-X = df.drop("SdL", axis=1)
-y = df["SdL"]
+    # Transformation des variables ajustée ici, sauvegardée avec le modèle (app.py l'applique telle quelle)
+    transformer = FeatureTransformer.fit(df)
 
-# Séparer en jeu d'entraînement et test
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Définir les variables
+    X = transformer.frame(df)
+    y = df["SdL"]
 
-# Entraîner le modèle
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
+    if args.search:
+        # Validation croisée de toute la grille, puis meilleure combinaison ajustée sur toutes les données
+        try:
+            result = search(X, y, folds=args.folds, workers=args.workers, cache_dir=args.cache or None)
+        except ValueError as e:
+            print(f"❌ Recherche impossible : {e}")
+            sys.exit(1)
+        board = result.leaderboard()
+        board.to_csv(args.leaderboard, index=False)
+        print(board.head(10).round(4).to_string(index=False))
+        print(f"✅ {len(board)} essais ({result.cached} en cache) en {result.seconds:.1f} s, "
+              f"classement dans {args.leaderboard}")
+        model = fit_best(X, y, result)
+        print(f"✅ Meilleure combinaison : {result.best_params}")
+    else:
+        # Séparer en jeu d'entraînement et test
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# Sauvegarder le modèle
+        # Entraîner le modèle
+        model = RandomForestClassifier(n_estimators=100, random_state=42)
+        model.fit(X_train, y_train)
+
+# Sauvegarder le modèle (transformation d'abord : get_predictor recharge sur changement du modèle)
+transformer.save(features_path("model_loges.pkl"))
 joblib.dump(model, "model_loges.pkl")
-print("✅ Modèle entraîné et sauvegardé dans model_loges.pkl")
+print("✅ Modèle entraîné et sauvegardé dans model_loges.pkl (+ model_loges.features.json)")
+
+# Export à plat pour l'inférence sans sklearn (app.py, vigior_forest)
+forest = export_forest(model, "model_loges.forest", features=transformer)
+print(f"✅ Forêt exportée dans model_loges.forest ({forest.n_trees} arbres, {forest.nbytes / 1e6:.1f} Mo)")
@@ -0,0 +1,98 @@
+# vigior_columnar.py
+"""
+Snapshot colonnaire du registre (un fichier .npy par colonne).
+
+Les pages d'analyse n'ont besoin que de quelques colonnes (Age, Fragments, HSA,
+BoneQuality...). Chaque colonne est stockée séparément et chargée en
+memory-map (np.load(mmap_mode="r")) : seules les colonnes demandées sont lues,
+les longs textes (Justification, Notes) ne sont jamais parsés pour rien.
+
+Colonnes numériques -> tableau float64 / int64
+Autres colonnes     -> codes catégoriels int32 + <col>.categories.json
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+META_FILE = "_meta.json"
+
+
+def _safe_name(column):
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(column))
+
+
+def write_columnar(df, directory, source_path=None):
+    """Écrit df en snapshot colonnaire dans directory (remplacement atomique des métadonnées)."""
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+    for i, col in enumerate(df.columns):
+        name = f"{i:03d}_{_safe_name(col)}"
+        values = df[col]
+        if pd.api.types.is_bool_dtype(values) or not pd.api.types.is_numeric_dtype(values):
+            cat = pd.Categorical(values.astype("object").where(values.notna(), None))
+            np.save(os.path.join(directory, name + ".npy"), cat.codes.astype(np.int32))
+            with open(os.path.join(directory, name + ".categories.json"), "w", encoding="utf-8") as f:
+                json.dump([v if isinstance(v, str) else str(v) for v in cat.categories], f, ensure_ascii=False)
+            columns.append({"name": col, "file": name, "kind": "category"})
+        else:
+            np.save(os.path.join(directory, name + ".npy"), values.to_numpy())
+            columns.append({"name": col, "file": name, "kind": "numeric"})
+
+    meta = {"rows": len(df), "columns": columns}
+    if source_path is not None and os.path.exists(source_path):
+        stat = os.stat(source_path)
+        meta["source_mtime_ns"] = stat.st_mtime_ns
+        meta["source_size"] = stat.st_size
+    tmp_path = os.path.join(directory, META_FILE + f".tmp-{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, META_FILE))
+
+
+def read_meta(directory):
+    path = os.path.join(directory, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_fresh(directory, source_path):
+    """Vrai si le snapshot colonnaire correspond au CSV source actuel."""
+    meta = read_meta(directory)
+    if meta is None or not os.path.exists(source_path):
+        return False
+    stat = os.stat(source_path)
+    return meta.get("source_mtime_ns") == stat.st_mtime_ns and meta.get("source_size") == stat.st_size
+
+
+def read_columnar(directory, columns=None, rows=None):
+    """
+    Retourne un DataFrame limité aux colonnes demandées (tableaux memory-mappés) ;
+    rows : positions des lignes à lire (seules ces lignes sont copiées et décodées).
+    """
+    meta = read_meta(directory)
+    if meta is None:
+        return pd.DataFrame(columns=columns)
+    wanted = None if columns is None else set(columns)
+    data = {}
+    for entry in meta["columns"]:
+        if wanted is not None and entry["name"] not in wanted:
+            continue
+        arr = np.load(os.path.join(directory, entry["file"] + ".npy"), mmap_mode="r")
+        if rows is not None:
+            arr = arr[rows]
+        if entry["kind"] == "category":
+            with open(os.path.join(directory, entry["file"] + ".categories.json"), "r", encoding="utf-8") as f:
+                categories = json.load(f)
+            # Décodage en objets Python (compatible .fillna / .str comme une colonne lue du CSV)
+            lookup = np.array(categories + [None], dtype=object)
+            data[entry["name"]] = lookup[np.asarray(arr)]
+        else:
+            data[entry["name"]] = arr
+    df = pd.DataFrame(data, copy=False)
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
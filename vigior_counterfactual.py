@@ -0,0 +1,294 @@
+# vigior_counterfactual.py
+"""
+Risques contrefactuels par bras de traitement, matérialisés pour tout le registre.
+
+VH01.py affiche les risques orthopédique / chirurgical (ortho_necrose,
+chir_necrose...) du seul patient saisi, et VIGIOR-hu.py calcule en ligne les
+risques après chirurgie (max(risque - 15, 5)...). Ici, les deux modèles sont
+évalués en un seul passage vectoriel sur tous les patients de la partition
+humerus_interactive (vigior_humerus_db.csv, VH01) :
+
+    <complication>_ortho, <complication>_chir              modèle vh01
+    <complication>_conservateur, <complication>_osteosynthese   modèle vigior_hu
+    gain_<complication>_vh01, gain_<complication>_hu      points de risque évités par la chirurgie
+
+La table est écrite en snapshot colonnaire (vigior_columnar, une génération
+par calcul, bascule atomique) avec, pour chaque colonne numérique, l'ordre
+de tri : un filtre « gain_necrose_hu > 20 » est une recherche dichotomique
+(np.searchsorted) au lieu d'une boucle sur les lignes. Elle est recalculée
+quand le registre (snapshot + journal) ou la version d'un modèle change.
+
+    table = counterfactual_table()
+    table.select(gain_necrose_hu=(">", 20), age=(">=", 70))
+
+    python vigior_counterfactual.py 1000000     # vérification + benchmark
+"""
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from vigior_columnar import read_columnar, write_columnar
+from vigior_models import get_model
+from vigior_storage import file_lock
+
+SUFFIX = ".counterfactual"
+CURRENT_FILE = "CURRENT.json"
+COMPLICATIONS = ["necrose", "pseudo", "raideur"]
+OPERATORS = (">", ">=", "<", "<=", "==")
+
+# Risques après réduction chirurgicale et ostéosynthèse (VIGIOR-hu.py) : points retirés, plancher
+VIGIOR_HU_SURGERY = ((15, 20, 10), 5)
+
+# Entrées de VH01 conservées dans la table (filtres usuels sans jointure)
+INPUT_COLUMNS = ["age", "sexe", "n_fragments", "HSA"]
+
+
+def surgical_risks(risque_necrose, risque_pseudarthrose, risque_raideur):
+    """Risques de VIGIOR-hu.py après ostéosynthèse (scalaires ou tableaux)."""
+    (d_nec, d_pseu, d_raid), floor = VIGIOR_HU_SURGERY
+    if np.ndim(risque_necrose) == 0:
+        return (max(risque_necrose - d_nec, floor), max(risque_pseudarthrose - d_pseu, floor),
+                max(risque_raideur - d_raid, floor))
+    return (np.maximum(risque_necrose - d_nec, floor), np.maximum(risque_pseudarthrose - d_pseu, floor),
+            np.maximum(risque_raideur - d_raid, floor))
+
+
+def counterfactual_frame(df, key="code_patient"):
+    """Registre VH01 (colonnes de vigior_humerus_db.csv) -> risques de chaque bras, un passage NumPy."""
+    age = pd.to_numeric(df["age"], errors="coerce").to_numpy(dtype=float)
+    pa = pd.to_numeric(df["PA"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    n_fragments = pd.to_numeric(df["n_fragments"], errors="coerce").to_numpy(dtype=float)
+    hsa = pd.to_numeric(df["HSA"], errors="coerce").to_numpy(dtype=float)
+    fumeur, ecart, luxation, osteoporose = (df[c].astype(object).to_numpy()
+                                            for c in ("fumeur", "ecart_interfragmentaire", "luxation", "osteoporose"))
+
+    vh = get_model("vh01").batch(age, fumeur, pa, n_fragments, hsa, ecart, luxation, osteoporose)
+    # ecart_interfragmentaire = « écart > 5 mm » (Oui / Non) : vigior_hu ne compare l'écart qu'à 5 mm
+    deplacement = np.where(ecart == "Oui", 6.0, 0.0)
+    hu = get_model("vigior_hu").batch(age, pa, n_fragments, hsa, deplacement)
+    conservateur = (hu["risque_necrose"], hu["risque_pseudarthrose"], hu["risque_raideur"])
+    osteosynthese = surgical_risks(*conservateur)
+
+    out = {key: df[key].astype(str).to_numpy(dtype=object)}
+    for col in INPUT_COLUMNS:
+        out[col] = df[col].to_numpy() if col == "sexe" else pd.to_numeric(df[col], errors="coerce").to_numpy()
+    for i, c in enumerate(COMPLICATIONS):
+        ortho = vh[f"risque_{c}_ortho"].astype(float)
+        chir = vh[f"risque_{c}_chir"].astype(float)
+        out[f"{c}_ortho"] = ortho
+        out[f"{c}_chir"] = chir
+        out[f"{c}_conservateur"] = conservateur[i].astype(float)
+        out[f"{c}_osteosynthese"] = osteosynthese[i].astype(float)
+        out[f"gain_{c}_vh01"] = ortho - chir
+        out[f"gain_{c}_hu"] = out[f"{c}_conservateur"] - out[f"{c}_osteosynthese"]
+    return pd.DataFrame(out, index=df.index)
+
+
+# -----------------------
+# Table matérialisée
+# -----------------------
+def _models_signature():
+    return {name: get_model(name).version for name in ("vh01", "vigior_hu")}
+
+
+class CounterfactualTable:
+    """
+    Table matérialisée d'un registre : <registre>.counterfactual/<génération>/ (snapshot
+    colonnaire + ordre de tri de chaque colonne numérique), CURRENT.json désigne la génération lue.
+    """
+
+    def __init__(self, store, key="code_patient"):
+        self.store = store
+        self.key = key
+        self.directory = store.path + SUFFIX
+        self._loaded = None          # (génération, DataFrame memory-mappé)
+
+    def _current(self):
+        path = os.path.join(self.directory, CURRENT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def is_fresh(self):
+        current = self._current()
+        return (current is not None and current["registry_version"] == json.loads(json.dumps(self.store.version()))
+                and current["models"] == _models_signature())
+
+    def refresh(self, force=False):
+        """Recalcule la table si le registre ou un modèle a changé ; retourne True si elle a été réécrite."""
+        with file_lock(self.directory):
+            if not force and self.is_fresh():
+                return False
+            start = time.perf_counter()
+            previous = self._current()
+            version = self.store.version()
+            table = counterfactual_frame(self.store.load(), key=self.key).reset_index(drop=True)
+            generation = f"g{time.time_ns()}"
+            path = os.path.join(self.directory, generation)
+            write_columnar(table, path)
+            for col in table.columns:
+                if pd.api.types.is_numeric_dtype(table[col]):
+                    values = table[col].to_numpy(dtype=float)
+                    # Valeurs manquantes hors de l'index : aucune comparaison ne les retient
+                    order = np.flatnonzero(~np.isnan(values))
+                    order = order[np.argsort(values[order], kind="stable")]
+                    np.save(os.path.join(path, f"{col}.order.npy"), order)
+                    np.save(os.path.join(path, f"{col}.sorted.npy"), values[order])
+            current = {"generation": generation, "registry_version": version, "models": _models_signature(),
+                       "rows": len(table), "seconds": round(time.perf_counter() - start, 3)}
+            tmp_path = os.path.join(self.directory, CURRENT_FILE + f".tmp-{os.getpid()}")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(current, f)
+            os.replace(tmp_path, os.path.join(self.directory, CURRENT_FILE))
+            # La génération précédente reste jusqu'au prochain refresh (lecteurs en cours de bascule) ;
+            # les plus anciennes sont supprimées, les memory-maps ouverts gardent leurs fichiers
+            keep = {generation, previous["generation"] if previous else None}
+            for name in os.listdir(self.directory):
+                if name.startswith("g") and name not in keep:
+                    shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+            return True
+
+    def _generation(self):
+        current = self._current()
+        if current is None:
+            raise FileNotFoundError(f"Table contrefactuelle absente : {self.directory} (refresh())")
+        return current["generation"]
+
+    def _read(self, read):
+        """(génération, read(répertoire)) ; relit CURRENT.json si la génération disparaît pendant la lecture."""
+        for attempt in range(3):
+            generation = self._generation()
+            path = os.path.join(self.directory, generation)
+            try:
+                if not os.path.isdir(path):
+                    raise FileNotFoundError(path)
+                return generation, read(path)
+            except FileNotFoundError:
+                # Génération remplacée par un refresh concurrent : relire CURRENT.json
+                if attempt == 2:
+                    raise
+
+    def frame(self, columns=None):
+        """Table complète (colonnes memory-mappées)."""
+        if columns is not None:
+            return self._read(lambda path: read_columnar(path, columns))[1]
+        loaded = self._loaded
+        if loaded is None or loaded[0] != self._generation():
+            loaded = self._loaded = self._read(read_columnar)
+        return loaded[1]
+
+    def where(self, column, op, value):
+        """Positions des lignes vérifiant column <op> value (index trié, aucune boucle sur les lignes)."""
+        if op not in OPERATORS:
+            raise ValueError(f"Opérateur inconnu : {op} ({', '.join(OPERATORS)})")
+
+        def index(path):
+            if not os.path.exists(os.path.join(path, f"{column}.order.npy")) and os.path.isdir(path):
+                raise KeyError(f"Colonne non indexée : {column}")
+            return (np.load(os.path.join(path, f"{column}.order.npy"), mmap_mode="r"),
+                    np.load(os.path.join(path, f"{column}.sorted.npy"), mmap_mode="r"))
+
+        order, values = self._read(index)[1]
+        # Générations écrites avant l'exclusion des NaN : ceux-ci sont triés en fin d'index
+        end = int(np.searchsorted(values, np.nan, side="left"))
+        lo = min(int(np.searchsorted(values, value, side="left")), end)
+        hi = min(int(np.searchsorted(values, value, side="right")), end)
+        bounds = {">": (hi, end), ">=": (lo, end), "<": (0, lo), "<=": (0, hi), "==": (lo, hi)}[op]
+        return np.sort(order[bounds[0]:bounds[1]])
+
+    def select(self, columns=None, **conditions):
+        """Lignes vérifiant toutes les conditions : select(gain_necrose_hu=(">", 20), age=(">=", 70))."""
+        rows = None
+        for column, (op, value) in conditions.items():
+            found = self.where(column, op, value)
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+        df = self.frame(columns)
+        return df if rows is None else df.iloc[rows]
+
+
+_TABLES = {}
+
+
+def counterfactual_table(partition="humerus_interactive", refresh=True):
+    """Table de la partition (une instance par processus), rafraîchie si le registre a changé."""
+    from vigior_engine import get_engine
+
+    engine = get_engine()
+    if partition not in _TABLES:
+        _TABLES[partition] = CounterfactualTable(engine.store(partition), key=engine.partitions[partition].key)
+    table = _TABLES[partition]
+    if refresh:
+        table.refresh()
+    return table
+
+
+# -----------------------
+# Vérification / benchmark
+# -----------------------
+def random_registry(n, seed=0):
+    """Registre VH01 synthétique (domaines du formulaire)."""
+    sample = get_model("vh01").sample(n, seed)
+    return pd.DataFrame({
+        "code_patient": [f"VIGH-{i:08d}" for i in range(n)], "age": sample["age"], "sexe": "Homme",
+        "fumeur": sample["fumeur"], "PA": np.where(sample["fumeur"] == "Oui", sample["pa"], 0),
+        "n_fragments": sample["n_fragments"], "HSA": sample["hsa"], "ecart_interfragmentaire": sample["ecart"],
+        "luxation": sample["luxation"], "osteoporose": sample["osteoporosis"],
+    })
+
+
+def verify(df):
+    """Compare la table aux fonctions scalaires (vh01_risks, vigior_hu_risks + réductions de VIGIOR-hu.py)."""
+    table = counterfactual_frame(df)
+    vh01, hu = get_model("vh01").scalar, get_model("vigior_hu").scalar
+    mismatches = 0
+    for r, t in zip(df.itertuples(index=False), table.itertuples(index=False)):
+        ortho_chir = vh01(r.age, r.fumeur, r.PA, r.n_fragments, r.HSA, r.ecart_interfragmentaire, r.luxation,
+                          r.osteoporose)
+        conservateur = hu(r.age, r.PA, r.n_fragments, r.HSA, 6 if r.ecart_interfragmentaire == "Oui" else 0)
+        expected = list(ortho_chir) + list(conservateur) + list(surgical_risks(*conservateur))
+        got = ([getattr(t, f"{c}_ortho") for c in COMPLICATIONS] + [getattr(t, f"{c}_chir") for c in COMPLICATIONS]
+               + [getattr(t, f"{c}_conservateur") for c in COMPLICATIONS]
+               + [getattr(t, f"{c}_osteosynthese") for c in COMPLICATIONS])
+        if expected != got:
+            mismatches += 1
+    return mismatches
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    from vigior_storage import open_registry
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    bad = verify(random_registry(20000, seed=1))
+    print(f"table == fonctions scalaires : {bad} écart(s) / 20000")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = open_registry(os.path.join(tmp, "vigior_humerus_db.csv"), key="code_patient")
+        store.write_snapshot(random_registry(n))
+        table = CounterfactualTable(store)
+        start = time.perf_counter()
+        table.refresh()
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        fresh = not table.refresh()
+        check = time.perf_counter() - start
+
+        df = table.frame()
+        start = time.perf_counter()
+        hits = table.select(gain_necrose_hu=(">=", 15), age=(">=", 70))
+        indexed = time.perf_counter() - start
+        start = time.perf_counter()
+        scanned = [i for i, (g, a) in enumerate(zip(df["gain_necrose_hu"], df["age"])) if g >= 15 and a >= 70]
+        loop = time.perf_counter() - start
+        same = list(hits.index) == scanned
+        print(f"{n} patients : table {built:.1f} s, contrôle de fraîcheur {check * 1000:.1f} ms ({'à jour' if fresh else 'recalculée'})")
+        print(f"gain_necrose_hu >= 15 et age >= 70 : {len(hits)} patients, index {indexed * 1000:.1f} ms, "
+              f"boucle Python {loop * 1000:.0f} ms, identiques : {same}")
+    sys.exit(0 if bad == 0 and fresh and same else 1)
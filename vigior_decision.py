@@ -0,0 +1,379 @@
+# vigior_decision.py
+"""
+Tables de décision de propose_treatment, évaluées en lot.
+
+Chaque propose_treatment(...) des pages est une cascade de if/elif. Ici la
+même cascade est une liste ORDONNÉE de règles (identifiant, condition,
+traitement, justification) : la première règle vraie l'emporte, comme dans le
+code scalaire. Les conditions sont des expressions NumPy, donc toute une
+cohorte est évaluée en une passe (np.select) au lieu d'une boucle Python.
+
+Tables disponibles :
+    vigior_h   AVGH01.py, AVGH*.py, AmineVG.py (bilingue, tr())
+    amine01    AMINE01.py (vigior_h + règles de repli S_AVN >= 40 ou fragments >= 3)
+    amin       AMIN.py (libellés français, règles de repli)
+    ami        AMI.py (tubérosités irréparables, repli selon âge / comorbidités)
+
+ami_table(avn, fix, residual) construit la table AMI.py avec d'autres seuils
+(simulation de politiques, vigior_policy.py).
+
+Vérification contre les fonctions scalaires des pages + benchmark :
+    python vigior_decision.py 100000
+"""
+import ast
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from vigior_scoring import as_flag, compute_scores_batch, random_cohort
+
+
+class Rule:
+    """Règle de décision : when(ctx) -> tableau bool ; libellés (en, fr) ou texte unique."""
+
+    def __init__(self, rule_id, when, treatment, justification):
+        self.rule_id = rule_id
+        self.when = when
+        self.treatment = treatment
+        self.justification = justification
+
+
+def _text(value, lang):
+    if isinstance(value, tuple):
+        return value[0] if lang == "en" else value[1]
+    return value
+
+
+class DecisionTable:
+    """Liste ordonnée de règles + règle par défaut (dernier else de la cascade)."""
+
+    def __init__(self, name, rules, default):
+        self.name = name
+        self.rules = rules
+        self.default = default
+
+    @property
+    def rule_ids(self):
+        return [r.rule_id for r in self.rules] + [self.default.rule_id]
+
+    def select(self, ctx):
+        """Indice de la première règle vraie pour chaque patient (len(rules) = défaut)."""
+        n = len(ctx["age"])
+        conditions = [np.broadcast_to(np.asarray(r.when(ctx), dtype=bool), (n,)) for r in self.rules]
+        if not conditions:
+            return np.full(n, 0)
+        return np.select(conditions, np.arange(len(self.rules)), default=len(self.rules))
+
+    def labels(self, lang="fr"):
+        rules = self.rules + [self.default]
+        return [_text(r.treatment, lang) for r in rules], [_text(r.justification, lang) for r in rules]
+
+
+# -----------------------
+# Contexte vectoriel
+# -----------------------
+def build_context(S_AVN, S_PSEU, S_FAIL_FIX, age, fragments, gap, bone_quality, comorbidities,
+                  tuberosities_irreparable=False):
+    age = np.atleast_1d(np.asarray(age, dtype=float))
+    n = len(age)
+
+    def col(values):
+        return np.broadcast_to(np.asarray(values, dtype=float), (n,))
+
+    S_AVN, S_PSEU, S_FAIL_FIX = col(S_AVN), col(S_PSEU), col(S_FAIL_FIX)
+    tub = as_flag(tuberosities_irreparable) if np.ndim(tuberosities_irreparable) else bool(tuberosities_irreparable)
+    return {
+        "S_AVN": S_AVN, "S_PSEU": S_PSEU, "S_FAIL_FIX": S_FAIL_FIX,
+        "age": age, "f": col(fragments), "gap": col(gap), "comorb": col(comorbidities),
+        "poor": np.broadcast_to(np.asarray(bone_quality, dtype=object) == "poor", (n,)),
+        "tub": np.broadcast_to(tub, (n,)),
+        # Composite recalculé à partir des scores arrondis, comme dans les pages
+        "composite": 0.4 * S_AVN + 0.35 * S_PSEU + 0.25 * S_FAIL_FIX,
+    }
+
+
+# -----------------------
+# Conditions communes
+# -----------------------
+def _conservative_priority(c):
+    return (c["age"] >= 70) & c["poor"] & (c["f"] <= 3) & (c["gap"] <= 5) & (c["S_AVN"] < 60) & (c["S_PSEU"] < 50)
+
+
+def _arthroplasty(c):
+    return (c["S_AVN"] >= 50) | (c["f"] >= 4) | ((c["age"] >= 75) & c["poor"]) | (c["composite"] >= 55)
+
+
+def _rtsa_profile(c):
+    return (c["age"] >= 75) | c["poor"] | (c["comorb"] >= 1)
+
+
+def _orif(c):
+    return (c["S_PSEU"] >= 30) | (c["S_FAIL_FIX"] >= 30) | (c["f"] == 3)
+
+
+def _orif_unless_elderly_poor(c):
+    return _orif(c) & ~(c["poor"] & (c["age"] >= 75))
+
+
+def _augmentation(c):
+    return c["poor"] & (c["age"] < 65)
+
+
+def _im_nailing(c):
+    return (c["f"] <= 2) & (c["S_FAIL_FIX"] < 30) & ~c["poor"]
+
+
+def _conservative_low(c):
+    return (c["S_AVN"] < 25) & (c["S_PSEU"] < 20) & (c["f"] <= 2)
+
+
+def _residual_signal(c):
+    return (c["S_AVN"] >= 40) | (c["f"] >= 3)
+
+
+def _elderly_or_poor(c):
+    return (c["age"] >= 75) | c["poor"]
+
+
+# -----------------------
+# VIGIOR-H (AVGH01.py et variantes bilingues)
+# -----------------------
+_H_ORIF = ("Open reduction internal fixation (ORIF) indicated: significant risk of nonunion/fixation failure but anatomy and bone quality allow reconstruction.",
+           "Ostéosynthèse foyer ouvert (ORIF) indiquée : risque de pseudarthrose/échec de fixation significatif mais anatomie et qualité osseuse permettant reconstruction.")
+_H_AUGMENT = ("Consider augmentation techniques (graft, cement).", "Prévoir techniques d'augmentation (greffe, cimentage, renfort).")
+_H_CONSERVATIVE = ("Conservative treatment", "Traitement orthopédique (conservateur)")
+
+VIGIOR_H = DecisionTable("vigior_h", [
+    Rule("conservative_priority", _conservative_priority, _H_CONSERVATIVE,
+         ("Elderly osteoporotic patient with minimally displaced fracture: meta-analyses show equivalent functional outcomes with fewer complications, conservative approach prioritized.",
+          "Patient âgé avec ostéoporose et fracture peu décalée : méta-analyses montrent des résultats fonctionnels équivalents au traitement chirurgical avec moins de complications — option conservatrice priorisée.")),
+    Rule("arthroplasty_rtsa", lambda c: _arthroplasty(c) & _rtsa_profile(c),
+         ("Arthroplasty (RTSA preferred)", "Arthroplastie (RTSA préféré)"),
+         ("High risk of reconstruction failure in elderly/osteoporotic patients — RTSA often preferred to restore function and reduce reoperation.",
+          "Risque élevé d'échec de reconstruction chez patient âgé/ostéoporotique — RTSA souvent préférable pour restaurer fonction et diminuer reprises.")),
+    Rule("arthroplasty_ha_or_rtsa", _arthroplasty,
+         ("Arthroplasty (HA or RTSA as per-op)", "Arthroplastie (HA ou RTSA selon per-op)"),
+         ("High risk of mechanical complications or uncertain reconstruction; arthroplasty recommended.",
+          "Risque important de complications mécaniques ou reconstruction incertaine ; arthroplastie recommandée.")),
+    Rule("orif_augmentation", lambda c: _orif(c) & _augmentation(c),
+         ("Open reduction internal fixation (ORIF)", "Ostéosynthèse foyer ouvert (ORIF)"),
+         (_H_ORIF[0] + " " + _H_AUGMENT[0], _H_ORIF[1] + " " + _H_AUGMENT[1])),
+    Rule("orif", _orif, ("Open reduction internal fixation (ORIF)", "Ostéosynthèse foyer ouvert (ORIF)"), _H_ORIF),
+    Rule("im_nailing", _im_nailing,
+         ("Closed reduction internal fixation (IM nailing)", "Ostéosynthèse foyer fermé (clou)"),
+         ("Minimally comminuted fracture and good bone quality: intramedullary nail suitable, minimal tissue trauma.",
+          "Fracture peu comminutive et bonne qualité osseuse : clou intramédullaire adapté, moindre traumatisme tissulaire.")),
+    Rule("conservative_low_scores", _conservative_low, _H_CONSERVATIVE,
+         ("Low scores: good candidate for non-operative management.", "Scores faibles : bon candidat pour traitement non opératoire.")),
+], default=Rule("conservative_default", None, _H_CONSERVATIVE,
+                ("Default conservative choice.", "Choix conservateur par défaut.")))
+
+# AMINE01.py : même cascade, suivie des règles de repli (« Last resort ») avant le défaut
+AMINE01 = DecisionTable("amine01", VIGIOR_H.rules + [
+    Rule("fallback_arthroplasty", lambda c: _residual_signal(c) & _elderly_or_poor(c),
+         ("Arthroplasty (per-op type)", "Arthroplastie (type selon per-op)"),
+         ("High-risk signals; arthroplasty preferred for patient profile.",
+          "Signal de risque élevé; arthroplastie privilégiée en raison du profil du patient.")),
+    Rule("fallback_orif", _residual_signal,
+         ("Open reduction internal fixation (ORIF)", "Ostéosynthèse foyer ouvert (ORIF)"),
+         ("Moderate-high risk signals; patient young/good bone → attempt reconstruction.",
+          "Signal de risque modéré-élevé mais patient jeune/osseux correct -> tenter reconstruction.")),
+], default=VIGIOR_H.default)
+
+
+# -----------------------
+# AMIN.py (français)
+# -----------------------
+_AMIN_ORIF = "Ostéosynthèse foyer ouvert (ORIF) indiquée : risque de pseudarthrose/échec de fixation significatif mais anatomie et qualité osseuse permettant reconstruction."
+
+AMIN = DecisionTable("amin", [
+    Rule("conservative_priority", _conservative_priority, "Traitement orthopédique (conservateur)",
+         "Patient âgé avec ostéoporose et fracture peu décalée : méta-analyses montrent des résultats fonctionnels équivalents au traitement chirurgical avec moins de complications — option conservatrice priorisée."),
+    Rule("arthroplasty_rtsa", lambda c: _arthroplasty(c) & _rtsa_profile(c), "Arthroplastie (RTSA preferred)",
+         "Risque élevé d'échec de reconstruction chez patient âgé/ostéoporotique — RTSA souvent préférable pour restaurer fonction et diminuer reprises."),
+    Rule("arthroplasty_ha_or_rtsa", _arthroplasty, "Arthroplastie (HA or RTSA selon per-op)",
+         "Risque important de complications mécaniques ou reconstruction incertaine ; arthroplastie recommandée."),
+    Rule("orif_augmentation", lambda c: _orif_unless_elderly_poor(c) & _augmentation(c), "Ostéosynthèse foyer ouvert (ORIF)",
+         _AMIN_ORIF + " Prévoir techniques d'augmentation (greffe, cimentage, renfort)."),
+    Rule("orif", _orif_unless_elderly_poor, "Ostéosynthèse foyer ouvert (ORIF)", _AMIN_ORIF),
+    Rule("im_nailing", _im_nailing, "Ostéosynthèse foyer fermé (IM nailing)",
+         "Fracture peu comminutive et bonne qualité osseuse : clou intramédullaire adapté, moindre traumatisme tissulaire."),
+    Rule("conservative_low_scores", _conservative_low, "Traitement orthopédique (conservateur)",
+         "Scores faibles : bon candidat pour traitement non opératoire."),
+    Rule("fallback_arthroplasty", lambda c: _residual_signal(c) & _elderly_or_poor(c), "Arthroplastie (type selon per-op)",
+         "Signal de risque élevé; arthroplastie privilégiée en raison du profil du patient."),
+    # Inaccessible en pratique (captée par orif / im_nailing), conservée pour rester fidèle à la page
+    Rule("fallback_orif", _residual_signal, "Ostéosynthèse foyer ouvert (ORIF)",
+         "Signal de risque modéré-élevé mais patient jeune/osseux correct -> tenter reconstruction."),
+], default=Rule("conservative_default", None, "Traitement orthopédique (conservateur)",
+                "Choix conservateur par défaut pour cas intermédiaire ou patient à risque."))
+
+
+# -----------------------
+# AMI.py (tubérosités irréparables)
+# -----------------------
+_AMI_ORIF = ("Risque de pseudarthrose ou d'échec de fixation significatif mais anatomie et qualité osseuse permettant "
+             "une reconstruction ouverte. ORIF permet réduction anatomique, réparation des tubérosités et fixation stable.")
+
+
+def ami_table(avn=50, fix=30, residual=40, name="ami"):
+    """
+    Table AMI.py avec ses seuils en paramètres (valeurs de la page par défaut) :
+    avn = S_AVN d'arthroplastie, fix = S_PSEU / S_FAIL_FIX d'ORIF, residual = S_AVN du repli.
+    """
+    def arthroplasty(c):
+        return (c["S_AVN"] >= avn) | (c["f"] >= 4) | ((c["age"] >= 75) & c["poor"]) | c["tub"]
+
+    def orif(c):
+        return ((c["S_PSEU"] >= fix) | (c["S_FAIL_FIX"] >= fix) | (c["f"] == 3)) & ~(c["poor"] & (c["age"] >= 75))
+
+    def im_nailing(c):
+        return (c["f"] <= 2) & (c["S_FAIL_FIX"] < fix) & ~c["poor"]
+
+    def residual_signal(c):
+        return (c["S_AVN"] >= residual) | (c["f"] >= 3)
+
+    return DecisionTable(name, [
+        Rule("arthroplasty_rtsa", lambda c: arthroplasty(c) & _rtsa_profile(c), "Arthroplastie (RTSA preferred)",
+             "Risque élevé de nécrose / fracture très comminutive / tubérosités irréparables. "
+             "Chez les patients âgés ou en mauvaise qualité osseuse, la RTSA offre souvent de meilleurs "
+             "résultats fonctionnels et réduit les reprises par rapport à une fixation incertaine."),
+        Rule("arthroplasty_ha_or_rtsa", arthroplasty, "Arthroplastie (HA or RTSA selon tubérosités)",
+             "Risque élevé de complications mécaniques ou anatomiques rendant la reconstruction peu fiable ; "
+             "arthroplastie est indiquée, type exact à décider en per-op selon tubérosités."),
+        Rule("orif_augmentation", lambda c: orif(c) & _augmentation(c),
+             "Ostéosynthèse foyer ouvert (ORIF - plaque et vis / technique adaptée)",
+             _AMI_ORIF + " Prévoir augmentation (greffe osseuse, cimentage local, ou techniques de renforcement)."),
+        Rule("orif", orif, "Ostéosynthèse foyer ouvert (ORIF - plaque et vis / technique adaptée)", _AMI_ORIF),
+        Rule("im_nailing", im_nailing, "Ostéosynthèse foyer fermé (IM nailing)",
+             "Fracture peu comminutive, qualité osseuse acceptable et risque d'échec faible : "
+             "clou intramédullaire permet fixation fermée, moindre traumatisme tissulaire et bonne stabilité si indication adaptée."),
+        Rule("conservative_low_scores", _conservative_low, "Traitement orthopédique (conservateur)",
+             "Faibles scores de nécrose et non-union, fracture peu comminutive : la littérature montre de bons résultats fonctionnels "
+             "avec prise en charge conservatrice pour ces profils."),
+        Rule("fallback_arthroplasty", lambda c: residual_signal(c) & _elderly_or_poor(c), "Arthroplastie (type selon per-op)",
+             "Signal élevé de complication + patient à risque -> arthroplastie à privilégier."),
+        Rule("fallback_orif", residual_signal, "Ostéosynthèse foyer ouvert (ORIF)",
+             "Signal élevé mais patient relativement jeune et os corrects -> tentative de reconstruction."),
+        Rule("default_orif", lambda c: (c["age"] < 80) & (c["comorb"] < 2), "Ostéosynthèse foyer ouvert (ORIF)",
+             "Choix par défaut pour cas intermédiaire où fixation anatomique est envisageable."),
+    ], default=Rule("conservative_surgical_risk", None, "Traitement orthopédique (conservateur)",
+                    "Patient à risque chirurgical élevé ; privilégier conservateur ou discussion locale."))
+
+
+AMI = ami_table()
+
+
+TABLES = {t.name: t for t in (VIGIOR_H, AMINE01, AMIN, AMI)}
+
+
+# -----------------------
+# Évaluation
+# -----------------------
+def propose_treatment_batch(S_AVN, S_PSEU, S_FAIL_FIX, age, fragments, gap, bone_quality, comorbidities,
+                            tuberosities_irreparable=False, table="vigior_h", lang="fr"):
+    """
+    Traitement proposé pour toute une cohorte.
+    Retourne un DataFrame : Treatment, Justification, rule (identifiant de la règle retenue).
+    """
+    table = TABLES[table] if isinstance(table, str) else table
+    ctx = build_context(S_AVN, S_PSEU, S_FAIL_FIX, age, fragments, gap, bone_quality, comorbidities,
+                        tuberosities_irreparable)
+    chosen = table.select(ctx)
+    treatments, justifications = table.labels(lang)
+    index = bone_quality.index if isinstance(bone_quality, pd.Series) else None
+    # Colonnes catégorielles : indexation entière, aucun texte recopié par patient
+    return pd.DataFrame({
+        "Treatment": _categorical(chosen, treatments),
+        "Justification": _categorical(chosen, justifications),
+        "rule": pd.Categorical.from_codes(chosen, table.rule_ids),
+    }, index=index)
+
+
+def _categorical(chosen, per_rule):
+    """Libellé par règle -> Categorical (plusieurs règles peuvent partager un libellé)."""
+    codes, uniques = pd.factorize(pd.Series(per_rule, dtype=object))
+    return pd.Categorical.from_codes(codes[chosen], uniques)
+
+
+def propose_treatment(S_AVN, S_PSEU, S_FAIL_FIX, age, fragments, gap, bone_quality, comorbidities,
+                      tuberosities_irreparable=False, table="vigior_h", lang="fr"):
+    """Version scalaire (un patient) : (traitement, justification), même table que le lot."""
+    out = propose_treatment_batch(S_AVN, S_PSEU, S_FAIL_FIX, age, fragments, gap, [bone_quality], comorbidities,
+                                  tuberosities_irreparable, table=table, lang=lang)
+    return out["Treatment"].iat[0], out["Justification"].iat[0]
+
+
+# -----------------------
+# Vérification contre les pages
+# -----------------------
+# Table -> (page de référence, la page prend-elle tuberosities_irreparable)
+REFERENCE_PAGES = {"vigior_h": ("AVGH01.py", False), "amine01": ("AMINE01.py", False), "amin": ("AMIN.py", False),
+                   "ami": ("AMI.py", True)}
+
+
+def load_page_function(path, name, namespace=None):
+    """
+    Extrait une fonction d'une page Streamlit sans exécuter la page (ni importer streamlit).
+    Fonctions imbriquées comprises (recommend() d'AMINE.py est définie sous le bouton).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    nodes = [n for n in ast.walk(tree) if isinstance(n, ast.FunctionDef) and n.name == name]
+    if not nodes:
+        raise LookupError(f"{name} introuvable dans {path}")
+    namespace = dict(namespace or {})
+    exec(compile(ast.Module(body=nodes[-1:], type_ignores=[]), path, "exec"), namespace)
+    return namespace[name]
+
+
+def verify(table="vigior_h", n=100000, lang="fr", seed=0):
+    """Compare la table à la fonction scalaire de la page de référence ; retourne un rapport."""
+    path, with_tub = REFERENCE_PAGES[table]
+    scalar_fn = load_page_function(path, "propose_treatment",
+                                   {"tr": (lambda en, fr: en) if lang == "en" else (lambda en, fr: fr)})
+    df = random_cohort(n, seed)
+    rng = np.random.default_rng(seed + 1)
+    tub = rng.random(n) < 0.2 if with_tub else np.zeros(n, dtype=bool)
+    scores = compute_scores_batch(df["Age"], df["Tabac"], df["Fragments"], df["HSA"], df["Gap"], df["BoneQuality"],
+                                  df["Comorbidities"], tuberosities_irreparable=tub if with_tub else None,
+                                  clip=not with_tub)
+    # Une moitié de scores réels, une moitié tirés indépendamment (0-100) : toutes les règles sont parcourues
+    free = rng.random(n) < 0.5
+    for name in ("S_AVN", "S_PSEU", "S_FAIL_FIX"):
+        scores[name] = np.where(free, rng.integers(0, 1001, n) / 10, scores[name])
+    cols = [scores["S_AVN"], scores["S_PSEU"], scores["S_FAIL_FIX"], df["Age"].to_numpy(), df["Fragments"].to_numpy(),
+            df["Gap"].to_numpy(), df["BoneQuality"].to_numpy(dtype=object), df["Comorbidities"].to_numpy()]
+    rows = [tuple(v.item() if hasattr(v, "item") else v for v in r) for r in zip(*cols)]
+
+    start = time.perf_counter()
+    if with_tub:
+        expected = [scalar_fn(*r, bool(t)) for r, t in zip(rows, tub)]
+    else:
+        expected = [scalar_fn(*r) for r in rows]
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = propose_treatment_batch(*cols, tuberosities_irreparable=tub, table=table, lang=lang)
+    batch_s = time.perf_counter() - start
+
+    got = list(zip(batch["Treatment"].astype(object), batch["Justification"].astype(object)))
+    mismatches = sum(1 for a, b in zip(expected, got) if a != b)
+    return {"table": table, "n": n, "lang": lang, "mismatches": mismatches, "scalar_s": scalar_s, "batch_s": batch_s,
+            "rules": batch["rule"].value_counts().to_dict()}
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    ok = True
+    for name, lang in (("vigior_h", "en"), ("vigior_h", "fr"), ("amine01", "en"), ("amine01", "fr"), ("amin", "fr"),
+                       ("ami", "fr")):
+        r = verify(name, n, lang)
+        ok = ok and r["mismatches"] == 0
+        print(f"{name} [{lang}] : {r['n']} patients, {r['mismatches']} différence(s) ; "
+              f"scalaire {r['scalar_s'] * 1000:.1f} ms, table {r['batch_s'] * 1000:.1f} ms")
+        for rule, count in sorted(r["rules"].items(), key=lambda kv: -kv[1]):
+            print(f"    {rule:<26} {count}")
+    sys.exit(0 if ok else 1)
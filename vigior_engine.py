@@ -0,0 +1,293 @@
+# vigior_engine.py
+"""
+Moteur de stockage unique pour tous les registres VIGIOR.
+
+Chaque module anatomique est une partition typée du même moteur :
+
+    humerus              patients.csv            VIGIOR-H (scores S_AVN / S_PSEU ...)
+    humerus_neer         vigior_data.csv         VIGIOR 2.0 / VH (classification de Neer)
+    humerus_interactive  vigior_humerus_db.csv   VH01 (risques ortho / chir)
+    tibial_plateau       vigior_database.csv     VIGIOR-S (syndrome de loges)
+
+Chaque partition a son schéma (colonnes + types) et sa clé ; le chargement,
+l'écriture (journal, verrous, index des clés, snapshot colonnaire) et
+l'allocation d'IDs passent par le même code (vigior_storage).
+
+Le schéma de chaque partition est versionné : ses migrations (liste ordonnée)
+sont appliquées à la lecture sur les fichiers plus anciens, puis le fichier est
+réécrit au dernier schéma par la compaction en tâche de fond (voir vigior_storage).
+Ajouter une colonne = ajouter une migration, jamais réécrire le CSV au démarrage.
+
+frame(name) retourne un DataFrame partagé par toutes les sessions du processus,
+rechargé seulement quand la version des fichiers change. Ce DataFrame est en
+lecture seule : les modifications passent par append / update, qui construisent
+une nouvelle version (copie sur écriture) sans toucher celle que les autres
+sessions sont en train de lire.
+"""
+import os
+import threading
+
+import pandas as pd
+
+from vigior_storage import IdAllocator, RegistryWriter, fold_records, open_registry
+
+
+# -----------------------
+# Schémas des partitions
+# -----------------------
+class Partition:
+    """Déclaration d'une partition : fichier, clé, schéma {colonne: type}, préfixe d'ID, migrations."""
+
+    def __init__(self, name, path, key, schema, id_prefix="H", id_width=3, migrations=()):
+        self.name = name
+        self.path = path
+        self.key = key
+        self.schema = schema
+        self.id_prefix = id_prefix
+        self.id_width = id_width
+        self.migrations = list(migrations)
+
+    @property
+    def columns(self):
+        return list(self.schema)
+
+    def coerce(self, row):
+        """Convertit une ligne aux types du schéma ; les colonnes inconnues sont conservées."""
+        out = {col: None for col in self.schema}
+        for col, value in row.items():
+            kind = self.schema.get(col)
+            if value is None or kind is None:
+                out[col] = value
+            elif kind is bool:
+                out[col] = value if isinstance(value, bool) else str(value).lower() in ("1", "true", "oui", "yes")
+            else:
+                try:
+                    out[col] = kind(value)
+                except (TypeError, ValueError):
+                    out[col] = value
+        return out
+
+
+# -----------------------
+# Migrations (idempotentes, DataFrame -> DataFrame)
+# -----------------------
+def add_column(name):
+    """Migration : ajoute la colonne si elle est absente (valeurs vides)."""
+    def migration(df):
+        if name not in df.columns:
+            df = df.assign(**{name: pd.Series(None, index=df.index, dtype="object")})
+        return df
+    migration.__name__ = f"add_{name}"
+    return migration
+
+
+def rename_columns(mapping):
+    """Migration : renomme les colonnes ; si les deux existent, la nouvelle est complétée par l'ancienne."""
+    def migration(df):
+        for old, new in mapping.items():
+            if old not in df.columns:
+                continue
+            if new in df.columns:
+                df = df.assign(**{new: df[new].where(df[new].notna(), df[old])})
+                df = df.drop(columns=[old])
+            else:
+                df = df.rename(columns={old: new})
+        return df
+    migration.__name__ = "rename_columns"
+    return migration
+
+
+# Noms de colonnes historiques de VGH.py (version anglaise du module humérus)
+HUMERUS_LEGACY_COLUMNS = {
+    "Patient ID": "ID",
+    "Smoking status": "Tabac",
+    "Number of comorbidities": "Comorbidities",
+    "Bone quality": "BoneQuality",
+    "Number of fracture fragments": "Fragments",
+    "HSA angle": "HSA",
+    "Interfragmentary gap": "Gap",
+    "Risk of avascular necrosis (%)": "S_AVN",
+    "Risk of nonunion (%)": "S_PSEU",
+    "Risk of fixation failure (%)": "S_FAIL_FIX",
+    "Recommended treatment": "Treatment",
+    "Recommendation justification": "Justification",
+    "Surgeon notes": "Notes",
+}
+
+
+PARTITIONS = {
+    "humerus": Partition(
+        "humerus", "patients.csv", key="ID", id_width=6,
+        schema={
+            "ID": str, "Date": str, "Age": int, "Tabac": str, "Comorbidities": int,
+            "BoneQuality": str, "Fragments": int, "HSA": float, "Gap": float,
+            "S_AVN": float, "S_PSEU": float, "S_FAIL_FIX": float, "S_SURG": float,
+            "Treatment": str, "Justification": str, "Notes": str,
+        },
+        migrations=[
+            add_column("Notes"),                       # v1 : notes du chirurgien
+            rename_columns(HUMERUS_LEGACY_COLUMNS),    # v2 : colonnes VGH -> noms communs
+        ],
+    ),
+    "humerus_neer": Partition(
+        "humerus_neer", "vigior_data.csv", key="code",
+        schema={
+            "code": str, "age": int, "sexe": str, "tabac": str, "diab": str, "osteo": str,
+            "comorb": str, "neer": int, "hsa": float, "displacement": float, "mobility": str,
+            "score": float, "necrose": float, "pseudoarthrose": float, "raideur": float,
+            "suggestion": str, "reason": str, "notes": str,
+        },
+    ),
+    "humerus_interactive": Partition(
+        "humerus_interactive", "vigior_humerus_db.csv", key="code_patient", id_prefix="VIGH", id_width=6,
+        schema={
+            "timestamp": str, "code_patient": str, "age": int, "sexe": str, "fumeur": str,
+            "PA": int, "n_fragments": int, "HSA": float, "ecart_interfragmentaire": str,
+            "luxation": str, "osteoporose": str,
+            "risque_necrose_ortho": float, "risque_pseudo_ortho": float, "risque_raideur_ortho": float,
+            "risque_necrose_chir": float, "risque_pseudo_chir": float, "risque_raideur_chir": float,
+        },
+    ),
+    "tibial_plateau": Partition(
+        "tibial_plateau", "vigior_database.csv", key="code_patient", id_prefix="VIG", id_width=6,
+        schema={
+            "code_patient": str, "age": int, "sexe": str, "schatzker": int, "n_fragments": int,
+            "largeur_fracture_mm": float, "ratio_muscle_graisse": float, "score_total": int,
+            "risque_estimé": float, "prise_en_charge_proposée": str, "outcome_reel": str,
+        },
+    ),
+}
+
+
+# -----------------------
+# Moteur
+# -----------------------
+class RegistryEngine:
+    """Point d'accès unique aux partitions ; chaque stockage est ouvert une seule fois."""
+
+    def __init__(self, root=".", partitions=PARTITIONS):
+        self.root = root
+        self.partitions = partitions
+        self._stores = {}
+        self._allocators = {}
+        self._writers = {}
+        self._cache = {}
+        self._mutex = threading.Lock()
+
+    def _partition(self, name):
+        if name not in self.partitions:
+            raise KeyError(f"Partition inconnue : {name} (disponibles : {', '.join(self.partitions)})")
+        return self.partitions[name]
+
+    def path(self, name):
+        return os.path.join(self.root, self._partition(name).path)
+
+    def store(self, name):
+        with self._mutex:
+            if name not in self._stores:
+                part = self._partition(name)
+                self._stores[name] = open_registry(self.path(name), key=part.key, migrations=part.migrations)
+            return self._stores[name]
+
+    def allocator(self, name):
+        with self._mutex:
+            if name not in self._allocators:
+                part = self._partition(name)
+                self._allocators[name] = IdAllocator(
+                    self.path(name), prefix=part.id_prefix, width=part.id_width, seed_column=part.key
+                )
+            return self._allocators[name]
+
+    def writer(self, name):
+        """Commit groupé des ajouts de la partition (un verrou et un fsync par groupe)."""
+        store = self.store(name)
+        with self._mutex:
+            if name not in self._writers:
+                part = self._partition(name)
+
+                def fold(rows, last):
+                    self._after_write(name, lambda df: fold_records(df, rows, key=part.key, columns=part.columns),
+                                      last=last)
+
+                self._writers[name] = RegistryWriter(store, on_commit=fold)
+            return self._writers[name]
+
+    # -----------------------
+    # Opérations
+    # -----------------------
+    def exists(self, name):
+        return self.store(name).exists()
+
+    def load(self, name):
+        return self.store(name).load(columns=self._partition(name).columns)
+
+    def frame(self, name):
+        """DataFrame partagé (lecture seule) de la partition, rechargé si les fichiers ont changé."""
+        store = self.store(name)
+        version = store.version()
+        with self._mutex:
+            cached = self._cache.get(name)
+        if cached is not None and cached[1] == version:
+            return cached[0]
+        df = self.load(name)
+        with self._mutex:
+            self._cache[name] = (df, version)
+        return df
+
+    def _after_write(self, name, change, last=None):
+        """Applique une écriture locale au cache (nouvelle copie) ou l'invalide."""
+        last = self.store(name).last_write() if last is None else last
+        with self._mutex:
+            cached = self._cache.get(name)
+            if cached is None:
+                return
+            if last is not None and cached[1] == last[0]:
+                self._cache[name] = (change(cached[0]), last[1])
+            else:
+                # Écriture concurrente d'un autre processus : rechargement au prochain frame()
+                del self._cache[name]
+
+    def load_columns(self, name, columns):
+        return self.store(name).load_columns(columns)
+
+    def rows(self, name, keys):
+        """Lignes complètes de quelques clés (vue détaillée paginée), sans charger toute la partition."""
+        return self.store(name).load_rows(keys)
+
+    def append(self, name, row):
+        part = self._partition(name)
+        row = part.coerce(row)
+        # Cache mis à jour une fois par commit groupé (writer -> _after_write)
+        self.writer(name).append(row)
+
+    def update(self, name, key_value, fields):
+        part = self._partition(name)
+        found = self.store(name).update(key_value, fields)
+        if found:
+            patch = {"_op": "patch", part.key: key_value, **fields}
+            self._after_write(name, lambda df: fold_records(df.copy(), [patch], key=part.key))
+        return found
+
+    def search(self, name, text):
+        return self.store(name).search(text)
+
+    def write_snapshot(self, name, df):
+        self.store(name).write_snapshot(df)
+        with self._mutex:
+            self._cache.pop(name, None)
+
+    def next_id(self, name):
+        return self.allocator(name).next_id()
+
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_engine(root="."):
+    """Moteur partagé par tout le processus (toutes les sessions Streamlit)."""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None or _ENGINE.root != root:
+            _ENGINE = RegistryEngine(root)
+        return _ENGINE
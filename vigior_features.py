@@ -0,0 +1,256 @@
+# vigior_features.py
+"""
+Transformation des variables du modèle de loges, ajustée à l'entraînement
+et sauvegardée avec le modèle.
+
+train_model_loges.py encodait fracture_type par astype("category").cat.codes
+(codes dépendant des valeurs présentes dans le CSV) et app.py construisait
+son propre vecteur : une table fracture_code différente, et pression_diast
+(absente du CSV) à la place de polytrauma. Ici, une seule transformation :
+
+    transformer = FeatureTransformer.fit(df)        # entraînement : vocabulaire de fracture_type
+    transformer.save(features_path("model_loges.pkl"))
+    X = transformer.transform(df)                   # lot : DataFrame ou colonnes
+    x = transformer.transform_one(age=35, sexe="H", ...)   # une ligne : même code que le lot
+
+Chaque variable catégorielle est compilée une fois en une table de
+positions (index de hachage pd.Index) et un tableau de codes aligné :
+l'encodage d'une colonne est un get_indexer vectoriel suivi d'une lecture
+indexée, sans .map ni dictionnaire construit à chaque appel. Pour une
+seule ligne (app.py), transform_one appelle une fonction générée une fois
+qui lit chaque variable et son code dans un dictionnaire : aussi rapide
+que l'ancien vecteur écrit à la main dans app.py. Les valeurs
+inconnues reçoivent le code de l'encodage d'origine (NaN pour sexe et
+energie comme pandas .map, -1 pour fracture_type comme cat.codes) : un
+modèle déjà entraîné garde exactement les mêmes entrées.
+
+Fichier : <modèle>.features.json à côté d'un .pkl, features.json dans la
+génération courante d'une forêt exportée (vigior_forest).
+
+    python vigior_features.py       # égalité avec l'encodage d'origine + coût par ligne
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ["age", "sexe", "energie", "polytrauma", "fracture_type", "fragments", "largeur_hematome",
+            "ratio_muscle_graisse"]
+FEATURES_FILE = "features.json"
+# Codes fixes de train_model_loges.py
+SEXE = {"H": 1, "F": 0}
+ENERGIE = {"haute": 1, "basse": 0}
+SMALL_BATCH = 256
+# Vocabulaire de vigior_base_donnees.csv (codes 0..5), pour les modèles sauvegardés sans transformation
+SCHATZKER = [f"Schatzker {t}" for t in ["I", "II", "III", "IV", "V", "VI"]]
+
+
+class CategoryEncoder:
+    """
+    Étiquette -> position (construite une fois) -> code lu dans un tableau.
+    Lots : index de hachage pandas (get_indexer vectoriel) ; quelques lignes : même table de
+    positions en dictionnaire, get_indexer ayant un coût fixe d'environ 0,2 ms par appel ;
+    une seule ligne : _code, dictionnaire étiquette -> code précalculé (transform_one).
+    """
+
+    def __init__(self, mapping, missing):
+        self.mapping = dict(mapping)
+        self.missing = missing
+        self._index = pd.Index(list(self.mapping), dtype=object)
+        self._position = {label: i for i, label in enumerate(self.mapping)}
+        # Dernière case : code des valeurs inconnues (position -1)
+        self._codes = np.array(list(self.mapping.values()) + [missing], dtype=float)
+        self._code = {label: float(code) for label, code in self.mapping.items()}
+
+    @property
+    def labels(self):
+        """Étiquettes dans l'ordre des codes (listes déroulantes d'app.py)."""
+        return sorted(self.mapping, key=self.mapping.get)
+
+    def encode(self, values):
+        values = np.asarray(values, dtype=object)
+        if len(values) <= SMALL_BATCH:
+            position = np.array([self._position.get(v, -1) for v in values], dtype=np.intp)
+        else:
+            position = self._index.get_indexer(values)
+        return self._codes[position]
+
+
+class FeatureTransformer:
+    """Colonnes brutes (CSV, formulaire) -> matrice float64 dans l'ordre FEATURES."""
+
+    def __init__(self, categories, columns=FEATURES):
+        self.columns = list(columns)
+        self.encoders = {
+            "sexe": CategoryEncoder(SEXE, np.nan),
+            "energie": CategoryEncoder(ENERGIE, np.nan),
+            "fracture_type": CategoryEncoder({c: i for i, c in enumerate(categories)}, -1),
+        }
+        self._encode_row = self._compile_row()
+
+    def _compile_row(self):
+        """
+        Chemin d'une ligne, généré une fois comme les règles (vigior_rules) : une expression par
+        variable, sans boucle ni tableau intermédiaire.
+
+            out[0] = [record['age'], _code1.get(record['sexe'], _missing1), ...]
+        """
+        namespace = {"_empty": np.empty, "_shape": (1, len(self.columns))}
+        values = []
+        for j, c in enumerate(self.columns):
+            if c in self.encoders:
+                namespace[f"_code{j}"] = self.encoders[c]._code
+                namespace[f"_missing{j}"] = self.encoders[c].missing
+                values.append(f"_code{j}.get(record[{c!r}], _missing{j})")
+            else:
+                values.append(f"record[{c!r}]")
+        source = ("def encode_row(record):\n"
+                  "    out = _empty(_shape)\n"
+                  f"    out[0] = [{', '.join(values)}]\n"
+                  "    return out\n")
+        exec(compile(source, "<vigior_features:encode_row>", "exec"), namespace)
+        return namespace["encode_row"]
+
+    @classmethod
+    def fit(cls, df):
+        """Vocabulaire de fracture_type : valeurs triées, mêmes codes que cat.codes sur df."""
+        return cls(sorted(pd.Series(df["fracture_type"]).dropna().unique()))
+
+    def labels(self, column):
+        return self.encoders[column].labels
+
+    def transform(self, data):
+        """data : DataFrame ou {colonne: valeurs} ; une ligne par patient."""
+        missing = [c for c in self.columns if c not in data]
+        if missing:
+            raise ValueError(f"Variables manquantes : {', '.join(missing)}")
+        out = np.empty((len(data[self.columns[0]]), len(self.columns)))
+        for j, c in enumerate(self.columns):
+            out[:, j] = self.encoders[c].encode(data[c]) if c in self.encoders else data[c]
+        return out
+
+    def transform_one(self, record=None, **values):
+        """
+        Une ligne (formulaire) -> matrice (1, variables), mêmes codes que transform : une lecture
+        de dictionnaire par variable catégorielle (_compile_row), sans passer par les tableaux du lot.
+        """
+        if record is None:
+            record = values
+        elif values:
+            record = {**record, **values}
+        try:
+            return self._encode_row(record)
+        except KeyError:
+            missing = [c for c in self.columns if c not in record]
+            raise ValueError(f"Variables manquantes : {', '.join(missing)}") from None
+
+    def frame(self, data):
+        """transform avec noms de colonnes (entraînement sklearn)."""
+        return pd.DataFrame(self.transform(data), columns=self.columns)
+
+    def to_dict(self):
+        return {"columns": self.columns, "fracture_type": self.labels("fracture_type")}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["fracture_type"], columns=d["columns"])
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def features_path(model_path):
+    """Transformation sauvegardée avec le modèle : dans le répertoire exporté, ou <modèle>.features.json."""
+    if os.path.isdir(model_path):
+        from vigior_forest import forest_directory
+
+        return os.path.join(forest_directory(model_path), FEATURES_FILE)
+    return os.path.splitext(model_path)[0] + ".features.json"
+
+
+def load_features(model_path):
+    """Transformation du modèle, ou None (modèle entraîné avant son introduction)."""
+    path = features_path(model_path)
+    return FeatureTransformer.load(path) if os.path.exists(path) else None
+
+
+# -----------------------
+# Vérification
+# -----------------------
+def legacy_encode(df):
+    """Encodage d'origine de train_model_loges.py."""
+    df = df.copy()
+    df["sexe"] = df["sexe"].map(SEXE)
+    df["energie"] = df["energie"].map(ENERGIE)
+    df["fracture_type"] = df["fracture_type"].astype("category").cat.codes
+    return df[FEATURES]
+
+
+def _mismatches(a, b):
+    return int((~((a == b) | (np.isnan(a) & np.isnan(b)))).any(axis=1).sum())
+
+
+def verify(df):
+    """Écarts : lot vs encodage d'origine, ligne à ligne vs lot, après aller-retour JSON."""
+    transformer = FeatureTransformer.fit(df)
+    batch = transformer.transform(df)
+    bad = _mismatches(batch, legacy_encode(df).to_numpy(float))
+    rows = np.vstack([transformer.transform_one(r) for r in df[FEATURES].to_dict("records")])
+    bad += _mismatches(rows, batch)
+    reloaded = FeatureTransformer.from_dict(json.loads(json.dumps(transformer.to_dict())))
+    bad += int(not np.array_equal(reloaded.transform(df), batch, equal_nan=True))
+    return bad
+
+
+def benchmark(df, repeat=2000):
+    """Coût d'une ligne (médiane, µs) et de 10^5 lignes (ms) : transformation vs encodages d'origine."""
+    transformer = FeatureTransformer.fit(df)
+    record = df[FEATURES].iloc[0].to_dict()
+    code = {c: i for i, c in enumerate(transformer.labels("fracture_type"))}
+
+    def legacy(r):
+        return np.array([[r["age"], 1 if r["sexe"] == "H" else 0, 1 if r["energie"] == "haute" else 0,
+                          r["polytrauma"], code[r["fracture_type"]], r["fragments"], r["largeur_hematome"],
+                          r["ratio_muscle_graisse"]]])
+
+    # Mesures alternées : les deux chemins subissent le même bruit de la machine
+    timings = {"transform_one_us": [], "dict_row_us": []}
+    for _ in range(repeat):
+        for name, fn in (("transform_one_us", transformer.transform_one), ("dict_row_us", legacy)):
+            start = time.perf_counter()
+            fn(record)
+            timings[name].append(time.perf_counter() - start)
+
+    big = df.sample(100000, replace=True, random_state=0)
+    result = {name: 1e6 * float(np.median(t)) for name, t in timings.items()}
+    for name, fn in (("batch_1e5_ms", transformer.transform), ("legacy_batch_1e5_ms", legacy_encode)):
+        start = time.perf_counter()
+        fn(big)
+        result[name] = 1000 * (time.perf_counter() - start)
+    return result
+
+
+if __name__ == "__main__":
+    df = pd.read_csv("vigior_base_donnees.csv")
+    # Valeurs inconnues / manquantes : mêmes codes que l'encodage d'origine
+    odd = df.head(3).copy()
+    odd.loc[odd.index[0], "sexe"] = "X"
+    odd.loc[odd.index[1], "fracture_type"] = np.nan
+    odd.loc[odd.index[2], "energie"] = np.nan
+    # 200 lignes : chemin « quelques lignes » ; x3 : get_indexer vectoriel
+    bad = verify(df) + verify(pd.concat([df, df, df, odd], ignore_index=True))
+    print(f"encodage == encodage d'origine (lot, ligne, JSON) : {bad} écart(s)")
+    for key, value in benchmark(df).items():
+        print(f"{key} : {value:.1f}")
+    sys.exit(0 if bad == 0 else 1)
@@ -0,0 +1,334 @@
+# vigior_lookup.py
+"""
+Tables de correspondance précalculées pour les scores à entrées discrètes.
+
+Toutes les entrées des scores sont bornées et discrètes (âge, fragments, HSA,
+gap, booléens...), et la plupart n'interviennent que par un seuil (âge > 65,
+comorbidités >= 1...). Une table matérialise une fois tout l'espace des
+scores ; un score devient alors une simple lecture indexée.
+
+Axes d'une table :
+    IntegerAxis    valeur entière exacte dans [lo, hi] (fragments, HSA, gap...)
+    ThresholdAxis  classe définie par des seuils (âge > 65 / > 70, ratio < 1.0...)
+    CategoryAxis   valeur parmi une liste (bone_quality, sexe), sinon classe par défaut
+    FlagAxis       booléen (tabac : True / "Yes" / "Oui"...)
+
+Toute entrée hors table (HSA non entier, fragments = 7...) est calculée
+directement : le résultat est toujours identique à l'évaluation directe.
+
+Rapport mémoire / latence contre l'évaluation directe :
+    python vigior_lookup.py
+"""
+import bisect
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from vigior_scoring import (
+    SCORE_COLUMNS, as_flag, compute_scores_batch, flag_one, get_rules, random_cohort, rules_scores,
+    sdl_score, sdl_score_batch, sdl_simplified_score, sdl_simplified_score_batch,
+)
+
+
+# -----------------------
+# Axes
+# -----------------------
+class IntegerAxis:
+    def __init__(self, name, lo, hi):
+        self.name = name
+        self.lo = lo
+        self.hi = hi
+        self.values = list(range(lo, hi + 1))
+
+    def index(self, values):
+        """(indices, masque des valeurs couvertes par la table)."""
+        v = np.asarray(values, dtype=float)
+        ok = (v >= self.lo) & (v <= self.hi) & (v == np.floor(v))
+        return np.where(ok, v - self.lo, 0).astype(np.intp), ok
+
+    def index_one(self, value):
+        if value != int(value) or not self.lo <= value <= self.hi:
+            return None
+        return int(value) - self.lo
+
+
+class ThresholdAxis:
+    """
+    Classes séparées par des seuils croissants.
+    inclusive=False : comparaisons "x > seuil" ; inclusive=True : "x >= seuil".
+    """
+
+    def __init__(self, name, edges, inclusive=False):
+        self.name = name
+        self.edges = list(edges)
+        self.side = "right" if inclusive else "left"
+        # Un représentant par classe pour matérialiser la table
+        if inclusive:
+            self.values = [self.edges[0] - 1] + self.edges
+        else:
+            self.values = self.edges + [self.edges[-1] + 1]
+
+    def index(self, values):
+        v = np.asarray(values, dtype=float)
+        # Peu de seuils : une comparaison par seuil est plus rapide que searchsorted
+        idx = np.zeros(v.shape, dtype=np.intp)
+        for edge in self.edges:
+            idx += (v >= edge) if self.side == "right" else (v > edge)
+        return idx, ~np.isnan(v)
+
+    def index_one(self, value):
+        search = bisect.bisect_right if self.side == "right" else bisect.bisect_left
+        return search(self.edges, value)
+
+
+class CategoryAxis:
+    """Catégories connues ; toute autre valeur prend la classe `other` (comportement des comparaisons ==)."""
+
+    def __init__(self, name, values, other):
+        self.name = name
+        self.values = list(values)
+        self._codes = {v: i for i, v in enumerate(self.values)}
+        self._other = self._codes[other]
+
+    def index(self, values):
+        values = np.asarray(values, dtype=object)
+        idx = np.full(values.shape, self._other, dtype=np.intp)
+        for code, value in enumerate(self.values):
+            if code != self._other:
+                idx[values == value] = code
+        return idx, np.ones(values.shape, dtype=bool)
+
+    def index_one(self, value):
+        return self._codes.get(value, self._other)
+
+
+class FlagAxis:
+    def __init__(self, name):
+        self.name = name
+        self.values = [False, True]
+
+    def index(self, values):
+        flags = as_flag(values)
+        return flags.astype(np.intp), np.ones(len(flags), dtype=bool)
+
+    def index_one(self, value):
+        # Même normalisation que index : "No" / "Non" -> 0
+        return 1 if flag_one(value) else 0
+
+
+# -----------------------
+# Table
+# -----------------------
+class LookupTable:
+    """
+    Espace des scores matérialisé : tableau (classes de chaque axe..., sorties).
+    Les valeurs sont stockées en entiers (valeur * scale) : exactes pour des scores à 1 décimale.
+    """
+
+    def __init__(self, name, axes, outputs, batch_fn, scalar_fn, scale=1, dtype=np.int16):
+        self.name = name
+        self.axes = axes
+        self.outputs = outputs
+        self.batch_fn = batch_fn
+        self.scalar_fn = scalar_fn
+        self.scale = scale
+        self.dtype = dtype
+        self.shape = tuple(len(a.values) for a in axes)
+        self.build_s = None
+        self.table = self._build()
+
+    def _build(self):
+        start = time.perf_counter()
+        # Grille complète : une colonne par axe, dans l'ordre C de la table
+        grid = np.indices(self.shape).reshape(len(self.axes), -1)
+        columns = [np.array(a.values, dtype=object if isinstance(a.values[0], str) else None)[g]
+                   for a, g in zip(self.axes, grid)]
+        values = self._as_matrix(self.batch_fn(*columns))
+        table = np.rint(values * self.scale).astype(self.dtype)
+        # Le stockage entier doit restituer exactement les valeurs calculées
+        if not np.array_equal(table / self.scale if self.scale != 1 else table, values):
+            raise ValueError(f"{self.name} : valeurs non représentables avec scale={self.scale}")
+        self.build_s = time.perf_counter() - start
+        return table.reshape(self.shape + (len(self.outputs),))
+
+    def _as_matrix(self, result):
+        if isinstance(result, dict):
+            return np.column_stack([np.asarray(result[o], dtype=float) for o in self.outputs])
+        return np.asarray(result, dtype=float).reshape(-1, 1)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def _decode(self, raw):
+        return raw / self.scale if self.scale != 1 else raw.astype(np.int64)
+
+    def lookup(self, *columns):
+        """Lot : tableau (n, sorties) ; les entrées hors table sont évaluées directement."""
+        n = max(len(np.atleast_1d(c)) for c in columns)
+        columns = [np.broadcast_to(np.asarray(c), (n,)) for c in columns]
+        flat = np.zeros(n, dtype=np.intp)
+        covered = np.ones(n, dtype=bool)
+        for axis, size, col in zip(self.axes, self.shape, columns):
+            idx, ok = axis.index(col)
+            flat = flat * size + idx
+            covered &= ok
+        out = self._decode(self.table.reshape(-1, len(self.outputs))[flat])
+        if not covered.all():
+            rest = ~covered
+            out[rest] = self._as_matrix(self.batch_fn(*(c[rest] for c in columns)))
+        return out
+
+    def get(self, *values):
+        """Un patient : lecture directe dans la table (ou calcul si hors table)."""
+        idx = []
+        for axis, value in zip(self.axes, values):
+            i = axis.index_one(value)
+            if i is None:
+                return self.scalar_fn(*values)
+            idx.append(i)
+        raw = self.table[tuple(idx)]
+        if len(self.outputs) == 1:
+            return raw[0] / self.scale if self.scale != 1 else int(raw[0])
+        return tuple((raw / self.scale).tolist()) if self.scale != 1 else tuple(int(v) for v in raw)
+
+
+# -----------------------
+# Tables VIGIOR
+# -----------------------
+def humerus_table():
+    """S_AVN / S_PSEU / S_FAIL_FIX / S_SURG (règles vigior_h de VIGIOR-H), en dixièmes de point."""
+    # Reconstruite quand la version des règles vigior_h change (vigior_rules.json modifié)
+    return _humerus_table(get_rules("vigior_h").version)
+
+
+@lru_cache(maxsize=4)
+def _humerus_table(version):
+    return LookupTable(
+        "humerus",
+        [
+            ThresholdAxis("age", [65, 70]),
+            FlagAxis("tabac"),
+            IntegerAxis("fragments", 1, 6),
+            IntegerAxis("HSA", 60, 180),
+            IntegerAxis("gap", 0, 50),
+            CategoryAxis("bone_quality", ["normal", "poor"], other="normal"),
+            ThresholdAxis("comorbidities", [1], inclusive=True),
+        ],
+        SCORE_COLUMNS,
+        batch_fn=compute_scores_batch,
+        scalar_fn=rules_scores,
+        scale=10,
+    )
+
+
+@lru_cache(maxsize=None)
+def sdl_table():
+    """Score /15 du syndrome de loges (VIGIOR-S.py, vigior_simp.py)."""
+    return LookupTable(
+        "sdl",
+        [
+            ThresholdAxis("age", [40, 60], inclusive=True),
+            CategoryAxis("sexe", ["Homme", "Femme"], other="Femme"),
+            IntegerAxis("schatzker", 1, 6),
+            ThresholdAxis("n_fragments", [3], inclusive=True),
+            ThresholdAxis("largeur", [30], inclusive=True),
+            ThresholdAxis("ratio", [1.0], inclusive=True),
+        ],
+        ["score"],
+        batch_fn=sdl_score_batch,
+        scalar_fn=sdl_score,
+        dtype=np.int8,
+    )
+
+
+@lru_cache(maxsize=None)
+def sdl_simplified_table():
+    """Score /17 de VIGIOR-Sp.py."""
+    return LookupTable(
+        "sdl_simplified",
+        [
+            ThresholdAxis("age", [30, 60], inclusive=True),
+            CategoryAxis("sexe", ["Masculin", "Féminin"], other="Féminin"),
+            IntegerAxis("schatzker", 1, 6),
+            ThresholdAxis("n_fragments", [3, 6]),
+            ThresholdAxis("largeur_fracture_mm", [10, 30], inclusive=True),
+            ThresholdAxis("ratio_muscle_graisse", [40, 70]),
+        ],
+        ["score"],
+        batch_fn=sdl_simplified_score_batch,
+        scalar_fn=sdl_simplified_score,
+        dtype=np.int8,
+    )
+
+
+def compute_scores_lookup(age, tabac, fragments, HSA, gap, bone_quality, comorbidities):
+    """Même résultat que compute_scores_batch, par lecture dans la table humérus."""
+    out = humerus_table().lookup(age, tabac, fragments, HSA, gap, bone_quality, comorbidities)
+    return {name: out[:, i] for i, name in enumerate(SCORE_COLUMNS)}
+
+
+# -----------------------
+# Rapport mémoire / latence
+# -----------------------
+def _time(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def _cohorts(n, seed=0):
+    rng = np.random.default_rng(seed)
+    humerus = random_cohort(n, seed)
+    humerus_args = [humerus["Age"].to_numpy(), humerus["Tabac"].to_numpy(dtype=object), humerus["Fragments"].to_numpy(),
+                    humerus["HSA"].to_numpy(), humerus["Gap"].to_numpy(), humerus["BoneQuality"].to_numpy(dtype=object),
+                    humerus["Comorbidities"].to_numpy()]
+    sdl_args = [rng.integers(0, 121, n), rng.choice(np.array(["Homme", "Femme"], dtype=object), n), rng.integers(1, 7, n),
+                rng.integers(1, 11, n), rng.integers(0, 101, n), rng.integers(0, 201, n) / 100]
+    simplified_args = [rng.integers(0, 121, n), rng.choice(np.array(["Masculin", "Féminin"], dtype=object), n),
+                       rng.integers(1, 7, n), rng.integers(1, 11, n), rng.uniform(1, 100, n), rng.integers(0, 101, n)]
+    return {"humerus": humerus_args, "sdl": sdl_args, "sdl_simplified": simplified_args}
+
+
+def report(n=100000, single=2000):
+    """Par table : taille, temps de construction, latence lot et unitaire (direct vs table), égalité."""
+    tables = {"humerus": humerus_table(), "sdl": sdl_table(), "sdl_simplified": sdl_simplified_table()}
+    cohorts = _cohorts(n)
+    rows = []
+    for name, table in tables.items():
+        args = cohorts[name]
+        direct = table._as_matrix(table.batch_fn(*args))
+        looked = table.lookup(*args)
+        singles = [tuple(c[i].item() if hasattr(c[i], "item") else c[i] for c in args) for i in range(single)]
+        # Les pages passent des booléens à la version scalaire ; get normalise lui-même ("No" -> False)
+        page_singles = [tuple(flag_one(v) if isinstance(a, FlagAxis) else v for a, v in zip(table.axes, r))
+                        for r in singles]
+        single_direct = [table.scalar_fn(*r) for r in page_singles]
+        single_lookup = [table.get(*r) for r in singles]
+        expected = direct[:single]
+        rows.append({
+            "table": name,
+            "entries": int(np.prod(table.shape)),
+            "memory_kb": table.nbytes / 1024,
+            "build_ms": table.build_s * 1000,
+            "batch_direct_ms": _time(lambda: table.batch_fn(*args), 3) * 1000,
+            "batch_lookup_ms": _time(lambda: table.lookup(*args), 3) * 1000,
+            "single_direct_us": _time(lambda: [table.scalar_fn(*r) for r in page_singles], 3) / single * 1e6,
+            "single_lookup_us": _time(lambda: [table.get(*r) for r in singles], 3) / single * 1e6,
+            "identical": bool(np.array_equal(direct, looked)
+                              and np.array_equal(np.array(single_direct, dtype=float).reshape(expected.shape), expected)
+                              and np.array_equal(np.array(single_lookup, dtype=float).reshape(expected.shape), expected)),
+        })
+    return pd.DataFrame(rows).set_index("table")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    r = report(n)
+    print(f"Lot de {n} patients ; unitaire : moyenne par patient\n")
+    print(r.to_string(float_format="{:.2f}".format))
+    sys.exit(0 if r["identical"].all() else 1)
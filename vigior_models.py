@@ -0,0 +1,620 @@
+# vigior_models.py
+"""
+Registre des modèles de score VIGIOR.
+
+Chaque variante de calcul de risque des pages (compute_scores, compute_risks,
+calcul_risque, base_score de VH01...) est un modèle enregistré et versionné,
+avec la même interface :
+
+    model = get_model("hum")            # dernière version
+    model.scalar(age, fragments, ...)   # fonction d'origine (même retour que la page)
+    model.score(age=..., ...)           # dict {sortie: valeur}
+    model.score_batch(df)               # DataFrame des sorties, calcul NumPy en une passe
+
+Le registre est construit à l'import : une seule fois par processus, partagé
+par toutes les pages et sessions. Les poids de vigior_h / vigior_h_ami sont
+déclarés dans vigior_rules.json (voir vigior_rules).
+
+    nom            version  pages
+    vigior_h       1        AVGH01.py, AVGH*.py, AmineVG.py, AmineVGH.py, AMINE01.py, Amine001.py, AMIN.py, VGH.py
+    vigior_h_ami   1        AMI.py (tubérosités irréparables, pas de bornage)
+    am             1        AM.py, IM.py
+    neer           1        VH.py, VHH.py
+    neer           2        VIGIOR 2.0.py
+    sr             1        SR.py
+    hum            1        HUM.py
+    sv             1        SV.py
+    amine          1        AMINE.py
+    vigior_hu      1        VIGIOR-hu.py
+    vh01           1        VH01.py
+    sdl            1        VIGIOR-S.py, vigior_simp.py
+    sdl_simplified 1        VIGIOR-Sp.py
+
+Vérification lot == scalaire pour tous les modèles :
+    python vigior_models.py 20000
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from vigior_rules import get_rules
+from vigior_scoring import (
+    SCORE_COLUMNS, compute_scores_batch, round_like_python, rules_scores,
+    sdl_score, sdl_score_batch, sdl_simplified_score, sdl_simplified_score_batch,
+)
+
+
+class ScoringModel:
+    """
+    Modèle de score : entrées ordonnées {nom: domaine}, sorties, fonction scalaire et version en lot.
+    Domaine d'une entrée : liste de valeurs possibles, ou (min, max[, pas]) numérique.
+    """
+
+    def __init__(self, name, version, inputs, outputs, scalar, batch=None, pages=(), description=""):
+        self.name = name
+        self.version = version
+        self.inputs = inputs
+        self.outputs = outputs
+        self.scalar = scalar
+        self.batch = batch
+        self.pages = list(pages)
+        self.description = description
+
+    def __repr__(self):
+        return f"<ScoringModel {self.name} v{self.version}>"
+
+    def _as_values(self, result):
+        if isinstance(result, dict):
+            return [result[o] for o in self.outputs]
+        if isinstance(result, (tuple, list)):
+            return list(result)
+        return [result]
+
+    def score(self, *args, **kwargs):
+        """Un patient -> {sortie: valeur}."""
+        return dict(zip(self.outputs, self._as_values(self.scalar(*args, **kwargs))))
+
+    def score_batch(self, data=None, **columns):
+        """Cohorte (DataFrame / dict de colonnes, noms = entrées du modèle) -> DataFrame des sorties."""
+        if data is not None:
+            columns = {**{k: data[k] for k in self.inputs if k in data}, **columns}
+        missing = [k for k in self.inputs if k not in columns]
+        if missing:
+            raise KeyError(f"{self.name} v{self.version} : entrées manquantes {missing}")
+        index = next((c.index for c in columns.values() if isinstance(c, pd.Series)), None)
+        args = [np.asarray(columns[k]) for k in self.inputs]
+        if self.batch is None:
+            rows = [self._as_values(self.scalar(*(v.item() if hasattr(v, "item") else v for v in r))) for r in zip(*args)]
+            return pd.DataFrame(rows, columns=self.outputs, index=index)
+        result = self.batch(*args)
+        if not isinstance(result, dict):
+            result = {self.outputs[0]: result}
+        return pd.DataFrame({o: result[o] for o in self.outputs}, index=index)
+
+    def sample(self, n, seed=0):
+        """Cohorte aléatoire couvrant le domaine de chaque entrée (benchmarks, vérifications)."""
+        rng = np.random.default_rng(seed)
+        data = {}
+        for name, domain in self.inputs.items():
+            if isinstance(domain, list):
+                data[name] = rng.choice(np.array(domain, dtype=object), n)
+            elif len(domain) == 3:
+                lo, hi, step = domain
+                data[name] = lo + rng.integers(0, int(round((hi - lo) / step)) + 1, n) * step
+            else:
+                data[name] = rng.integers(domain[0], domain[1] + 1, n)
+        return pd.DataFrame(data)
+
+
+# -----------------------
+# Registre
+# -----------------------
+_MODELS = {}
+
+
+def register(model):
+    key = (model.name, model.version)
+    if key in _MODELS:
+        raise ValueError(f"Modèle déjà enregistré : {model.name} v{model.version}")
+    _MODELS[key] = model
+    return model
+
+
+def get_model(name, version=None):
+    """Modèle par nom (dernière version si version=None)."""
+    versions = sorted(v for (n, v) in _MODELS if n == name)
+    if not versions:
+        names = sorted({n for n, _ in _MODELS})
+        raise KeyError(f"Modèle inconnu : {name} (disponibles : {', '.join(names)})")
+    if version is None:
+        version = versions[-1]
+    if (name, version) not in _MODELS:
+        raise KeyError(f"{name} : version {version} inconnue (versions : {versions})")
+    return _MODELS[(name, version)]
+
+
+def available_models():
+    """Tableau des modèles enregistrés (nom, version, entrées, sorties, pages)."""
+    return pd.DataFrame([
+        {"name": m.name, "version": m.version, "inputs": ", ".join(m.inputs),
+         "outputs": ", ".join(m.outputs), "pages": ", ".join(m.pages)}
+        for m in sorted(_MODELS.values(), key=lambda m: (m.name, m.version))
+    ])
+
+
+def _yes(values, yes="Yes"):
+    return np.asarray(values, dtype=object) == yes
+
+
+# -----------------------
+# VIGIOR-H : S_AVN / S_PSEU / S_FAIL_FIX / S_SURG
+# -----------------------
+def _vigior_h_batch(age, tabac, fragments, HSA, gap, bone_quality, comorbidities):
+    return compute_scores_batch(age, tabac, fragments, HSA, gap, bone_quality, comorbidities)
+
+
+def ami_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities, tuberosities_irreparable):
+    """compute_scores de AMI.py : +6 S_AVN si tubérosités irréparables ; arrondi sans bornage."""
+    return get_rules("vigior_h_ami").scalar(age, tabac, fragments, HSA, gap, bone_quality, comorbidities,
+                                            tuberosities_irreparable)
+
+
+def _ami_batch(age, tabac, fragments, HSA, gap, bone_quality, comorbidities, tuberosities_irreparable):
+    return compute_scores_batch(age, tabac, fragments, HSA, gap, bone_quality, comorbidities,
+                                tuberosities_irreparable=tuberosities_irreparable, clip=False)
+
+
+HUMERUS_INPUTS = {
+    "age": (18, 110), "tabac": [True, False], "fragments": (1, 6), "HSA": (60, 180),
+    "gap": (0, 50), "bone_quality": ["normal", "poor"], "comorbidities": (0, 10),
+}
+
+register(ScoringModel(
+    "vigior_h", get_rules("vigior_h").version, HUMERUS_INPUTS, SCORE_COLUMNS, rules_scores, _vigior_h_batch,
+    pages=["AVGH01.py", "AVGH.py", "AVGH.Amine.py", "AVGH.Amine@.py", "AVGHamine.py", "AmineVG.py",
+           "AmineVGH.py", "AMINE01.py", "Amine001.py", "AMIN.py", "VGH.py"],
+    description="Scores VIGIOR-H bornés [0, 100] (PHARON / méta-analyses).",
+))
+register(ScoringModel(
+    "vigior_h_ami", get_rules("vigior_h_ami").version, {**HUMERUS_INPUTS, "tuberosities_irreparable": [True, False]}, SCORE_COLUMNS,
+    ami_scores, _ami_batch, pages=["AMI.py"],
+    description="Variante AMI.py : tubérosités irréparables, scores arrondis non bornés.",
+))
+
+
+# -----------------------
+# AM.py / IM.py
+# -----------------------
+def am_risks(age, tabac, fragments, HSA, gap):
+    necrose = 10 + fragments*3 + (HSA - 130)*0.3 + gap*1.5
+    if tabac:
+        necrose += 7
+    if age > 65:
+        necrose += 6
+
+    pseudo = 8 + gap*2 + fragments*2
+    if age > 70:
+        pseudo += 4
+
+    raideur = 12 + fragments*1.5 + (HSA - 130)*0.2
+    if age > 60:
+        raideur += 3
+
+    return round(necrose, 1), round(pseudo, 1), round(raideur, 1)
+
+
+def _am_batch(age, tabac, fragments, HSA, gap):
+    age, fragments, HSA, gap = (np.asarray(v, dtype=float) for v in (age, fragments, HSA, gap))
+    tabac = np.asarray(tabac, dtype=bool)
+    # Même ordre d'addition que la version scalaire (x + 0.0 == x)
+    necrose = 10 + fragments*3 + (HSA - 130)*0.3 + gap*1.5 + np.where(tabac, 7, 0) + np.where(age > 65, 6, 0)
+    pseudo = 8 + gap*2 + fragments*2 + np.where(age > 70, 4, 0)
+    raideur = 12 + fragments*1.5 + (HSA - 130)*0.2 + np.where(age > 60, 3, 0)
+    return {"necrose": round_like_python(necrose), "pseudo": round_like_python(pseudo),
+            "raideur": round_like_python(raideur)}
+
+
+register(ScoringModel(
+    "am", 1, {"age": (18, 100), "tabac": [True, False], "fragments": (1, 6), "HSA": (80, 180), "gap": (0, 30)},
+    ["necrose", "pseudo", "raideur"], am_risks, _am_batch, pages=["AM.py", "IM.py"],
+    description="Modèle simulé AM.py / IM.py (nécrose, pseudarthrose, raideur).",
+))
+
+
+# -----------------------
+# Classification de Neer (VH.py, VIGIOR 2.0.py)
+# -----------------------
+def neer_risks_v1(age, neer, displacement):
+    necrose = min(90, 8 + age * 0.35 + neer * 10)
+    pseudo = min(75, displacement * 3 + neer * 8)
+    stiff = min(70, 5 + age * 0.25)
+
+    score = (necrose + pseudo + stiff) / 3
+
+    if neer >= 3:
+        conduct = "Ostéosynthèse recommandée (ou prothèse selon âge et mobilité)."
+        reason = "Fracture multi-fragmentaire avec risque élevé de complications."
+    else:
+        conduct = "Traitement conservateur envisageable."
+        reason = "Fracture peu déplacée avec bon potentiel fonctionnel."
+
+    return {
+        "score": round(score, 1),
+        "necrose": round(necrose, 1),
+        "pseudoarthrose": round(pseudo, 1),
+        "raideur": round(stiff, 1),
+        "suggestion": conduct,
+        "reason": reason
+    }
+
+
+def _neer_batch_v1(age, neer, displacement):
+    age, neer, displacement = (np.asarray(v, dtype=float) for v in (age, neer, displacement))
+    necrose = np.minimum(90, 8 + age * 0.35 + neer * 10)
+    pseudo = np.minimum(75, displacement * 3 + neer * 8)
+    stiff = np.minimum(70, 5 + age * 0.25)
+    surgical = neer >= 3
+    return {
+        "score": round_like_python((necrose + pseudo + stiff) / 3),
+        "necrose": round_like_python(necrose),
+        "pseudoarthrose": round_like_python(pseudo),
+        "raideur": round_like_python(stiff),
+        "suggestion": np.where(surgical, "Ostéosynthèse recommandée (ou prothèse selon âge et mobilité).",
+                               "Traitement conservateur envisageable."),
+        "reason": np.where(surgical, "Fracture multi-fragmentaire avec risque élevé de complications.",
+                           "Fracture peu déplacée avec bon potentiel fonctionnel."),
+    }
+
+
+def neer_risks_v2(age, neer, displacement):
+    necrose = min(95, 10 + age * 0.4 + neer * 8)
+    pseudoarthrose = min(80, 5 + displacement * 4 + neer * 5)
+    raideur = min(70, 10 + age * 0.2)
+
+    global_score = (necrose + pseudoarthrose + raideur) / 3
+
+    if neer >= 3 or displacement > 5:
+        suggestion = "Traitement chirurgical recommandé (ostéosynthèse ou prothèse selon âge et mobilité)."
+        reason = "Fragments multiples / déplacement important → risque élevé d’échec conservateur."
+    else:
+        suggestion = "Traitement conservateur envisageable."
+        reason = "Fracture peu déplacée avec bon profil fonctionnel."
+
+    return {
+        "score": round(global_score, 2),
+        "necrose": round(necrose, 1),
+        "pseudoarthrose": round(pseudoarthrose, 1),
+        "raideur": round(raideur, 1),
+        "suggestion": suggestion,
+        "reason": reason
+    }
+
+
+def _neer_batch_v2(age, neer, displacement):
+    age, neer, displacement = (np.asarray(v, dtype=float) for v in (age, neer, displacement))
+    necrose = np.minimum(95, 10 + age * 0.4 + neer * 8)
+    pseudo = np.minimum(80, 5 + displacement * 4 + neer * 5)
+    raideur = np.minimum(70, 10 + age * 0.2)
+    surgical = (neer >= 3) | (displacement > 5)
+    return {
+        "score": round_like_python((necrose + pseudo + raideur) / 3, 2),
+        "necrose": round_like_python(necrose),
+        "pseudoarthrose": round_like_python(pseudo),
+        "raideur": round_like_python(raideur),
+        "suggestion": np.where(surgical, "Traitement chirurgical recommandé (ostéosynthèse ou prothèse selon âge et mobilité).",
+                               "Traitement conservateur envisageable."),
+        "reason": np.where(surgical, "Fragments multiples / déplacement important → risque élevé d’échec conservateur.",
+                           "Fracture peu déplacée avec bon profil fonctionnel."),
+    }
+
+
+NEER_INPUTS = {"age": (18, 100), "neer": (1, 4), "displacement": (0, 40)}
+NEER_OUTPUTS = ["score", "necrose", "pseudoarthrose", "raideur", "suggestion", "reason"]
+
+register(ScoringModel("neer", 1, NEER_INPUTS, NEER_OUTPUTS, neer_risks_v1, _neer_batch_v1,
+                      pages=["VH.py", "VHH.py"], description="Risques selon Neer / déplacement (VH.py)."))
+register(ScoringModel("neer", 2, NEER_INPUTS, NEER_OUTPUTS, neer_risks_v2, _neer_batch_v2,
+                      pages=["VIGIOR 2.0.py"], description="Recalibrage VIGIOR 2.0 (seuil de déplacement > 5 mm)."))
+
+
+# -----------------------
+# SR.py / HUM.py / SV.py (risques en %, fumeur "Yes" / "No")
+# -----------------------
+def sr_risks(age, fragments, gap_mm, HSA_angle, smoker):
+    base_frag = fragments * 12.0
+    hsa_penalty = max(0, 120 - HSA_angle) * 0.9
+    gap_penalty_nec = gap_mm * 2.0
+    gap_penalty_non = gap_mm * 3.0
+    age_penalty = max(0, (age - 50) * 0.6)
+    smoke_pen = 10.0 if smoker == "Yes" else 0.0
+
+    risk_necrosis = min(95.0, base_frag + hsa_penalty + gap_penalty_nec + smoke_pen)
+    risk_nonunion = min(95.0, fragments * 9.0 + gap_penalty_non + (5.0 if smoker == "Yes" else 0.0))
+    risk_stiffness = min(95.0, 10.0 + age_penalty + fragments * 4.0 + gap_mm * 0.8)
+
+    return round(risk_necrosis, 1), round(risk_nonunion, 1), round(risk_stiffness, 1)
+
+
+def _sr_batch(age, fragments, gap_mm, HSA_angle, smoker):
+    age, fragments, gap_mm, HSA_angle = (np.asarray(v, dtype=float) for v in (age, fragments, gap_mm, HSA_angle))
+    smoker = _yes(smoker)
+    necrosis = np.minimum(95.0, fragments * 12.0 + np.maximum(0, 120 - HSA_angle) * 0.9 + gap_mm * 2.0
+                          + np.where(smoker, 10.0, 0.0))
+    nonunion = np.minimum(95.0, fragments * 9.0 + gap_mm * 3.0 + np.where(smoker, 5.0, 0.0))
+    stiffness = np.minimum(95.0, 10.0 + np.maximum(0, (age - 50) * 0.6) + fragments * 4.0 + gap_mm * 0.8)
+    return {"risk_necrosis": round_like_python(necrosis), "risk_nonunion": round_like_python(nonunion),
+            "risk_stiffness": round_like_python(stiffness)}
+
+
+def hum_risks(age, fragments, HSA_angle, smoker):
+    risk_necrosis = min(95, (fragments * 15) + max(0, 120 - HSA_angle) + (10 if smoker == "Yes" else 0))
+    risk_nonunion = min(85, fragments * 12 + (5 if smoker == "Yes" else 0))
+    risk_stiffness = min(70, (age / 2) + fragments * 5)
+    return risk_necrosis, risk_nonunion, risk_stiffness
+
+
+def _hum_batch(age, fragments, HSA_angle, smoker):
+    age, fragments, HSA_angle = (np.asarray(v, dtype=float) for v in (age, fragments, HSA_angle))
+    smoker = _yes(smoker)
+    return {
+        "risk_necrosis": np.minimum(95, fragments * 15 + np.maximum(0, 120 - HSA_angle) + np.where(smoker, 10, 0)),
+        "risk_nonunion": np.minimum(85, fragments * 12 + np.where(smoker, 5, 0)),
+        "risk_stiffness": np.minimum(70, age / 2 + fragments * 5),
+    }
+
+
+def sv_risks(age, fragments, gap_mm, HSA_angle, smoker):
+    risk_necrosis = min(95, fragments * 12 + max(0, 120 - HSA_angle) + gap_mm * 2 + (10 if smoker == "Yes" else 0))
+    risk_nonunion = min(80, fragments * 10 + gap_mm * 3 + (5 if smoker == "Yes" else 0))
+    risk_stiffness = min(75, (age / 2) + fragments * 4 + gap_mm)
+    return risk_necrosis, risk_nonunion, risk_stiffness
+
+
+def _sv_batch(age, fragments, gap_mm, HSA_angle, smoker):
+    age, fragments, gap_mm, HSA_angle = (np.asarray(v, dtype=float) for v in (age, fragments, gap_mm, HSA_angle))
+    smoker = _yes(smoker)
+    return {
+        "risk_necrosis": np.minimum(95, fragments * 12 + np.maximum(0, 120 - HSA_angle) + gap_mm * 2
+                                    + np.where(smoker, 10, 0)),
+        "risk_nonunion": np.minimum(80, fragments * 10 + gap_mm * 3 + np.where(smoker, 5, 0)),
+        "risk_stiffness": np.minimum(75, age / 2 + fragments * 4 + gap_mm),
+    }
+
+
+RISK_OUTPUTS = ["risk_necrosis", "risk_nonunion", "risk_stiffness"]
+
+register(ScoringModel(
+    "sr", 1, {"age": (18, 120), "fragments": (1, 4), "gap_mm": (0, 50), "HSA_angle": (80, 160), "smoker": ["No", "Yes"]},
+    RISK_OUTPUTS, sr_risks, _sr_batch, pages=["SR.py"], description="Risques heuristiques SR.py (bornés à 95 %).",
+))
+register(ScoringModel(
+    "hum", 1, {"age": (18, 120), "fragments": (1, 4), "HSA_angle": (80, 160), "smoker": ["No", "Yes"]},
+    RISK_OUTPUTS, hum_risks, _hum_batch, pages=["HUM.py"], description="Risques HUM.py (sans écart interfragmentaire).",
+))
+register(ScoringModel(
+    "sv", 1, {"age": (18, 120), "fragments": (1, 4), "gap_mm": (0, 20), "HSA_angle": (80, 160), "smoker": ["No", "Yes"]},
+    RISK_OUTPUTS, sv_risks, _sv_batch, pages=["SV.py"], description="Risques SV.py.",
+))
+
+
+# -----------------------
+# AMINE.py (variables catégorielles)
+# -----------------------
+def amine_risks(age, bone_quality, comorbid, nb_frag, HSA, gap):
+    nec = 8
+    nonunion = 6
+    stiff = 10
+
+    if age >= 70:
+        nec += 6
+        nonunion += 5
+        stiff += 7
+    if age >= 80:
+        nec += 4
+        nonunion += 4
+
+    if bone_quality == "Moderate":
+        nonunion += 4
+    if bone_quality == "Poor":
+        nec += 6
+        nonunion += 12
+        stiff += 6
+
+    if comorbid == "Significant":
+        nonunion += 5
+        stiff += 4
+
+    if nb_frag == "3-part":
+        nec += 6
+    if nb_frag == "4-part":
+        nec += 12
+        nonunion += 10
+
+    if HSA < 120:
+        nec += 10
+        stiff += 5
+    if gap > 6:
+        nonunion += 12
+    if gap > 12:
+        nec += 8
+
+    return min(nec, 90), min(nonunion, 90), min(stiff, 90)
+
+
+def _amine_batch(age, bone_quality, comorbid, nb_frag, HSA, gap):
+    age, HSA, gap = (np.asarray(v, dtype=float) for v in (age, HSA, gap))
+    bone_quality, comorbid, nb_frag = (np.asarray(v, dtype=object) for v in (bone_quality, comorbid, nb_frag))
+    moderate, poor = bone_quality == "Moderate", bone_quality == "Poor"
+    significant = comorbid == "Significant"
+    three, four = nb_frag == "3-part", nb_frag == "4-part"
+    nec = 8 + 6 * (age >= 70) + 4 * (age >= 80) + 6 * poor + 6 * three + 12 * four + 10 * (HSA < 120) + 8 * (gap > 12)
+    nonunion = (6 + 5 * (age >= 70) + 4 * (age >= 80) + 4 * moderate + 12 * poor + 5 * significant + 10 * four
+                + 12 * (gap > 6))
+    stiff = 10 + 7 * (age >= 70) + 6 * poor + 4 * significant + 5 * (HSA < 120)
+    return {"nec": np.minimum(nec, 90), "nonunion": np.minimum(nonunion, 90), "stiff": np.minimum(stiff, 90)}
+
+
+register(ScoringModel(
+    "amine", 1,
+    {"age": (18, 100), "bone_quality": ["Good", "Moderate", "Poor"], "comorbid": ["None", "Significant"],
+     "nb_frag": ["2-part", "3-part", "4-part"], "HSA": (80, 180), "gap": (0, 20)},
+    ["nec", "nonunion", "stiff"], amine_risks, _amine_batch, pages=["AMINE.py"],
+    description="Modèle à points AMINE.py (bornes 90 %).",
+))
+
+
+# -----------------------
+# VIGIOR-hu.py
+# -----------------------
+def vigior_hu_risks(age, tabac_pa, nb_fragments, angle_hsa, deplacement):
+    risque_necrose = 0
+    risque_pseudarthrose = 0
+    risque_raideur = 0
+
+    if age > 65:
+        risque_necrose += 25
+    if tabac_pa > 10:
+        risque_necrose += 20
+    if nb_fragments > 3:
+        risque_necrose += 15
+    if angle_hsa < 120 or angle_hsa > 150:
+        risque_necrose += 15
+    if deplacement > 5:
+        risque_necrose += 10
+
+    if age < 50:
+        risque_pseudarthrose += 20
+    if tabac_pa > 5:
+        risque_pseudarthrose += 20
+    if nb_fragments > 4:
+        risque_pseudarthrose += 25
+    if deplacement > 5:
+        risque_pseudarthrose += 15
+
+    if age > 60:
+        risque_raideur += 30
+    if deplacement > 5:
+        risque_raideur += 20
+    if nb_fragments > 3:
+        risque_raideur += 20
+
+    return min(risque_necrose, 90), min(risque_pseudarthrose, 90), min(risque_raideur, 90)
+
+
+def _vigior_hu_batch(age, tabac_pa, nb_fragments, angle_hsa, deplacement):
+    age, tabac_pa, nb_fragments, angle_hsa, deplacement = (
+        np.asarray(v, dtype=float) for v in (age, tabac_pa, nb_fragments, angle_hsa, deplacement))
+    necrose = (25 * (age > 65) + 20 * (tabac_pa > 10) + 15 * (nb_fragments > 3)
+               + 15 * ((angle_hsa < 120) | (angle_hsa > 150)) + 10 * (deplacement > 5))
+    pseudarthrose = 20 * (age < 50) + 20 * (tabac_pa > 5) + 25 * (nb_fragments > 4) + 15 * (deplacement > 5)
+    raideur = 30 * (age > 60) + 20 * (deplacement > 5) + 20 * (nb_fragments > 3)
+    return {"risque_necrose": np.minimum(necrose, 90), "risque_pseudarthrose": np.minimum(pseudarthrose, 90),
+            "risque_raideur": np.minimum(raideur, 90)}
+
+
+register(ScoringModel(
+    "vigior_hu", 1,
+    {"age": (18, 120), "tabac_pa": (0, 100), "nb_fragments": (1, 10), "angle_hsa": (90, 180), "deplacement": (0, 50)},
+    ["risque_necrose", "risque_pseudarthrose", "risque_raideur"], vigior_hu_risks, _vigior_hu_batch,
+    pages=["VIGIOR-hu.py"], description="Risques à seuils VIGIOR-hu.py (bornes 90 %).",
+))
+
+
+# -----------------------
+# VH01.py (risques ortho / chir à partir d'un score de base)
+# -----------------------
+def vh01_risks(age, fumeur, pa, n_fragments, hsa, ecart, luxation, osteoporosis):
+    base_score = 0
+    base_score += 2 if age > 65 else 0
+    base_score += 2 if (fumeur == "Oui" and pa > 10) else 0
+    base_score += 3 if n_fragments == 4 else 0
+    base_score += 2 if (hsa < 120 or hsa > 145) else 0
+    base_score += 2 if ecart == "Oui" else 0
+    base_score += 2 if luxation == "Oui" else 0
+    base_score += 2 if osteoporosis == "Oui" else 0
+
+    ortho_necrose = min(5 + base_score * 2, 95)
+    ortho_pseudo = min(8 + base_score * 1.5, 95)
+    ortho_raideur = min(10 + base_score * 2.5, 95)
+
+    chir_necrose = min(15 + base_score * 1.2, 95)
+    chir_pseudo = min(10 + base_score * 1.0, 90)
+    chir_raideur = min(7 + base_score * 2.0, 90)
+
+    return ortho_necrose, ortho_pseudo, ortho_raideur, chir_necrose, chir_pseudo, chir_raideur
+
+
+def vh01_base_score_batch(age, fumeur, pa, n_fragments, hsa, ecart, luxation, osteoporosis):
+    age, pa, n_fragments, hsa = (np.asarray(v, dtype=float) for v in (age, pa, n_fragments, hsa))
+    return (2 * (age > 65) + 2 * (_yes(fumeur, "Oui") & (pa > 10)) + 3 * (n_fragments == 4)
+            + 2 * ((hsa < 120) | (hsa > 145)) + 2 * _yes(ecart, "Oui") + 2 * _yes(luxation, "Oui")
+            + 2 * _yes(osteoporosis, "Oui"))
+
+
+def _vh01_batch(*args):
+    base = vh01_base_score_batch(*args)
+    return {
+        "risque_necrose_ortho": np.minimum(5 + base * 2, 95),
+        "risque_pseudo_ortho": np.minimum(8 + base * 1.5, 95),
+        "risque_raideur_ortho": np.minimum(10 + base * 2.5, 95),
+        "risque_necrose_chir": np.minimum(15 + base * 1.2, 95),
+        "risque_pseudo_chir": np.minimum(10 + base * 1.0, 90),
+        "risque_raideur_chir": np.minimum(7 + base * 2.0, 90),
+    }
+
+
+register(ScoringModel(
+    "vh01", 1,
+    {"age": (18, 100), "fumeur": ["Non", "Oui"], "pa": (0, 100), "n_fragments": (2, 4), "hsa": (90, 160),
+     "ecart": ["Non", "Oui"], "luxation": ["Non", "Oui"], "osteoporosis": ["Non", "Oui"]},
+    ["risque_necrose_ortho", "risque_pseudo_ortho", "risque_raideur_ortho",
+     "risque_necrose_chir", "risque_pseudo_chir", "risque_raideur_chir"],
+    vh01_risks, _vh01_batch, pages=["VH01.py"],
+    description="Risques comparés orthopédique / chirurgical (colonnes de vigior_humerus_db.csv).",
+))
+
+
+# -----------------------
+# Syndrome de loges (plateau tibial)
+# -----------------------
+register(ScoringModel(
+    "sdl", 1,
+    {"age": (0, 120), "sexe": ["Homme", "Femme"], "schatzker": (1, 6), "n_fragments": (1, 10),
+     "largeur": (0, 100), "ratio": (0.0, 2.0, 0.01)},
+    ["score"], sdl_score, sdl_score_batch, pages=["VIGIOR-S.py", "vigior_simp.py"],
+    description="Score /15 du syndrome de loges.",
+))
+register(ScoringModel(
+    "sdl_simplified", 1,
+    {"age": (0, 120), "sexe": ["Masculin", "Féminin"], "schatzker": (1, 6), "n_fragments": (1, 10),
+     "largeur_fracture_mm": (1, 100), "ratio_muscle_graisse": (0, 100)},
+    ["score"], sdl_simplified_score, sdl_simplified_score_batch, pages=["VIGIOR-Sp.py"],
+    description="Score /17 simplifié.",
+))
+
+
+# -----------------------
+# Vérification / benchmark
+# -----------------------
+def verify(model, n=20000, seed=0):
+    """Compare score_batch à la boucle scalaire sur une cohorte tirée dans les domaines du modèle."""
+    df = model.sample(n, seed)
+    rows = df.to_dict("records")
+    start = time.perf_counter()
+    expected = [model._as_values(model.scalar(**r)) for r in rows]
+    scalar_s = time.perf_counter() - start
+    start = time.perf_counter()
+    got = model.score_batch(df)
+    batch_s = time.perf_counter() - start
+    mismatches = sum(1 for e, g in zip(expected, got.itertuples(index=False)) if list(e) != list(g))
+    return {"model": model.name, "version": model.version, "n": n, "mismatches": mismatches,
+            "scalar_ms": scalar_s * 1000, "batch_ms": batch_s * 1000}
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    report = pd.DataFrame([verify(m, n) for m in sorted(_MODELS.values(), key=lambda m: (m.name, m.version))])
+    print(report.to_string(index=False, float_format="{:.1f}".format))
+    sys.exit(0 if (report["mismatches"] == 0).all() else 1)
@@ -0,0 +1,433 @@
+# vigior_policy.py
+"""
+Simulateur de politiques de traitement sur une population virtuelle.
+
+Une politique = une famille de règles de décision + ses seuils :
+
+    ami        propose_treatment d'AMI.py (vigior_decision.ami_table : avn, fix, residual)
+    vigior_hu  proposition_traitement de VIGIOR-hu.py (seuil_arthroplastie, seuil_chirurgie, age_radical)
+    amine      recommend d'AMINE.py (elderly_age, gap_max, hsa_min)
+
+Chaque politique est appliquée à une cohorte de millions de patients
+virtuels, synthétique (SYNTHETIC) ou rééchantillonnée dans le registre
+humérus, et le simulateur rapporte la répartition des traitements et la
+charge de complications attendue.
+
+La cohorte est générée par morceaux, chacun dans un processus de travail
+avec sa propre graine (SeedSequence) : la mémoire reste bornée et le
+résultat ne dépend pas du nombre de processus. Dans un morceau, les risques
+d'une famille sont calculés une seule fois ; chaque politique de la famille
+n'ajoute qu'une sélection de règle (np.select) et un comptage.
+
+Charge de complications : les risques des modèles (vigior_h_ami, vigior_hu,
+amine) sont ceux du traitement conservateur, comme dans VIGIOR-hu.py (scores
+vigior_h_ami bornés à [0, 100] comme vigior_h avant d'être lus comme des
+risques ; la décision AMI.py garde les scores non bornés) ; chaque
+bras les modifie selon ARM_EFFECTS (hypothèse de simulation, remplaçable par
+effects=).
+
+    python vigior_policy.py 2000000          # vérification + balayage de démonstration
+"""
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from vigior_counterfactual import VIGIOR_HU_SURGERY
+from vigior_decision import DecisionTable, Rule, ami_table, build_context, load_page_function
+from vigior_models import get_model
+from vigior_rules import as_flag
+from vigior_scoring import compute_scores_batch, get_rules
+
+CHUNKSIZE = 250000
+ARMS = ["conservative", "fixation", "arthroplasty"]
+RISKS = ["necrose", "pseudarthrose", "raideur_ou_echec"]
+
+# Bras -> (points retirés à chaque risque, plancher en %).
+# Ostéosynthèse : réductions affichées par VIGIOR-hu.py (vigior_counterfactual.VIGIOR_HU_SURGERY).
+# Arthroplastie : plus de nécrose ni de pseudarthrose de la tête (plancher 5 %), troisième risque inchangé.
+ARM_EFFECTS = {
+    "conservative": ((0, 0, 0), 0),
+    "fixation": VIGIOR_HU_SURGERY,
+    "arthroplasty": ((100, 100, 0), 5),
+}
+
+# Population virtuelle : bornes des formulaires, proportions à ajuster
+SYNTHETIC = {
+    "age": (18, 100), "smokers": 0.25, "pack_years": (1, 60), "fragments": (2, 4), "HSA": (90, 170),
+    "gap": (0, 20), "bone_quality": {"normal": 0.5, "moderate": 0.2, "poor": 0.3}, "comorbidities": (0, 3),
+    "tuberosities_irreparable": 0.1,
+}
+
+
+def arm_of(rule_id):
+    """Bras d'une règle d'après son identifiant (…arthroplasty…, …conservative…, sinon ostéosynthèse)."""
+    if "arthroplasty" in rule_id:
+        return "arthroplasty"
+    if "conservative" in rule_id:
+        return "conservative"
+    return "fixation"
+
+
+# -----------------------
+# Cohortes
+# -----------------------
+def _integers(rng, bounds, n):
+    return rng.integers(bounds[0], bounds[1] + 1, n).astype(float)
+
+
+def _pack_years(rng, smoker):
+    return np.where(smoker, _integers(rng, SYNTHETIC["pack_years"], len(smoker)), 0.0)
+
+
+def synthetic_chunk(n, rng):
+    """n patients virtuels : colonnes du registre humérus + PackYears + TuberositiesIrreparable."""
+    smoker = rng.random(n) < SYNTHETIC["smokers"]
+    bone = SYNTHETIC["bone_quality"]
+    return {
+        "Age": _integers(rng, SYNTHETIC["age"], n),
+        "Tabac": smoker,
+        "PackYears": _pack_years(rng, smoker),
+        "Fragments": _integers(rng, SYNTHETIC["fragments"], n),
+        "HSA": _integers(rng, SYNTHETIC["HSA"], n),
+        "Gap": _integers(rng, SYNTHETIC["gap"], n),
+        "BoneQuality": rng.choice(np.array(list(bone), dtype=object), n, p=list(bone.values())),
+        "Comorbidities": _integers(rng, SYNTHETIC["comorbidities"], n),
+        "TuberositiesIrreparable": rng.random(n) < SYNTHETIC["tuberosities_irreparable"],
+    }
+
+
+def registry_cohort(frame=None):
+    """Patients complets du registre humérus (base du rééchantillonnage), en tableaux NumPy."""
+    if frame is None:
+        from vigior_engine import get_engine
+        frame = get_engine().frame("humerus")
+    numeric = ["Age", "Fragments", "HSA", "Gap", "Comorbidities"]
+    df = frame[numeric + ["Tabac", "BoneQuality"]].copy()
+    df[numeric] = df[numeric].apply(pd.to_numeric, errors="coerce")
+    df = df.dropna()
+    if df.empty:
+        raise ValueError("Registre humérus vide (ou sans patient complet) : utiliser source='synthetic'")
+    base = {c: df[c].to_numpy(dtype=float) for c in numeric}
+    base["Tabac"] = as_flag(df["Tabac"])
+    base["BoneQuality"] = df["BoneQuality"].astype(str).str.lower().to_numpy(dtype=object)
+    return base
+
+
+def registry_chunk(n, rng, base):
+    """n patients tirés avec remise dans le registre ; paquets-années tirés comme SYNTHETIC (absents du registre)."""
+    rows = rng.integers(0, len(base["Age"]), n)
+    chunk = {c: values[rows] for c, values in base.items()}
+    chunk["PackYears"] = _pack_years(rng, chunk["Tabac"])
+    chunk["TuberositiesIrreparable"] = np.zeros(n, dtype=bool)
+    return chunk
+
+
+# -----------------------
+# Familles de politiques
+# -----------------------
+def vigior_hu_table(seuil_arthroplastie=50, seuil_chirurgie=30, age_radical=75):
+    """proposition_traitement de VIGIOR-hu.py (justification de la page calculée par patient : non reprise)."""
+    return DecisionTable("vigior_hu", [
+        Rule("radical_arthroplasty",
+             lambda c: (c["score_global"] >= seuil_arthroplastie) | (c["age"] > age_radical),
+             "Traitement radical (arthroplastie primaire)", None),
+        Rule("surgery_orif", lambda c: c["score_global"] >= seuil_chirurgie,
+             "Réduction chirurgicale et ostéosynthèse", None),
+    ], default=Rule("conservative", None, "Traitement orthopédique conservateur", None))
+
+
+def amine_table(elderly_age=70, gap_max=6, hsa_min=120):
+    """recommend d'AMINE.py."""
+    def stable(c):
+        return (c["gap"] <= gap_max) & (c["HSA"] >= hsa_min)
+
+    def elderly_poor(c):
+        return (c["age"] >= elderly_age) & c["poor"]
+
+    return DecisionTable("amine", [
+        Rule("elderly_poor_conservative", lambda c: elderly_poor(c) & (c["parts"] != 4) & stable(c),
+             "Non-operative treatment",
+             "High-level evidence (PROFHER, Cochrane) demonstrates equivalent outcomes "
+             "to surgery with fewer complications in elderly osteoporotic patients."),
+        Rule("elderly_poor_arthroplasty", elderly_poor, "Arthroplasty",
+             "Severely displaced or 4-part fractures in osteoporotic elderly patients "
+             "show superior outcomes with arthroplasty."),
+        Rule("four_part_orif", lambda c: (c["parts"] == 4) & c["good"], "Open reduction internal fixation",
+             "Young patients with reconstructible 4-part fractures benefit from anatomical ORIF."),
+        Rule("four_part_arthroplasty", lambda c: c["parts"] == 4, "Arthroplasty",
+             "Poor bone stock limits fixation reliability; arthroplasty is recommended."),
+        Rule("three_part_orif", lambda c: (c["parts"] == 3) & ~stable(c), "Open reduction internal fixation",
+             "Marked displacement or varus malalignment requires open anatomical reduction."),
+        Rule("three_part_crif", lambda c: c["parts"] == 3, "Closed reduction internal fixation",
+             "Stable 3-part patterns without major displacement can be managed with CRIF."),
+        Rule("two_part_conservative", lambda c: (c["parts"] == 2) & stable(c), "Non-operative treatment",
+             "Minimally displaced 2-part fractures show excellent outcomes with conservative care."),
+        Rule("two_part_crif", lambda c: c["parts"] == 2, "Closed reduction internal fixation",
+             "A significant gap or malalignment justifies CRIF."),
+    ], default=Rule("default_conservative", None, "Non-operative treatment", "Default safe-mode."))
+
+
+def _ami_context(chunk):
+    tub = chunk["TuberositiesIrreparable"]
+    # AMI.py : la décision compare les scores vigior_h_ami non bornés
+    scores = compute_scores_batch(chunk["Age"], chunk["Tabac"], chunk["Fragments"], chunk["HSA"], chunk["Gap"],
+                                  chunk["BoneQuality"], chunk["Comorbidities"], tuberosities_irreparable=tub,
+                                  clip=False)
+    raw = (scores["S_AVN"], scores["S_PSEU"], scores["S_FAIL_FIX"])
+    ctx = build_context(*raw, chunk["Age"], chunk["Fragments"], chunk["Gap"], chunk["BoneQuality"],
+                        chunk["Comorbidities"], tub)
+    # Risques (%) : bornés comme les scores humérus (vigior_h), sinon un score de 130 compterait 130 %
+    lo, hi = get_rules("vigior_h").clip
+    return ctx, tuple(np.clip(r, lo, hi) for r in raw)
+
+
+def _vigior_hu_context(chunk):
+    r = get_model("vigior_hu").batch(chunk["Age"], chunk["PackYears"], chunk["Fragments"], chunk["HSA"],
+                                     chunk["Gap"])
+    risks = (r["risque_necrose"], r["risque_pseudarthrose"], r["risque_raideur"])
+    return {"age": chunk["Age"], "score_global": (risks[0] + risks[1] + risks[2]) / 3}, risks
+
+
+_AMINE_BONE = {"normal": "Good", "good": "Good", "moderate": "Moderate", "poor": "Poor"}
+_AMINE_PARTS = np.array(["2-part", "3-part", "4-part"], dtype=object)
+
+
+def amine_inputs(chunk):
+    """Colonnes du registre -> entrées catégorielles d'AMINE.py (fragments ramenés à 2-4 parts)."""
+    bone = pd.Series(chunk["BoneQuality"]).map(_AMINE_BONE).fillna("Good").to_numpy(dtype=object)
+    parts = _AMINE_PARTS[np.clip(chunk["Fragments"], 2, 4).astype(int) - 2]
+    comorbid = np.where(chunk["Comorbidities"] >= 1, "Significant", "None").astype(object)
+    return chunk["Age"], bone, comorbid, parts, chunk["HSA"], chunk["Gap"]
+
+
+def _amine_context(chunk):
+    age, bone, comorbid, parts, HSA, gap = amine_inputs(chunk)
+    r = get_model("amine").batch(age, bone, comorbid, parts, HSA, gap)
+    # Contexte numérique : les règles ne comparent pas de textes patient par patient
+    ctx = {"age": age, "poor": bone == "Poor", "good": bone == "Good",
+           "parts": np.clip(chunk["Fragments"], 2, 4).astype(int), "HSA": HSA, "gap": gap}
+    return ctx, (r["nec"], r["nonunion"], r["stiff"])
+
+
+class PolicyFamily:
+    """Famille : contexte (risques calculés une fois par morceau) + table de décision paramétrée."""
+
+    def __init__(self, name, context, table, page, function):
+        self.name = name
+        self.context = context
+        self._table = lru_cache(maxsize=None)(lambda params: table(**dict(params)))
+        self.page = page
+        self.function = function
+
+    def table(self, params):
+        return self._table(tuple(sorted(params.items())))
+
+
+FAMILIES = {f.name: f for f in (
+    PolicyFamily("ami", _ami_context, ami_table, "AMI.py", "propose_treatment"),
+    PolicyFamily("vigior_hu", _vigior_hu_context, vigior_hu_table, "VIGIOR-hu.py", "proposition_traitement"),
+    PolicyFamily("amine", _amine_context, amine_table, "AMINE.py", "recommend"),
+)}
+
+
+class Policy:
+    """Famille + seuils (paramètres absents = valeurs de la page)."""
+
+    def __init__(self, family, params=None, name=None):
+        if family not in FAMILIES:
+            raise KeyError(f"Famille inconnue : {family} (disponibles : {', '.join(FAMILIES)})")
+        self.family = family
+        self.params = dict(params or {})
+        FAMILIES[family].table(self.params)     # paramètre inconnu : TypeError tout de suite
+        self.name = name or family + "".join(f" {k}={v}" for k, v in sorted(self.params.items()))
+
+    def __repr__(self):
+        return f"<Policy {self.name}>"
+
+
+def policy_grid(family, **values):
+    """Toutes les combinaisons de seuils : policy_grid("vigior_hu", seuil_chirurgie=[20, 25, 30])."""
+    keys = list(values)
+    return [Policy(family, dict(zip(keys, combo))) for combo in itertools.product(*values.values())]
+
+
+# -----------------------
+# Simulation
+# -----------------------
+_BASE = None
+
+
+def _init_worker(base):
+    global _BASE
+    _BASE = base
+
+
+def _arm_matrix(effects):
+    reductions = np.array([effects[a][0] for a in ARMS], dtype=float)      # (bras, risque)
+    floors = np.array([effects[a][1] for a in ARMS], dtype=float)
+    return reductions, floors
+
+
+def _run_chunk(task):
+    """Un morceau de cohorte, toutes les politiques : (comptes par règle, somme des risques) par politique."""
+    seed, size, policies, effects = task
+    rng = np.random.default_rng(seed)
+    chunk = synthetic_chunk(size, rng) if _BASE is None else registry_chunk(size, rng, _BASE)
+    reductions, floors = _arm_matrix(effects)
+    contexts = {}
+    out = []
+    for policy in policies:
+        family = FAMILIES[policy.family]
+        if policy.family not in contexts:
+            contexts[policy.family] = family.context(chunk)
+        ctx, risks = contexts[policy.family]
+        table = family.table(policy.params)
+        chosen = table.select(ctx)
+        arm = np.array([ARMS.index(arm_of(r)) for r in table.rule_ids])[chosen]
+        floor = floors[arm]
+        sums = [float(np.maximum(r - reductions[arm, k], floor).sum()) for k, r in enumerate(risks)]
+        out.append((np.bincount(chosen, minlength=len(table.rule_ids)), sums))
+    return out
+
+
+class PolicyResult:
+    """Comptes agrégés par politique (règles retenues, risques cumulés sous le bras choisi)."""
+
+    def __init__(self, policies, counts, risk_sums, n, source, seconds):
+        self.policies = policies
+        self.counts = counts
+        self.risk_sums = risk_sums
+        self.n = n
+        self.source = source
+        self.seconds = seconds
+
+    def summary(self):
+        """
+        Une ligne par politique : part de chaque bras (%), risque moyen de chaque complication (%)
+        et charge = complications attendues pour 100 patients (somme des trois risques moyens).
+        """
+        rows = []
+        for policy, counts, sums in zip(self.policies, self.counts, self.risk_sums):
+            table = FAMILIES[policy.family].table(policy.params)
+            row = {"policy": policy.name, "family": policy.family, "n": self.n}
+            for arm in ARMS:
+                row[arm] = 100 * sum(c for r, c in zip(table.rule_ids, counts) if arm_of(r) == arm) / self.n
+            for name, total in zip(RISKS, sums):
+                row[name] = total / self.n
+            row["burden"] = sum(sums) / self.n
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def mix(self, policy, lang="fr"):
+        """Répartition (%) des libellés de traitement d'une politique (objet ou nom)."""
+        i = policy if isinstance(policy, int) else [p.name for p in self.policies].index(
+            policy.name if isinstance(policy, Policy) else policy)
+        p = self.policies[i]
+        treatments, _ = FAMILIES[p.family].table(p.params).labels(lang)
+        return (pd.Series(self.counts[i], index=treatments).groupby(level=0, sort=False).sum()
+                .sort_values(ascending=False) * 100 / self.n)
+
+
+def simulate_policies(policies, population=1000000, source="synthetic", chunksize=CHUNKSIZE, workers=None,
+                      seed=0, effects=ARM_EFFECTS, registry=None):
+    """
+    Applique chaque politique à la même population virtuelle (source "synthetic" ou "registry").
+    workers : nombre de processus (défaut : tous les cœurs ; 1 = dans le processus courant).
+    """
+    policies = [p if isinstance(p, Policy) else Policy(p) for p in policies]
+    base = registry_cohort(registry) if source == "registry" else None
+    sizes = [chunksize] * (population // chunksize) + ([population % chunksize] if population % chunksize else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, size, policies, effects) for s, size in zip(seeds, sizes)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    start = time.perf_counter()
+    if workers == 1:
+        _init_worker(base)
+        try:
+            parts = [_run_chunk(t) for t in tasks]
+        finally:
+            _init_worker(None)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(base,)) as pool:
+            parts = list(pool.map(_run_chunk, tasks))
+
+    # Somme dans l'ordre des morceaux : même résultat quel que soit le nombre de processus
+    counts = [sum(part[i][0] for part in parts) for i in range(len(policies))]
+    risk_sums = [[sum(part[i][1][k] for part in parts) for k in range(len(RISKS))] for i in range(len(policies))]
+    return PolicyResult(policies, counts, risk_sums, population, source, time.perf_counter() - start)
+
+
+# -----------------------
+# Vérification contre les pages
+# -----------------------
+def verify(family, n=20000, seed=0):
+    """Table de la famille (seuils de la page) == fonction scalaire de la page ; retourne le nombre d'écarts."""
+    fam = FAMILIES[family]
+    scalar_fn = load_page_function(fam.page, fam.function)
+    chunk = synthetic_chunk(n, np.random.default_rng(seed))
+    ctx, risks = fam.context(chunk)
+    table = fam.table({})
+    chosen = table.select(ctx)
+    treatments, justifications = table.labels("en" if family == "amine" else "fr")
+
+    if family == "ami":
+        # La page décide sur les scores non bornés (ctx), pas sur les risques bornés
+        args = zip(ctx["S_AVN"], ctx["S_PSEU"], ctx["S_FAIL_FIX"], chunk["Age"], chunk["Fragments"], chunk["Gap"], chunk["BoneQuality"],
+                   chunk["Comorbidities"], chunk["TuberositiesIrreparable"])
+    elif family == "vigior_hu":
+        args = zip(chunk["Age"], *risks)
+    else:
+        age, bone, _, parts, HSA, gap = amine_inputs(chunk)
+        args = zip(age, bone, parts, HSA, gap)
+    mismatches = 0
+    for i, row in enumerate(args):
+        treatment, justification = scalar_fn(*(v.item() if hasattr(v, "item") else v for v in row))
+        expected = justifications[chosen[i]]
+        if treatment != treatments[chosen[i]] or (expected is not None and justification != expected):
+            mismatches += 1
+    return mismatches
+
+
+def demo_policies():
+    """Balayage de démonstration : seuils de chaque page ± quelques pas."""
+    return (policy_grid("ami", avn=[40, 45, 50, 55, 60], fix=[20, 25, 30, 35, 40])
+            + [p for p in policy_grid("vigior_hu", seuil_arthroplastie=[40, 45, 50, 55, 60],
+                                      seuil_chirurgie=[20, 25, 30, 35, 40])
+               if p.params["seuil_chirurgie"] < p.params["seuil_arthroplastie"]]
+            + policy_grid("amine", elderly_age=[65, 70, 75, 80], gap_max=[4, 6, 8], hsa_min=[110, 120, 130]))
+
+
+if __name__ == "__main__":
+    population = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    ok = True
+    for family in FAMILIES:
+        bad = verify(family)
+        ok &= bad == 0
+        print(f"{family:<10} table == {FAMILIES[family].page} : {bad} écart(s) / 20000")
+
+    policies = [Policy(f) for f in FAMILIES] + demo_policies()
+    cores = os.cpu_count() or 1
+    results = {}
+    for workers in sorted({1, cores}):
+        results[workers] = simulate_policies(policies, population, workers=workers)
+        r = results[workers]
+        print(f"{len(policies)} politiques x {population} patients, {workers} processus : {r.seconds:.1f} s "
+              f"({len(policies) * population / r.seconds / 1e6:.0f} M décisions/s)")
+    first, last = results[1], results[max(results)]
+    ok &= all((a == b).all() for a, b in zip(first.counts, last.counts)) and first.risk_sums == last.risk_sums
+
+    summary = last.summary()
+    pd.set_option("display.width", 160)
+    print("Seuils des pages :")
+    print(summary[summary["policy"].isin(FAMILIES)].round(1).to_string(index=False))
+    print("Charge minimale par famille :")
+    best = summary.loc[summary.groupby("family")["burden"].idxmin()]
+    print(best.round(1).to_string(index=False))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,227 @@
+# vigior_rescore.py
+"""
+Recalcul en lot des scores et du traitement proposé du registre humérus.
+
+Quand les poids de vigior_rules.json ou les tables de vigior_decision changent,
+les colonnes S_AVN / S_PSEU / S_FAIL_FIX / S_SURG / Treatment déjà enregistrées
+dans patients.csv ne sont plus à jour. Ce script relit le registre par
+morceaux (mémoire bornée, quelle que soit sa taille), recalcule chaque morceau
+en lot (vigior_rules + vigior_decision) et écrit le résultat dans un jeu de
+colonnes versionné, sans toucher aux colonnes d'origine :
+
+    S_AVN_v2, S_PSEU_v2, S_FAIL_FIX_v2, S_SURG_v2, Treatment_v2, Justification_v2
+
+puis affiche un résumé des différences (scores modifiés, recommandations
+modifiées et transitions ancienne -> nouvelle). Chaque passage est consigné
+dans <registre>.rescore.json.
+
+    python vigior_rescore.py --rules nouvelles_regles.json --tag v2
+    python vigior_rescore.py --dry-run                  # résumé seul, rien n'est écrit
+
+Les évaluations encore dans le journal reçoivent leurs colonnes versionnées par
+un patch journalisé ; celles ajoutées pendant le recalcul sont à reprendre par
+un nouveau passage.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from vigior_decision import TABLES, propose_treatment_batch
+from vigior_engine import get_engine
+from vigior_rules import get_rules
+from vigior_scoring import REGISTRY_COLUMNS, SCORE_COLUMNS
+from vigior_storage import PatientJournal, open_registry
+
+MANIFEST_SUFFIX = ".rescore.json"
+DECISION_COLUMNS = ["Treatment", "Justification"]
+CHUNKSIZE = 100000
+
+
+def versioned_columns(tag):
+    """Colonne d'origine -> colonne versionnée (S_AVN -> S_AVN_v2...)."""
+    return {col: f"{col}_{tag}" for col in SCORE_COLUMNS + DECISION_COLUMNS}
+
+
+def _canonical_treatments(table, lang):
+    """Libellé (en ou fr) -> libellé dans la langue choisie : les deux langues du registre se comparent."""
+    target, _ = table.labels(lang)
+    mapping = {}
+    for other in ("en", "fr"):
+        labels, _ = table.labels(other)
+        mapping.update(zip(labels, target))
+    return mapping
+
+
+class RescoreStats:
+    """Compteurs cumulés sur les morceaux (aucune ligne conservée)."""
+
+    def __init__(self):
+        self.rows = 0
+        self.scores_changed = 0
+        self.treatment_changed = 0
+        self.transitions = Counter()
+
+    def add(self, old, new, old_treatment, new_treatment):
+        self.rows += len(new)
+        old_scores = old.to_numpy(dtype=float)
+        new_scores = new.to_numpy(dtype=float)
+        # Score absent auparavant (ancienne page, ligne migrée) : compté comme modifié
+        differs = ~((old_scores == new_scores) | (np.isnan(old_scores) & np.isnan(new_scores)))
+        self.scores_changed += int(differs.any(axis=1).sum())
+        changed = old_treatment.to_numpy() != new_treatment.to_numpy()
+        self.treatment_changed += int(changed.sum())
+        if changed.any():
+            pairs = pd.DataFrame({"old": old_treatment[changed], "new": new_treatment[changed]})
+            self.transitions.update({k: int(v) for k, v in pairs.value_counts(dropna=False).items()})
+
+    def as_dict(self):
+        return {"rows": self.rows, "scores_changed": self.scores_changed,
+                "treatment_changed": self.treatment_changed}
+
+
+def rescore_frame(df, rules, table="vigior_h", lang="fr", tag="v2", stats=None):
+    """Ajoute à df (colonnes du registre) le jeu de colonnes versionné ; met à jour stats."""
+    table = TABLES[table] if isinstance(table, str) else table
+    missing = [i for i in rules.inputs if i not in REGISTRY_COLUMNS]
+    if missing:
+        raise ValueError(f"{rules.name} : entrées absentes du registre humérus {missing}")
+    df = df.copy()
+    for col in REGISTRY_COLUMNS.values():
+        if col not in df.columns:
+            df[col] = np.nan
+    scores = rules.batch(*(df[REGISTRY_COLUMNS[i]] for i in rules.inputs))
+    decision = propose_treatment_batch(
+        scores["S_AVN"], scores["S_PSEU"], scores["S_FAIL_FIX"], df["Age"], df["Fragments"], df["Gap"],
+        df["BoneQuality"], df["Comorbidities"], table=table, lang=lang)
+
+    names = versioned_columns(tag)
+    for col in SCORE_COLUMNS:
+        df[names[col]] = scores[col]
+    for col in DECISION_COLUMNS:
+        df[names[col]] = decision[col].astype(object).to_numpy()
+
+    if stats is not None:
+        old_scores = pd.DataFrame({c: pd.to_numeric(df[c], errors="coerce") if c in df.columns else np.nan
+                                   for c in SCORE_COLUMNS}, index=df.index)
+        canonical = _canonical_treatments(table, lang)
+        stored = df["Treatment"] if "Treatment" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        old_treatment = stored.map(canonical).fillna(stored).fillna("(vide)").astype(object)
+        stats.add(old_scores, df[[names[c] for c in SCORE_COLUMNS]], old_treatment,
+                  df[names["Treatment"]].astype(object))
+    return df
+
+
+def _record_run(path, run):
+    manifest = path + MANIFEST_SUFFIX
+    runs = []
+    if os.path.exists(manifest):
+        with open(manifest, "r", encoding="utf-8") as f:
+            runs = json.load(f)
+    runs.append(run)
+    tmp_path = f"{manifest}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(runs, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest)
+
+
+def rescore_registry(store, rules, table="vigior_h", lang="fr", tag=None, chunksize=CHUNKSIZE,
+                     dry_run=False, attempts=3):
+    """
+    Recalcule tout le registre (snapshot par morceaux + journal) ; retourne le résumé (dict).
+    dry_run : seulement les différences, aucune écriture.
+    """
+    if not isinstance(store, PatientJournal):
+        raise TypeError("Recalcul par morceaux : registre CSV + journal uniquement (pas SQLite)")
+    tag = tag or f"v{rules.version}"
+    start = time.perf_counter()
+
+    for _ in range(attempts):
+        stats = RescoreStats()
+
+        def transform(chunk):
+            return rescore_frame(chunk, rules, table, lang, tag, stats)
+
+        if dry_run:
+            for chunk in store.iter_snapshot(chunksize):
+                transform(chunk)
+            break
+        if store.rewrite_snapshot(transform, chunksize):
+            break
+    else:
+        raise RuntimeError(f"Registre modifié pendant le recalcul ({attempts} tentatives) : relancer")
+
+    # Évaluations pas encore compactées : un patch par patient, seulement les colonnes versionnées
+    pending = store.journal_rows()
+    journal_rows = len(pending)
+    if journal_rows:
+        names = versioned_columns(tag)
+        rescored = rescore_frame(pending, rules, table, lang, tag, stats)
+        if not dry_run:
+            for row in rescored[[store.key] + list(names.values())].to_dict("records"):
+                store.update(row.pop(store.key), row)
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "date": datetime.now().isoformat(timespec="seconds"), "registry": store.path, "tag": tag,
+        "rules": rules.name, "version": rules.version, "table": table if isinstance(table, str) else table.name,
+        "lang": lang, "journal_rows": journal_rows, **stats.as_dict(), "seconds": round(elapsed, 3),
+        "dry_run": dry_run,
+    }
+    if not dry_run:
+        _record_run(store.path, summary)
+    summary["transitions"] = stats.transitions
+    return summary
+
+
+def print_summary(summary, top=10):
+    rows = summary["rows"]
+    pct = 100 * summary["treatment_changed"] / rows if rows else 0.0
+    rate = rows / summary["seconds"] if summary["seconds"] else float("inf")
+    print(f"Registre : {summary['registry']} ({rows} patients dont {summary['journal_rows']} dans le journal)")
+    print(f"Règles   : {summary['rules']} v{summary['version']} ; table de décision {summary['table']} "
+          f"({summary['lang']})")
+    if summary["dry_run"]:
+        print("Simulation : rien n'a été écrit")
+    else:
+        print(f"Colonnes : {', '.join(versioned_columns(summary['tag']).values())}")
+    print(f"Scores modifiés         : {summary['scores_changed']}")
+    print(f"Recommandation modifiée : {summary['treatment_changed']} ({pct:.1f} %)")
+    for (old, new), count in summary["transitions"].most_common(top):
+        print(f"  {count:>8}  {old}  ->  {new}")
+    print(f"Durée : {summary['seconds']:.1f} s ({rate:.0f} patients/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recalcul en lot des scores VIGIOR-H du registre.")
+    parser.add_argument("--registry", help="fichier du registre (défaut : partition humerus du moteur)")
+    parser.add_argument("--rules", help="fichier de règles (défaut : vigior_rules.json / VIGIOR_RULES)")
+    parser.add_argument("--model", default="vigior_h", help="modèle du fichier de règles")
+    parser.add_argument("--table", default="vigior_h", choices=sorted(TABLES), help="table de décision")
+    parser.add_argument("--lang", default="fr", choices=["fr", "en"])
+    parser.add_argument("--tag", help="suffixe des colonnes (défaut : v<version des règles>)")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("--dry-run", action="store_true", help="résumé des différences sans écrire")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    if args.registry:
+        part = engine.partitions["humerus"]
+        store = open_registry(args.registry, key=part.key, migrations=part.migrations)
+    else:
+        store = engine.store("humerus")
+    rules = get_rules(args.model, args.rules)
+    summary = rescore_registry(store, rules, table=args.table, lang=args.lang, tag=args.tag,
+                               chunksize=args.chunksize, dry_run=args.dry_run)
+    print_summary(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
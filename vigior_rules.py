@@ -0,0 +1,323 @@
+# vigior_rules.py
+"""
+Formules de score déclaratives (vigior_rules.json) compilées en évaluateurs.
+
+Les poids, seuils des indicateurs, bornes et pondérations du composite S_SURG
+ne sont plus écrits en dur dans le code : ils sont lus dans vigior_rules.json
+(ou le fichier désigné par la variable d'environnement VIGIOR_RULES). Après une
+nouvelle méta-analyse, on modifie le fichier, pas le code.
+
+Format d'un modèle :
+    "inputs"      arguments, dans l'ordre de la fonction scalaire
+    "indicators"  {nom: [entrée, opérateur, seuil]}  (> >= < <= == !=)
+                  ou [entrée, "flag"]                (booléen / "Yes" / "Oui"...)
+    "scores"      {nom: {"intercept": a, "terms": [...]}}, évalués dans l'ordre ;
+                  un terme est [variable, poids] -> poids * variable,
+                  ou {"var", "weight", "from": r} -> poids * (r - variable),
+                  ou {"var", "weight", "minus": r} -> poids * (variable - r) ;
+                  un score peut utiliser les scores précédents (non bornés)
+    "clip"        [min, max] ou null ; "round" : nombre de décimales
+    "extends"     modèle de base ; "append_terms" ajoute des termes en fin de score
+
+Chaque modèle est compilé une seule fois au chargement en deux fonctions
+Python générées (source lisible dans .source) : une scalaire, identique aux
+compute_scores des pages, et une vectorielle NumPy, aussi rapide que le code
+écrit à la main puisque c'est le même code.
+
+    python vigior_rules.py 100000          # vérification lot == scalaire + temps
+    python vigior_rules.py --source vigior_h
+"""
+import json
+import keyword
+import os
+import sys
+import time
+from functools import lru_cache
+from numbers import Real
+
+import numpy as np
+import pandas as pd
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vigior_rules.json")
+
+OPERATORS = (">", ">=", "<", "<=", "==", "!=")
+
+TRUE_VALUES = ("1", "true", "yes", "oui", "y", "o")
+
+
+# -----------------------
+# Outils vectoriels (partagés avec vigior_scoring)
+# -----------------------
+def as_flag(values):
+    """Booléens, 0/1 ou textes du registre ("Yes", "Oui", "True"...) -> tableau bool."""
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.fillna(0).to_numpy() != 0
+    # Quelques valeurs distinctes ("Yes"/"No") : on ne normalise que celles-ci
+    codes, uniques = pd.factorize(values)
+    truthy = np.array([str(u).strip().lower() in TRUE_VALUES for u in uniques] + [False])
+    return truthy[codes]
+
+
+def flag_one(value):
+    """Une valeur -> bool, même normalisation que as_flag ("No", "Non", NaN, None -> False)."""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, Real):
+        return value == value and value != 0
+    if value is None:
+        return False
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def round_like_python(values, decimals=1):
+    """np.round avec exactement le résultat de round(x, decimals) de Python."""
+    values = np.asarray(values, dtype=float)
+    out = np.round(values, decimals)
+    scaled = values * 10 ** decimals
+    # round() arrondit la valeur décimale exacte : seuls les quasi-demis peuvent différer
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_half.any():
+        out[near_half] = [round(v, decimals) for v in values[near_half].tolist()]
+    return out
+
+
+def _num(values):
+    return np.asarray(values, dtype=float)
+
+
+def _flag(values):
+    return as_flag(values) if np.ndim(values) else bool(values)
+
+
+def _obj(values):
+    return np.asarray(values, dtype=object)
+
+
+def _finish(values, clip, decimals):
+    values = np.asarray(values, dtype=float)
+    if clip:
+        values = np.clip(values, clip[0], clip[1])
+    return values if decimals is None else round_like_python(values, decimals)
+
+
+# -----------------------
+# Compilation
+# -----------------------
+class RuleError(ValueError):
+    """Fichier de règles invalide (nom inconnu, opérateur, poids non numérique...)."""
+
+
+def _check_name(name, where):
+    if not isinstance(name, str) or not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_"):
+        raise RuleError(f"{where} : nom invalide {name!r}")
+    return name
+
+
+def _check_number(value, where):
+    if isinstance(value, bool) or not isinstance(value, Real):
+        raise RuleError(f"{where} : valeur numérique attendue, reçu {value!r}")
+    return value
+
+
+def _check_decimals(value, where):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise RuleError(f"{where} : nombre de décimales entier >= 0 attendu, reçu {value!r}")
+    return value
+
+
+class ScoreRules:
+    """Un modèle du fichier de règles, compilé en .scalar(*inputs) et .batch(*colonnes)."""
+
+    def __init__(self, name, spec, origin="<règles>"):
+        self.name = name
+        self.version = spec.get("version", 1)
+        self.description = spec.get("description", "")
+        self.inputs = [_check_name(i, f"{name}.inputs") for i in spec["inputs"]]
+        self.outputs = list(spec["scores"])
+        self.clip = tuple(spec["clip"]) if spec.get("clip") else None
+        self.decimals = _check_decimals(spec.get("round"), f"{name}.round")
+        self.spec = spec
+        scalar_src, batch_src = self._generate(spec)
+        self.source = scalar_src + "\n\n" + batch_src
+        namespace = {"np": np, "_num": _num, "_flag": _flag, "_obj": _obj, "_finish": _finish}
+        exec(compile(self.source, f"<{origin}:{name}>", "exec"), namespace)
+        self.scalar = namespace[f"{name}_scores"]
+        self.batch = namespace[f"{name}_scores_batch"]
+
+    def __repr__(self):
+        return f"<ScoreRules {self.name} v{self.version}>"
+
+    def _generate(self, spec):
+        name = _check_name(self.name, "modèle")
+        known = set(self.inputs)
+        numeric = set()
+        scalar_ind, batch_ind = [], []
+        for ind, rule in spec.get("indicators", {}).items():
+            where = f"{name}.indicators.{ind}"
+            _check_name(ind, where)
+            var = rule[0]
+            if var not in self.inputs:
+                raise RuleError(f"{where} : entrée inconnue {var!r}")
+            if rule[1] == "flag":
+                scalar_ind.append(f"    {ind} = bool({var})")
+                batch_ind.append(f"    {ind} = _flag({var})")
+            elif rule[1] in OPERATORS:
+                op, value = rule[1], rule[2]
+                if isinstance(value, str):
+                    if op not in ("==", "!="):
+                        raise RuleError(f"{where} : {op} impossible sur un texte")
+                    scalar_ind.append(f"    {ind} = {var} {op} {value!r}")
+                    batch_ind.append(f"    {ind} = _obj({var}) {op} {value!r}")
+                else:
+                    numeric.add(var)
+                    _check_number(value, where)
+                    scalar_ind.append(f"    {ind} = {var} {op} {value!r}")
+                    batch_ind.append(f"    {ind} = {var} {op} {value!r}")
+            else:
+                raise RuleError(f"{where} : opérateur inconnu {rule[1]!r}")
+            known.add(ind)
+
+        lines = []
+        for score, body in spec["scores"].items():
+            where = f"{name}.scores.{score}"
+            _check_name(score, where)
+            parts = [repr(_check_number(body["intercept"], where))] if "intercept" in body else []
+            for term in body.get("terms", []):
+                if isinstance(term, dict):
+                    var, weight = term["var"], _check_number(term["weight"], where)
+                    if "from" in term:
+                        expr = f"{weight!r} * ({_check_number(term['from'], where)!r} - {var})"
+                    elif "minus" in term:
+                        expr = f"{weight!r} * ({var} - {_check_number(term['minus'], where)!r})"
+                    else:
+                        expr = f"{weight!r} * {var}"
+                else:
+                    var, weight = term
+                    expr = f"{_check_number(weight, where)!r} * {var}"
+                if var not in known:
+                    raise RuleError(f"{where} : variable inconnue {var!r}")
+                if var in self.inputs:
+                    numeric.add(var)
+                parts.append(expr)
+            if not parts:
+                raise RuleError(f"{where} : score vide")
+            lines.append(f"    {score} = {' + '.join(parts)}")
+            known.add(score)
+
+        args = ", ".join(self.inputs)
+        if self.clip is None:
+            finish = [f"round({s}, {self.decimals})" if self.decimals is not None else s for s in self.outputs]
+        else:
+            lo, hi = (_check_number(b, f"{name}.clip") for b in self.clip)
+            finish = [f"min(max({s}, {lo!r}), {hi!r})" for s in self.outputs]
+            if self.decimals is not None:
+                finish = [f"round({f}, {self.decimals})" for f in finish]
+        scalar_src = "\n".join(
+            [f"def {name}_scores({args}):"] + scalar_ind + lines + [f"    return {', '.join(finish)}"])
+
+        batch_src = "\n".join(
+            [f"def {name}_scores_batch({args}, clip=None):",
+             f"    clip = {self.clip!r} if clip is None else clip"]
+            + [f"    {v} = _num({v})" for v in self.inputs if v in numeric]
+            + batch_ind + lines
+            + ["    return {"]
+            + [f"        {s!r}: _finish({s}, clip, {self.decimals!r})," for s in self.outputs]
+            + ["    }"])
+        return scalar_src, batch_src
+
+
+def _resolve(specs, name, seen=()):
+    """Applique "extends" / "append_terms" : spécification complète du modèle."""
+    if name in seen:
+        raise RuleError(f"{name} : héritage circulaire")
+    if name not in specs:
+        raise RuleError(f"modèle inconnu : {name}")
+    spec = dict(specs[name])
+    base = spec.pop("extends", None)
+    if base is None:
+        return spec
+    merged = _resolve(specs, base, seen + (name,))
+    merged.update({k: v for k, v in spec.items() if k not in ("indicators", "scores", "append_terms")})
+    merged["indicators"] = {**merged.get("indicators", {}), **spec.get("indicators", {})}
+    scores = {s: dict(b) for s, b in merged["scores"].items()}
+    scores.update(spec.get("scores", {}))
+    for score, extra in spec.get("append_terms", {}).items():
+        if score not in scores:
+            raise RuleError(f"{name}.append_terms : score inconnu {score!r}")
+        scores[score]["terms"] = list(scores[score].get("terms", [])) + list(extra)
+    merged["scores"] = scores
+    return merged
+
+
+def compile_rules(specs, origin="<règles>"):
+    """{nom: spécification} -> {nom: ScoreRules}."""
+    return {name: ScoreRules(name, _resolve(specs, name), origin) for name in specs}
+
+
+@lru_cache(maxsize=None)
+def _load(path, mtime_ns):
+    with open(path, "r", encoding="utf-8") as f:
+        specs = json.load(f)
+    return compile_rules(specs, os.path.basename(path))
+
+
+def load_rules(path=None):
+    """Règles compilées du fichier (une compilation par version du fichier et par processus)."""
+    path = os.path.abspath(path or os.environ.get("VIGIOR_RULES", RULES_FILE))
+    return _load(path, os.stat(path).st_mtime_ns)
+
+
+def get_rules(name, path=None):
+    rules = load_rules(path)
+    if name not in rules:
+        raise KeyError(f"Règles inconnues : {name} (disponibles : {', '.join(rules)})")
+    return rules[name]
+
+
+# -----------------------
+# Vérification / benchmark
+# -----------------------
+def verify(rules, n=100000, seed=0):
+    """Évalue lot et scalaire sur une cohorte synthétique ; nombre de lignes différentes et temps."""
+    from vigior_scoring import REGISTRY_COLUMNS, random_cohort
+
+    df = random_cohort(n, seed)
+    rng = np.random.default_rng(seed + 1)
+    columns = {arg: df[col] for arg, col in REGISTRY_COLUMNS.items()}
+    for extra in rules.inputs:
+        if extra not in columns:
+            columns[extra] = rng.random(n) < 0.2
+    args = [columns[i] for i in rules.inputs]
+    flags = {ind[0] for ind in rules.spec.get("indicators", {}).values() if ind[1] == "flag"}
+    # Les pages passent des booléens à la version scalaire
+    scalar_args = [as_flag(a) if i in flags else np.asarray(a) for i, a in zip(rules.inputs, args)]
+
+    start = time.perf_counter()
+    expected = [rules.scalar(*row) for row in zip(*(a.tolist() for a in scalar_args))]
+    scalar_s = time.perf_counter() - start
+    start = time.perf_counter()
+    got = rules.batch(*args)
+    batch_s = time.perf_counter() - start
+
+    got = np.column_stack([got[o] for o in rules.outputs])
+    mismatches = int((~(np.array(expected, dtype=float) == got).all(axis=1)).sum())
+    return {"rules": rules.name, "version": rules.version, "n": n, "mismatches": mismatches,
+            "scalar_ms": scalar_s * 1000, "batch_ms": batch_s * 1000}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--source":
+        print(get_rules(sys.argv[2]).source)
+        sys.exit(0)
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    start = time.perf_counter()
+    all_rules = load_rules()
+    print(f"{len(all_rules)} modèles compilés en {(time.perf_counter() - start) * 1000:.1f} ms")
+    report = pd.DataFrame([verify(r, n) for r in all_rules.values()])
+    print(report.to_string(index=False, float_format="{:.1f}".format))
+    sys.exit(0 if (report["mismatches"] == 0).all() else 1)
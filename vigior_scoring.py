@@ -0,0 +1,197 @@
+# vigior_scoring.py
+"""
+Scores VIGIOR-H (S_AVN / S_PSEU / S_FAIL_FIX / S_SURG) en lot, et scores
+entiers du syndrome de loges (VIGIOR-S.py / vigior_simp.py, VIGIOR-Sp.py).
+
+compute_scores(...) des pages (AVGH01.py, Amine001.py, AMI.py...) calcule un
+patient à la fois. compute_scores_batch(...) prend des colonnes (tableaux,
+Series ou un DataFrame du registre) et calcule les quatre scores de toute la
+cohorte en une seule passe NumPy.
+
+Les poids, seuils et bornes du calcul en lot (et de rules_scores, la
+version scalaire des pages) viennent de vigior_rules.json (modèles
+"vigior_h" et "vigior_h_ami"), compilés par vigior_rules. compute_scores
+reste la formule d'origine écrite à la main : c'est la référence du
+benchmark et des vérifications, qui détectent ainsi toute dérive du
+fichier de règles. Sémantique :
+  - S_SURG est calculé à partir des scores NON bornés, puis borné ;
+  - bornage [0, 100] puis arrondi à 1 décimale comme round() de Python
+    (np.round diffère sur certaines valeurs proches d'un demi : ces valeurs
+    sont recalculées avec round()) ;
+  - AMI.py : +6 sur S_AVN si tubérosités irréparables, et sa boucle de
+    bornage via locals() est sans effet -> clip=False pour la reproduire.
+
+Benchmark contre la version scalaire :
+    python vigior_scoring.py 100000
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from vigior_rules import TRUE_VALUES, as_flag, flag_one, get_rules, round_like_python  # noqa: F401 (réexportés)
+
+SCORE_COLUMNS = ["S_AVN", "S_PSEU", "S_FAIL_FIX", "S_SURG"]
+
+# Colonnes du registre humérus (partition "humerus" de vigior_engine)
+REGISTRY_COLUMNS = {
+    "age": "Age", "tabac": "Tabac", "fragments": "Fragments", "HSA": "HSA",
+    "gap": "Gap", "bone_quality": "BoneQuality", "comorbidities": "Comorbidities",
+}
+
+
+# -----------------------
+# Version scalaire (référence)
+# -----------------------
+def compute_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities):
+    """
+    Formule d'origine des pages, écrite à la main : référence indépendante de vigior_rules.json
+    (le benchmark et les vérifications comparent les règles compilées à cette fonction).
+    """
+    I_age_gt_65 = 1 if age > 65 else 0
+    I_age_gt_70 = 1 if age > 70 else 0
+    I_tabac = 1 if tabac else 0
+    I_bone_poor = 1 if bone_quality == "poor" else 0
+    I_comorb = 1 if comorbidities >= 1 else 0
+
+    S_AVN = 10 + 6 * I_age_gt_65 + 7 * I_tabac + 3 * fragments + 0.3 * (130 - HSA) + 1.5 * gap + 10 * I_bone_poor
+    S_PSEU = 8 + 2 * fragments + 2 * gap + 4 * I_age_gt_70 + 5 * I_tabac + 8 * I_bone_poor
+    S_FAIL_FIX = 5 + 4 * I_bone_poor + 3 * fragments + 2 * I_comorb + 1.5 * gap
+    S_SURG = 0.4 * S_AVN + 0.35 * S_PSEU + 0.25 * S_FAIL_FIX
+
+    def clip_round(x):
+        return round(min(max(x, 0), 100), 1)
+
+    return clip_round(S_AVN), clip_round(S_PSEU), clip_round(S_FAIL_FIX), clip_round(S_SURG)
+
+
+def rules_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities):
+    """Scores d'un patient : fonction scalaire générée à partir des règles "vigior_h" (pages)."""
+    return get_rules("vigior_h").scalar(age, tabac, fragments, HSA, gap, bone_quality, comorbidities)
+
+
+# -----------------------
+# Version en lot
+# -----------------------
+def compute_scores_batch(age, tabac, fragments, HSA, gap, bone_quality, comorbidities,
+                         tuberosities_irreparable=None, clip=True):
+    """
+    Scores de toute une cohorte ; chaque argument est un tableau / une Series (ou un scalaire).
+    Retourne un dict {S_AVN, S_PSEU, S_FAIL_FIX, S_SURG} de tableaux float64.
+    """
+    columns = [age, tabac, fragments, HSA, gap, bone_quality, comorbidities]
+    if tuberosities_irreparable is None:
+        rules = get_rules("vigior_h")
+    else:
+        rules = get_rules("vigior_h_ami")
+        columns.append(tuberosities_irreparable)
+    return rules.batch(*columns, clip=get_rules("vigior_h").clip if clip else False)
+
+
+def score_frame(df, columns=REGISTRY_COLUMNS, **kwargs):
+    """Scores d'un DataFrame (colonnes du registre humérus par défaut) -> DataFrame S_* aligné sur df."""
+    args = {arg: df[col] for arg, col in columns.items()}
+    scores = compute_scores_batch(**args, **kwargs)
+    return pd.DataFrame(scores, index=df.index)
+
+
+# -----------------------
+# Syndrome de loges (plateau tibial)
+# -----------------------
+def sdl_score(age, sexe, schatzker, n_fragments, largeur, ratio):
+    """Score /15 de VIGIOR-S.py et vigior_simp.py."""
+    score = 0
+    if age < 40: score += 2
+    elif age < 60: score += 1
+    if sexe == "Homme": score += 1
+    if schatzker >= 5: score += 3
+    if n_fragments >= 3: score += 2
+    if largeur >= 30: score += 2
+    if ratio < 1.0: score += 3
+    return score
+
+
+def sdl_score_batch(age, sexe, schatzker, n_fragments, largeur, ratio):
+    age = np.asarray(age, dtype=float)
+    score = np.where(age < 40, 2, np.where(age < 60, 1, 0))
+    score = score + (np.asarray(sexe, dtype=object) == "Homme")
+    score = score + 3 * (np.asarray(schatzker) >= 5)
+    score = score + 2 * (np.asarray(n_fragments) >= 3)
+    score = score + 2 * (np.asarray(largeur) >= 30)
+    score = score + 3 * (np.asarray(ratio) < 1.0)
+    return score.astype(np.int64)
+
+
+def sdl_simplified_score(age, sexe, schatzker, n_fragments, largeur_fracture_mm, ratio_muscle_graisse):
+    """Score /17 de VIGIOR-Sp.py (ratio muscle/graisse en %)."""
+    score = 1 if age < 30 else 2 if age < 60 else 3
+    score += 2 if sexe == "Masculin" else 1
+    score += schatzker
+    score += 1 if n_fragments <= 3 else 2 if n_fragments <= 6 else 3
+    score += 1 if largeur_fracture_mm < 10 else 2 if largeur_fracture_mm < 30 else 3
+    score += 1 if ratio_muscle_graisse > 70 else 2 if ratio_muscle_graisse > 40 else 3
+    return score
+
+
+def sdl_simplified_score_batch(age, sexe, schatzker, n_fragments, largeur_fracture_mm, ratio_muscle_graisse):
+    age = np.asarray(age, dtype=float)
+    n_fragments = np.asarray(n_fragments)
+    largeur = np.asarray(largeur_fracture_mm, dtype=float)
+    ratio = np.asarray(ratio_muscle_graisse, dtype=float)
+    score = np.where(age < 30, 1, np.where(age < 60, 2, 3))
+    score = score + np.where(np.asarray(sexe, dtype=object) == "Masculin", 2, 1)
+    score = score + np.asarray(schatzker)
+    score = score + np.where(n_fragments <= 3, 1, np.where(n_fragments <= 6, 2, 3))
+    score = score + np.where(largeur < 10, 1, np.where(largeur < 30, 2, 3))
+    score = score + np.where(ratio > 70, 1, np.where(ratio > 40, 2, 3))
+    return score.astype(np.int64)
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def random_cohort(n, seed=0):
+    """Cohorte synthétique couvrant les bornes des formulaires (âge, fragments, HSA, gap...)."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Age": rng.integers(18, 111, n),
+        "Tabac": rng.choice(["Yes", "No"], n),
+        "Fragments": rng.integers(1, 7, n),
+        "HSA": rng.integers(60, 181, n),
+        "Gap": rng.integers(0, 51, n),
+        "BoneQuality": rng.choice(["normal", "poor"], n),
+        "Comorbidities": rng.integers(0, 11, n),
+    })
+
+
+def benchmark(n=100000, seed=0):
+    """Compare compute_scores (référence écrite à la main, boucle Python) et compute_scores_batch (règles)."""
+    df = random_cohort(n, seed)
+    records = df.to_dict("records")
+
+    start = time.perf_counter()
+    scalar = [
+        compute_scores(r["Age"], r["Tabac"] == "Yes", r["Fragments"], r["HSA"], r["Gap"],
+                       r["BoneQuality"], r["Comorbidities"])
+        for r in records
+    ]
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = score_frame(df)
+    batch_s = time.perf_counter() - start
+
+    identical = np.array_equal(np.array(scalar, dtype=float), batch[SCORE_COLUMNS].to_numpy())
+    return {"n": n, "scalar_s": scalar_s, "batch_s": batch_s,
+            "speedup": scalar_s / batch_s if batch_s else float("inf"), "identical": identical}
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    r = benchmark(n)
+    print(f"{r['n']} patients")
+    print(f"  scalaire : {r['scalar_s'] * 1000:.1f} ms")
+    print(f"  lot      : {r['batch_s'] * 1000:.1f} ms  (x{r['speedup']:.0f})")
+    print(f"  résultats identiques : {'oui' if r['identical'] else 'NON'}")
+    sys.exit(0 if r["identical"] else 1)
@@ -0,0 +1,216 @@
+# vigior_serving.py
+"""
+Chargement unique des modèles entraînés (app.py) et mesures de latence.
+
+app.py faisait joblib.load("model_loges.pkl") en tête de page : Streamlit
+réexécute la page à chaque interaction, donc la forêt (100 arbres) était
+désérialisée à chaque mouvement de curseur, pour un coût proportionnel à la
+taille du modèle. Ici, chaque fichier de modèle est chargé une seule fois par
+processus et partagé par toutes les sessions :
+
+    model = get_predictor("model_loges.pkl")
+    model.predict_proba(X_input)          # même interface que le modèle sklearn
+    model.features                        # transformation sauvegardée avec le modèle (vigior_features)
+
+- chargement sous verrou (une seule désérialisation même si plusieurs
+  sessions démarrent en même temps), rechargé si le fichier change
+  (réentraînement) : le contrôle est un os.stat ;
+- joblib.load(mmap_mode="r") : les tableaux NumPy du pickle sont
+  memory-mappés au lieu d'être copiés (les arbres sklearn recopient
+  toutefois leurs nœuds au dépickling) ; l'export à plat
+  model_loges.forest (vigior_forest) est entièrement mappé ;
+- métriques : durée de chargement, taille du fichier, nombre de prédictions,
+  latence médiane / p95 des dernières prédictions (serving_metrics()).
+
+Latence mesurée pour une ligne (1 CPU, python vigior_serving.py) :
+
+    arbres    rechargement    sklearn chaud    forêt à plat chaude (app.py)
+    100       ~60 ms          ~13 ms           ~1,1 ms
+    500       ~210 ms         ~60 ms           ~4,4 ms
+
+Le modèle chaud ne paie plus la désérialisation, mais la latence reste
+proportionnelle au nombre d'arbres : environ 120 µs par arbre avec sklearn,
+environ 9 à 10 µs par arbre avec la forêt à plat (une descente vectorielle
+de ~30 niveaux sur toutes les paires (ligne, arbre)). Doubler la forêt
+double donc toujours la latence d'une prédiction.
+
+    python vigior_serving.py        # latence par interaction : rechargement, modèle chaud, forêt à plat
+"""
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from vigior_features import load_features
+
+MODEL_PATH = "model_loges.pkl"
+LATENCY_WINDOW = 1000
+
+
+def _load_joblib(path):
+    import joblib
+
+    return joblib.load(path, mmap_mode="r")
+
+
+def _load_forest(path):
+    from vigior_forest import load_forest
+
+    return load_forest(path)
+
+
+# Extension -> chargeur ; tout objet exposant predict_proba convient
+LOADERS = {".pkl": _load_joblib, ".joblib": _load_joblib, ".forest": _load_forest}
+
+
+def _signature(path):
+    if os.path.isdir(path):
+        # Forêt exportée : CURRENT.json est remplacé en dernier, une fois la génération écrite
+        from vigior_forest import CURRENT_FILE, META_FILE
+
+        current = os.path.join(path, CURRENT_FILE)
+        path = current if os.path.exists(current) else os.path.join(path, META_FILE)
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LoadedModel:
+    """Modèle chargé une fois, partagé entre threads ; predict / predict_proba chronométrés."""
+
+    def __init__(self, path, model, signature, load_seconds, features=None):
+        self.path = path
+        self.model = model
+        self.features = features
+        self.signature = signature
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._predictions = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # classes_, n_features_in_... : délégués au modèle
+        return getattr(self.__dict__["model"], name)
+
+    def _timed(self, method, X):
+        start = time.perf_counter()
+        result = method(X)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._latencies.append(elapsed)
+            self._predictions += 1
+        return result
+
+    def predict_proba(self, X):
+        return self._timed(self.model.predict_proba, X)
+
+    def predict(self, X):
+        return self._timed(self.model.predict, X)
+
+    def metrics(self):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            predictions = self._predictions
+        return {
+            "path": self.path, "size_mb": self.signature[1] / 1e6, "load_ms": self.load_seconds * 1000,
+            "predictions": predictions,
+            "latency_p50_ms": float(np.median(latencies)) if len(latencies) else None,
+            "latency_p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+        }
+
+
+_MODELS = {}
+_MODELS_LOCK = threading.Lock()
+_PATH_LOCKS = {}
+
+
+def get_predictor(path=MODEL_PATH):
+    """Modèle partagé par tout le processus (toutes les sessions Streamlit), rechargé si le fichier a changé."""
+    path = os.path.abspath(path)
+    signature = _signature(path)
+    loaded = _MODELS.get(path)
+    if loaded is not None and loaded.signature == signature:
+        return loaded
+    with _MODELS_LOCK:
+        lock = _PATH_LOCKS.setdefault(path, threading.Lock())
+    with lock:
+        # Une autre session a pu charger le modèle pendant l'attente du verrou
+        loaded = _MODELS.get(path)
+        if loaded is not None and loaded.signature == signature:
+            return loaded
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in LOADERS:
+            raise ValueError(f"Format de modèle inconnu : {path} ({', '.join(LOADERS)})")
+        start = time.perf_counter()
+        model = LOADERS[ext](path)
+        # Forêt exportée : transformation de la génération effectivement chargée
+        features = load_features(getattr(model, "directory", path))
+        loaded = LoadedModel(path, model, signature, time.perf_counter() - start, features)
+        _MODELS[path] = loaded
+        return loaded
+
+
+def serving_metrics():
+    """Une ligne par modèle chargé dans ce processus."""
+    return pd.DataFrame([m.metrics() for m in list(_MODELS.values())])
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def benchmark(n_estimators=(100, 500), interactions=50, seed=0):
+    """
+    Latence par interaction (une ligne) : joblib.load + predict_proba (ancienne page), modèle sklearn
+    chaud (get_predictor sur le .pkl) et forêt à plat chaude (get_predictor sur le .forest, chemin
+    préféré par app.py) ; forest_us_per_tree : coût restant par arbre de la forêt à plat.
+    """
+    import tempfile
+
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    from vigior_forest import export_forest
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(2000, 8))
+    y = (X[:, 0] + rng.normal(size=2000) > 0).astype(int)
+    row = X[:1]
+
+    def warm_ms(path):
+        timings = []
+        for _ in range(interactions):
+            start = time.perf_counter()
+            get_predictor(path).predict_proba(row)
+            timings.append(time.perf_counter() - start)
+        return 1000 * float(np.median(timings[1:]))
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for trees in n_estimators:
+            path = os.path.join(tmp, f"model_{trees}.pkl")
+            model = RandomForestClassifier(n_estimators=trees, random_state=seed).fit(X, y)
+            joblib.dump(model, path)
+            forest_path = os.path.join(tmp, f"model_{trees}.forest")
+            export_forest(model, forest_path)
+            cold = []
+            for _ in range(max(interactions // 10, 3)):
+                start = time.perf_counter()
+                joblib.load(path).predict_proba(row)
+                cold.append(time.perf_counter() - start)
+            m = get_predictor(path).metrics()
+            forest_ms = warm_ms(forest_path)
+            rows.append({"trees": trees, "size_mb": m["size_mb"], "load_ms": m["load_ms"],
+                         "reload_ms": 1000 * float(np.median(cold)), "warm_ms": warm_ms(path),
+                         "forest_ms": forest_ms, "forest_us_per_tree": 1000 * forest_ms / trees})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(result.round(2).to_string(index=False))
+    # Le modèle chaud ne doit plus payer la désérialisation ; la forêt à plat (app.py) bat le modèle sklearn chaud
+    sys.exit(0 if ((result["warm_ms"] < result["reload_ms"]) & (result["forest_ms"] < result["warm_ms"])).all() else 1)
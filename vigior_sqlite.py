@@ -0,0 +1,284 @@
+# vigior_sqlite.py
+"""
+Registre patients VIGIOR sur SQLite.
+
+Même interface que PatientJournal (exists / load / append / update / write_snapshot),
+plus des requêtes filtrées exécutées par SQLite sur des colonnes indexées
+(ID, Date, Treatment, Fragments) au lieu d'un filtre pandas sur tout le CSV.
+
+Migration ponctuelle d'un CSV existant :
+    python vigior_sqlite.py patients.csv patients.db
+"""
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+
+import pandas as pd
+
+TABLE = "patients"
+INDEXED_COLUMNS = ["ID", "Date", "Treatment", "Fragments"]
+
+
+def _q(name):
+    """Nom de colonne SQL échappé."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _py(value):
+    # NaN -> NULL, types numpy -> types Python
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+class SQLiteRegistry:
+    """Registre patients stocké dans une table SQLite indexée."""
+
+    def __init__(self, path, key="ID", table=TABLE, indexed=INDEXED_COLUMNS, migrations=()):
+        self.path = path
+        self.key = key
+        self.migrations = list(migrations)
+        self.table = table
+        self.indexed = [key if c == "ID" else c for c in indexed]
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    @contextmanager
+    def _connect(self):
+        # Une connexion par opération : Streamlit exécute les sessions dans des threads différents
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # -----------------------
+    # Schéma
+    # -----------------------
+    def _columns(self, conn):
+        return [r[1] for r in conn.execute(f"PRAGMA table_info({_q(self.table)})")]
+
+    def _ensure_columns(self, conn, columns):
+        existing = self._columns(conn)
+        if not existing:
+            cols = [c for c in columns if c != self.key]
+            defs = [f"{_q(self.key)} TEXT PRIMARY KEY"] + [_q(c) for c in cols]
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {_q(self.table)} ({', '.join(defs)})")
+            existing = [self.key] + cols
+        for col in columns:
+            if col not in existing:
+                conn.execute(f"ALTER TABLE {_q(self.table)} ADD COLUMN {_q(col)}")
+                existing.append(col)
+        for col in self.indexed:
+            if col in existing and col != self.key:
+                name = f"idx_{self.table}_{col}".replace(" ", "_").replace('"', "")
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {_q(name)} ON {_q(self.table)} ({_q(col)})")
+        return existing
+
+    def _insert(self, conn, rows, columns):
+        cols = ", ".join(_q(c) for c in columns)
+        marks = ", ".join("?" for _ in columns)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {_q(self.table)} ({cols}) VALUES ({marks})",
+            ([_py(row.get(c)) for c in columns] for row in rows),
+        )
+
+    # -----------------------
+    # Interface registre
+    # -----------------------
+    def exists(self):
+        if not os.path.exists(self.path):
+            return False
+        with self._connect() as conn:
+            return bool(self._columns(conn))
+
+    def version(self):
+        """Signature (mtime, taille) de la base et de son WAL."""
+        sigs = []
+        for p in (self.path, self.path + "-wal"):
+            try:
+                stat = os.stat(p)
+                sigs.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                sigs.append(None)
+        return tuple(sigs)
+
+    def last_write(self):
+        # Pas de suivi fin : le cache partagé est simplement invalidé
+        return None
+
+    def load(self, columns=None):
+        """Retourne tout le registre (équivalent de pd.read_csv(PATIENTS_CSV))."""
+        df = self.query()
+        # Migrations idempotentes appliquées à la lecture (pas de version stockée dans la base)
+        for migration in self.migrations:
+            df = migration(df)
+        if columns is not None:
+            for col in columns:
+                if col not in df.columns:
+                    df[col] = pd.Series(dtype="object")
+        return df
+
+    def load_columns(self, columns):
+        """Seulement les colonnes demandées (SELECT restreint)."""
+        return self.query(columns=list(columns))
+
+    def load_rows(self, keys):
+        """Lignes complètes de quelques patients (SELECT ... WHERE clé IN), dans l'ordre de keys."""
+        keys = [_py(k) for k in dict.fromkeys(keys)]
+        if not keys or not self.exists():
+            return pd.DataFrame()
+        with self._connect() as conn:
+            marks = ", ".join("?" for _ in keys)
+            df = pd.read_sql_query(
+                f"SELECT * FROM {_q(self.table)} WHERE {_q(self.key)} IN ({marks}) ORDER BY rowid", conn, params=keys
+            )
+        for migration in self.migrations:
+            df = migration(df)
+        order = pd.Index(keys).get_indexer(df[self.key])
+        return df.iloc[order.argsort(kind="stable")].reset_index(drop=True)
+
+    def append(self, row):
+        self.append_many([row])
+
+    def append_many(self, rows):
+        """Plusieurs lignes en une seule transaction (commit groupé de RegistryWriter)."""
+        columns = list(dict.fromkeys(c for row in rows for c in row))
+        with self._connect() as conn:
+            self._ensure_columns(conn, columns)
+            self._insert(conn, rows, columns)
+
+    def update(self, key_value, fields):
+        """Modifie les champs d'un seul patient (UPDATE sur la clé primaire) ; False si ID inconnu."""
+        with self._connect() as conn:
+            self._ensure_columns(conn, list(fields))
+            sets = ", ".join(f"{_q(c)} = ?" for c in fields)
+            cur = conn.execute(
+                f"UPDATE {_q(self.table)} SET {sets} WHERE {_q(self.key)} = ?",
+                [_py(v) for v in fields.values()] + [_py(key_value)],
+            )
+            return cur.rowcount > 0
+
+    def __contains__(self, key_value):
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT 1 FROM {_q(self.table)} WHERE {_q(self.key)} = ? LIMIT 1", [_py(key_value)]
+            ).fetchone()
+            return row is not None
+
+    def write_snapshot(self, df):
+        columns = list(df.columns)
+        with self._connect() as conn:
+            self._ensure_columns(conn, columns)
+            conn.execute(f"DELETE FROM {_q(self.table)}")
+            self._insert(conn, df.to_dict("records"), columns)
+
+    # -----------------------
+    # Requêtes indexées
+    # -----------------------
+    def get(self, patient_id):
+        """Retourne l'enregistrement d'un patient (dict) ou None."""
+        df = self.query(where={self.key: patient_id})
+        return None if df.empty else df.iloc[0].to_dict()
+
+    def query(self, where=None, date_from=None, date_to=None, text=None, columns=None, limit=None):
+        """
+        Filtre exécuté par SQLite :
+          - where : {colonne: valeur} (égalité, ex {"Treatment": ..., "Fragments": 4})
+          - date_from / date_to : bornes ISO sur la colonne Date
+          - text : recherche plein texte (LIKE) sur toutes les colonnes
+        """
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=columns)
+        with self._connect() as conn:
+            existing = self._columns(conn)
+            if not existing:
+                return pd.DataFrame(columns=columns)
+            clauses, params = [], []
+            for col, value in (where or {}).items():
+                clauses.append(f"{_q(col)} = ?")
+                params.append(_py(value))
+            if date_from is not None:
+                clauses.append(f"{_q('Date')} >= ?")
+                params.append(str(date_from))
+            if date_to is not None:
+                clauses.append(f"{_q('Date')} <= ?")
+                params.append(str(date_to))
+            if text:
+                like = " OR ".join(f"LOWER(CAST({_q(c)} AS TEXT)) LIKE ?" for c in existing)
+                clauses.append(f"({like})")
+                params.extend([f"%{text.lower()}%"] * len(existing))
+            select = ", ".join(_q(c) for c in columns if c in existing) if columns else "*"
+            sql = f"SELECT {select} FROM {_q(self.table)}"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            sql += " ORDER BY rowid"
+            if limit is not None:
+                sql += f" LIMIT {int(limit)}"
+            df = pd.read_sql_query(sql, conn, params=params)
+        if columns is not None:
+            for col in columns:
+                if col not in df.columns:
+                    df[col] = pd.Series(dtype="object")
+        return df
+
+    def search(self, text):
+        return self.query(text=text)
+
+
+# -----------------------
+# Migration CSV -> SQLite
+# -----------------------
+def migrate_csv(csv_path, db_path, key="ID", migrations=(), chunksize=10000):
+    """
+    Importe un registre CSV existant (snapshot + journal non compacté, patchs et
+    migrations de schéma compris) dans SQLite ; retourne le nombre de lignes.
+
+    La clé est la clé primaire de la table : des IDs en double (anciens registres)
+    seraient fusionnés silencieusement par INSERT OR REPLACE, la migration est donc
+    refusée (ValueError listant les IDs) tant qu'ils ne sont pas corrigés.
+    """
+    from vigior_storage import PatientJournal
+
+    df = PatientJournal(csv_path, key=key, migrations=migrations).load()
+    if df.empty:
+        return 0
+    keys = df[key].dropna() if key in df.columns else pd.Series(dtype=object)
+    duplicated = sorted(keys[keys.duplicated()].astype(str).unique())
+    if duplicated:
+        shown = ", ".join(duplicated[:10]) + (" ..." if len(duplicated) > 10 else "")
+        raise ValueError(f"{len(duplicated)} ID(s) en double dans {csv_path} : {shown}")
+    registry = SQLiteRegistry(db_path, key=key, migrations=migrations)
+    columns = list(df.columns)
+    with registry._connect() as conn:
+        registry._ensure_columns(conn, columns)
+        for start in range(0, len(df), chunksize):
+            registry._insert(conn, df.iloc[start:start + chunksize].to_dict("records"), columns)
+    return len(df)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage : python vigior_sqlite.py patients.csv patients.db [colonne_id]")
+        sys.exit(1)
+    from vigior_engine import PARTITIONS
+
+    # Registre d'une partition du moteur : même clé et mêmes migrations
+    part = next((p for p in PARTITIONS.values() if p.path == os.path.basename(sys.argv[1])), None)
+    key = sys.argv[3] if len(sys.argv) > 3 else part.key if part is not None else "ID"
+    migrations = part.migrations if part is not None and part.key == key else ()
+    try:
+        n = migrate_csv(sys.argv[1], sys.argv[2], key=key, migrations=migrations)
+    except ValueError as e:
+        print(f"❌ Migration refusée : {e}")
+        sys.exit(1)
+    print(f"✅ {n} patients migrés de {sys.argv[1]} vers {sys.argv[2]}")
@@ -0,0 +1,680 @@
+# vigior_storage.py
+"""
+Stockage du registre patients VIGIOR.
+
+Le registre est conservé sous forme d'un snapshot CSV (patients.csv) et d'un
+journal en ajout seul (patients.csv.journal, une ligne JSON par évaluation).
+Un enregistrement ne coûte donc qu'une ligne écrite, quelle que soit la taille
+du registre ; la compaction replie périodiquement le journal dans le snapshot,
+en tâche de fond, et y joint un snapshot colonnaire memory-mappable
+(patients.csv.cols/, voir vigior_columnar) pour les pages d'analyse.
+
+Le schéma est versionné (patients.csv.schema) : les migrations enregistrées sont
+appliquées à la lecture sur les données plus anciennes, et la compaction en
+tâche de fond réécrit le snapshot au dernier schéma. Le démarrage ne réécrit
+jamais le fichier. Une migration reçoit et retourne un DataFrame ; elle doit
+être idempotente (ex : ajouter une colonne absente, renommer une colonne
+présente) et une colonne ajoutée doit valoir None, pour ne pas écraser les
+valeurs lors de la mise à niveau d'un patch.
+
+Toutes les écritures passent par un verrou fichier (fcntl.flock sur <fichier>.lock),
+partagé entre threads Streamlit et processus, et par un rename atomique.
+"""
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from vigior_columnar import is_fresh, read_columnar, write_columnar
+
+JOURNAL_SUFFIX = ".journal"
+COMPACTING_SUFFIX = ".compacting"
+INDEX_SUFFIX = ".idx"
+COLUMNAR_SUFFIX = ".cols"
+SCHEMA_SUFFIX = ".schema"
+
+# Version de schéma d'un enregistrement du journal (absente = 0)
+VERSION_FIELD = "_v"
+
+# Nombre d'enregistrements journalisés avant de déclencher une compaction
+COMPACT_EVERY = 500
+
+# Fenêtre de regroupement des écritures concurrentes (group commit), en secondes
+GROUP_COMMIT_WINDOW = 0.005
+
+
+# -----------------------
+# Utils
+# -----------------------
+def _json_default(value):
+    # Types numpy / pandas -> types Python natifs
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _read_journal(path):
+    """Retourne la liste des enregistrements d'un journal (ligne tronquée ignorée)."""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                # Écriture interrompue (crash) : la dernière ligne est incomplète
+                break
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def fold_records(df, records, key=None, columns=None):
+    """
+    Applique des enregistrements journalisés sur un DataFrame.
+
+    Deux types d'enregistrements : une ligne complète (évaluation) ou un patch
+    {"_op": "patch", <clé>: ..., champs modifiés} qui ne touche qu'un patient.
+
+    Seules les lignes du journal sont dédoublonnées : une ligne complète remplace
+    les lignes de df et les lignes précédentes du journal de même clé (rejouer le
+    journal est idempotent). Les lignes existantes de df ne sont jamais fusionnées
+    entre elles (IDs en double des anciens registres, clés manquantes).
+    """
+    rows, patches, latest = [], {}, {}
+    for rec in records:
+        if rec.get("_op") == "patch":
+            fields = {k: v for k, v in rec.items() if k not in ("_op", key)}
+            patches.setdefault(rec[key], {}).update(fields)
+        else:
+            rows.append(rec)
+            if key is not None and not pd.isna(rec.get(key)):
+                latest[rec[key]] = len(rows) - 1
+                # Une ligne complète plus récente remplace les patchs précédents
+                patches.pop(rec[key], None)
+    if rows:
+        if latest:
+            rows = [r for i, r in enumerate(rows) if pd.isna(r.get(key)) or latest[r[key]] == i]
+            if key in df.columns and len(df):
+                df = df[~df[key].isin(list(latest))]
+        df = pd.DataFrame(rows) if df.empty else pd.concat([df, pd.DataFrame(rows)], ignore_index=True)
+    if patches and key in df.columns:
+        positions = pd.Series(range(len(df)), index=df[key])
+        for key_value, fields in patches.items():
+            if key_value not in positions.index:
+                continue
+            # Toutes les lignes de cette clé (IDs en double d'un ancien registre)
+            pos = positions.loc[[key_value]].to_numpy()
+            for col, value in fields.items():
+                if col not in df.columns:
+                    df[col] = pd.Series([None] * len(df), dtype="object")
+                elif isinstance(value, str) and df[col].dtype != object:
+                    df[col] = df[col].astype("object")
+                df.iloc[pos, df.columns.get_loc(col)] = value
+    if columns is not None:
+        for col in columns:
+            if col not in df.columns:
+                df[col] = pd.Series(dtype="object")
+    return df
+
+
+@contextmanager
+def file_lock(path):
+    """Verrou exclusif inter-processus sur <path>.lock."""
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def read_csv_or_empty(path):
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    try:
+        return pd.read_csv(path)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def _stat_sig(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_csv_atomic(df, path):
+    """Écrit un CSV via un fichier temporaire + rename (jamais de fichier tronqué)."""
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    df.to_csv(tmp_path, index=False)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# -----------------------
+# Journal patients
+# -----------------------
+class PatientJournal:
+    """
+    Registre CSV + journal en ajout seul.
+
+    - append(row) : ajoute une évaluation (une ligne JSON)
+    - update(id, champs) : patch d'un seul patient (notes, retour clinique)
+    - load() : snapshot + rejeu du journal
+    - load_columns(cols) : quelques colonnes seulement (snapshot colonnaire)
+    - compact() : replie le journal dans le snapshot
+    - rewrite_snapshot(transform) : réécriture du snapshot par morceaux (mémoire bornée)
+    - write_snapshot(df) : réécriture complète (modifications hors ajout)
+
+    migrations : liste ordonnée de fonctions DataFrame -> DataFrame ; la version
+    du schéma est le nombre de migrations.
+    """
+
+    def __init__(self, path, key="ID", compact_every=COMPACT_EVERY, migrations=()):
+        self.path = path
+        self.key = key
+        self.compact_every = compact_every
+        self.migrations = list(migrations)
+        self.schema_path = path + SCHEMA_SUFFIX
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.compacting_path = path + COMPACTING_SUFFIX
+        self.index_path = path + INDEX_SUFFIX
+        self.columnar_path = path + COLUMNAR_SUFFIX
+        self._compactor = None
+        self._pending = len(_read_journal(self.journal_path))
+        self._keys = None
+        self._index_pos = 0
+        self._index_ino = None
+        self._local = threading.local()
+
+    def exists(self):
+        return any(os.path.exists(p) for p in (self.path, self.journal_path, self.compacting_path))
+
+    def version(self):
+        """Signature (mtime, taille) des fichiers du registre : change à chaque écriture."""
+        return tuple(_stat_sig(p) for p in (self.path, self.compacting_path, self.journal_path))
+
+    def last_write(self):
+        """(version avant, version après) de la dernière écriture de ce thread, ou None."""
+        return getattr(self._local, "last_write", None)
+
+    def _read_snapshot(self):
+        return read_csv_or_empty(self.path)
+
+    # -----------------------
+    # Versions de schéma
+    # -----------------------
+    @property
+    def schema_version(self):
+        return len(self.migrations)
+
+    def _snapshot_version(self):
+        if not os.path.exists(self.schema_path):
+            return 0
+        with open(self.schema_path, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("version", 0))
+
+    def _write_schema_version(self):
+        tmp_path = f"{self.schema_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.schema_version}, f)
+        os.replace(tmp_path, self.schema_path)
+
+    def _migrate(self, df, from_version):
+        for migration in self.migrations[from_version:]:
+            df = migration(df)
+        return df
+
+    def _upgrade_records(self, records):
+        """Met au dernier schéma les enregistrements journalisés avec une version plus ancienne."""
+        groups = {}
+        for i, rec in enumerate(records):
+            version = rec.pop(VERSION_FIELD, 0)
+            if version < self.schema_version:
+                groups.setdefault((version, rec.get("_op") == "patch"), []).append(i)
+        for (version, is_patch), positions in groups.items():
+            frame = pd.DataFrame([{k: v for k, v in records[i].items() if k != "_op"} for i in positions])
+            migrated = self._migrate(frame, version).to_dict("records")
+            for i, new in zip(positions, migrated):
+                if is_patch:
+                    # Un patch ne garde que ses propres champs (éventuellement renommés)
+                    original = records[i]
+                    new = {k: v for k, v in new.items() if k in original or not pd.isna(v)}
+                    new["_op"] = "patch"
+                records[i] = new
+        return records
+
+    def _read_all(self):
+        """(snapshot, version du snapshot, enregistrements du journal) ; appelé sous verrou."""
+        snapshot = self._read_snapshot()
+        records = _read_journal(self.compacting_path) + _read_journal(self.journal_path)
+        return snapshot, self._snapshot_version(), records
+
+    def _fold_all(self, snapshot, snapshot_version, records, columns=None):
+        snapshot = self._migrate(snapshot, snapshot_version)
+        return fold_records(snapshot, self._upgrade_records(records), key=self.key, columns=columns)
+
+    def load(self, columns=None):
+        """Retourne le registre complet (snapshot + journal), au dernier schéma."""
+        with file_lock(self.path):
+            snapshot, snapshot_version, records = self._read_all()
+        df = self._fold_all(snapshot, snapshot_version, records, columns=columns)
+        if snapshot_version < self.schema_version and os.path.exists(self.path):
+            # Mise à niveau du fichier en tâche de fond : le premier affichage n'attend pas
+            self.compact_in_background()
+        if df.empty and columns is not None:
+            return pd.DataFrame(columns=columns)
+        return df
+
+    def load_columns(self, columns):
+        """
+        Retourne seulement les colonnes demandées. Lit le snapshot colonnaire
+        memory-mappé s'il est à jour, sinon le CSV limité à ces colonnes.
+        """
+        wanted = list(columns) + ([self.key] if self.key not in columns else [])
+        with file_lock(self.path):
+            snapshot_version = self._snapshot_version()
+            current = snapshot_version >= self.schema_version
+            fresh = current and is_fresh(self.columnar_path, self.path)
+            if fresh:
+                base = read_columnar(self.columnar_path, wanted)
+            elif not current:
+                # Ancien schéma : les migrations ont besoin de toutes les colonnes
+                base = self._migrate(self._read_snapshot(), snapshot_version)
+            elif os.path.exists(self.path):
+                base = pd.read_csv(self.path, usecols=lambda c: c in wanted)
+            else:
+                base = pd.DataFrame()
+            records = _read_journal(self.compacting_path) + _read_journal(self.journal_path)
+        if not fresh and os.path.exists(self.path):
+            self.compact_in_background()
+        records = self._upgrade_records(records)
+        records = [{k: v for k, v in r.items() if k in wanted or k == "_op"} for r in records]
+        df = fold_records(base, records, key=self.key, columns=columns)
+        return df[list(columns)]
+
+    def load_rows(self, keys):
+        """
+        Lignes complètes de quelques patients (une page de la vue détaillée), dans l'ordre de keys.
+        Snapshot colonnaire à jour : seule la colonne clé et les lignes demandées sont lues.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return pd.DataFrame()
+        with file_lock(self.path):
+            fresh = self._snapshot_version() >= self.schema_version and is_fresh(self.columnar_path, self.path)
+            if fresh:
+                ids = read_columnar(self.columnar_path, [self.key])[self.key]
+                base = read_columnar(self.columnar_path, rows=np.flatnonzero(ids.isin(keys).to_numpy()))
+                records = _read_journal(self.compacting_path) + _read_journal(self.journal_path)
+        if fresh:
+            wanted = set(keys)
+            records = [r for r in self._upgrade_records(records) if r.get(self.key) in wanted]
+            df = fold_records(base, records, key=self.key)
+        else:
+            df = self.load()
+            df = df[df[self.key].isin(keys)] if len(df) else df
+        if not len(df):
+            return df
+        order = pd.Index(keys).get_indexer(df[self.key])
+        return df.iloc[np.argsort(order, kind="stable")].reset_index(drop=True)
+
+    def _write_columnar(self, df):
+        write_columnar(df, self.columnar_path, source_path=self.path)
+
+    def _write_journal(self, *records):
+        # Appelé sous verrou : les versions encadrent exactement cette écriture (un seul fsync)
+        if self.migrations:
+            records = [{**r, VERSION_FIELD: self.schema_version} for r in records]
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=_json_default) + "\n" for r in records)
+        before = self.version()
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending += len(records)
+        self._local.last_write = (before, self.version())
+
+    def append(self, row):
+        """Ajoute une évaluation au journal ; coût constant."""
+        self.append_many([row])
+
+    def append_many(self, rows):
+        """Plusieurs évaluations en un seul cycle verrou -> écriture -> fsync (commit groupé)."""
+        with file_lock(self.path):
+            if self.key is not None and not os.path.exists(self.index_path):
+                # Index construit à partir du registre existant avant d'y ajouter les nouvelles clés
+                self._load_keys()
+            self._write_journal(*rows)
+            if self.key is not None:
+                self._index_keys([r[self.key] for r in rows if r.get(self.key) is not None])
+        if self._pending >= self.compact_every:
+            self.compact_in_background()
+
+    def update(self, key_value, fields):
+        """
+        Modifie les champs d'un seul patient (ex : {"Notes": ...}) via un patch journalisé.
+        Retourne False si l'ID est inconnu. Ne relit ni ne réécrit le registre.
+        """
+        with file_lock(self.path):
+            if str(key_value) not in self._load_keys():
+                self._local.last_write = None
+                return False
+            self._write_journal({"_op": "patch", self.key: key_value, **fields})
+        if self._pending >= self.compact_every:
+            self.compact_in_background()
+        return True
+
+    def __contains__(self, key_value):
+        with file_lock(self.path):
+            return str(key_value) in self._load_keys()
+
+    # -----------------------
+    # Index des clés (<registre>.idx, une clé par ligne, ajout seul)
+    # -----------------------
+    def _index_keys(self, keys, rewrite=False):
+        mode = "w" if rewrite else "a"
+        with open(self.index_path, mode, encoding="utf-8") as f:
+            f.writelines(f"{k}\n" for k in keys)
+
+    def _load_keys(self):
+        """Ensemble des IDs connus, rafraîchi en ne lisant que la fin de l'index (appelé sous verrou)."""
+        if not os.path.exists(self.index_path):
+            # Construction unique à partir du registre existant
+            df = self._fold_all(*self._read_all())
+            keys = df[self.key].astype(str).tolist() if self.key in df.columns else []
+            self._index_keys(keys, rewrite=True)
+        stat = os.stat(self.index_path)
+        if self._keys is None or stat.st_ino != self._index_ino or stat.st_size < self._index_pos:
+            # Index réécrit (write_snapshot) : relecture complète
+            self._keys, self._index_pos, self._index_ino = set(), 0, stat.st_ino
+        if stat.st_size > self._index_pos:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                f.seek(self._index_pos)
+                self._keys.update(line.rstrip("\n") for line in f)
+                self._index_pos = f.tell()
+        return self._keys
+
+    def write_snapshot(self, df):
+        """Remplace tout le registre (ex : édition de notes) et vide le journal."""
+        with file_lock(self.path):
+            self._local.last_write = None
+            write_csv_atomic(df, self.path)
+            self._write_schema_version()
+            self._write_columnar(df)
+            for p in (self.compacting_path, self.journal_path):
+                if os.path.exists(p):
+                    os.remove(p)
+            self._pending = 0
+            if self.key is not None and self.key in df.columns:
+                tmp_path = f"{self.index_path}.tmp-{os.getpid()}"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.writelines(f"{k}\n" for k in df[self.key].astype(str))
+                os.replace(tmp_path, self.index_path)
+
+    def compact(self):
+        """Replie le journal dans le snapshot."""
+        with file_lock(self.path):
+            # Les nouveaux ajouts partent dans un journal neuf pendant la compaction
+            if os.path.exists(self.journal_path) and not os.path.exists(self.compacting_path):
+                os.replace(self.journal_path, self.compacting_path)
+            self._pending = 0
+            source = _stat_sig(self.path)
+            snapshot = self._read_snapshot()
+            snapshot_version = self._snapshot_version()
+        records = _read_journal(self.compacting_path)
+        if not records and (snapshot_version >= self.schema_version or snapshot.empty):
+            if not snapshot.empty and not is_fresh(self.columnar_path, self.path):
+                with file_lock(self.path):
+                    self._write_columnar(snapshot)
+            return
+        df = self._fold_all(snapshot, snapshot_version, records)
+        with file_lock(self.path):
+            if _stat_sig(self.path) != source:
+                # Snapshot réécrit entre-temps (rewrite_snapshot) : .compacting reste en place,
+                # la prochaine compaction le repliera dans le nouveau snapshot
+                return
+            write_csv_atomic(df, self.path)
+            # Un crash avant la ligne suivante fait rejouer les migrations : elles sont idempotentes
+            self._write_schema_version()
+            self._write_columnar(df)
+            # Un crash ici laisse .compacting en place : le rejeu est idempotent par clé
+            if os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+
+    def _key_dtype(self):
+        # Clé relue telle qu'écrite (un ID "000123" ne devient pas 123 en réécrivant le fichier)
+        return {self.key: str} if self.key is not None else None
+
+    def iter_snapshot(self, chunksize=100000):
+        """Parcourt le snapshot CSV par morceaux, au dernier schéma (sans le journal)."""
+        with file_lock(self.path):
+            snapshot_version = self._snapshot_version()
+            if not os.path.exists(self.path):
+                return
+            src = open(self.path, "r", encoding="utf-8")
+        with src:
+            try:
+                for chunk in pd.read_csv(src, chunksize=chunksize, dtype=self._key_dtype(), low_memory=False):
+                    yield self._migrate(chunk, snapshot_version)
+            except pd.errors.EmptyDataError:
+                return
+
+    def rewrite_snapshot(self, transform, chunksize=100000):
+        """
+        Réécrit le snapshot CSV morceau par morceau, en mémoire bornée :
+        transform(chunk) -> chunk, chaque morceau étant au dernier schéma.
+        Le journal n'est pas touché (voir journal_rows). Retourne False si le
+        snapshot a changé pendant la réécriture (compaction, write_snapshot) :
+        rien n'est remplacé et l'opération est à relancer.
+        """
+        with file_lock(self.path):
+            source = _stat_sig(self.path)
+            snapshot_version = self._snapshot_version()
+        if source is None:
+            return True
+        tmp_path = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            # Lecture hors verrou : les écritures remplacent le fichier par rename, ce descripteur reste cohérent
+            with open(self.path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as out:
+                header = True
+                try:
+                    for chunk in pd.read_csv(src, chunksize=chunksize, dtype=self._key_dtype(), low_memory=False):
+                        chunk = transform(self._migrate(chunk, snapshot_version))
+                        chunk.to_csv(out, header=header, index=False)
+                        header = False
+                except pd.errors.EmptyDataError:
+                    return True
+                out.flush()
+                os.fsync(out.fileno())
+            with file_lock(self.path):
+                if _stat_sig(self.path) != source:
+                    return False
+                os.replace(tmp_path, self.path)
+                self._write_schema_version()
+                self._local.last_write = None
+            # Le snapshot colonnaire n'est plus à jour : reconstruit par la prochaine compaction
+            return True
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def journal_rows(self):
+        """Évaluations complètes encore dans le journal (non compactées), au dernier schéma."""
+        with file_lock(self.path):
+            records = _read_journal(self.compacting_path) + _read_journal(self.journal_path)
+        rows = [r for r in self._upgrade_records(records) if r.get("_op") != "patch"]
+        return fold_records(pd.DataFrame(), rows, key=self.key)
+
+    def search(self, text):
+        """Recherche plein texte (ID, âge, traitement...) sur tout le registre."""
+        df = self.load()
+        if not text or df.empty:
+            return df
+        text = text.lower()
+        mask = df.astype(str).apply(lambda col: col.str.lower().str.contains(text, regex=False)).any(axis=1)
+        return df[mask]
+
+    def compact_in_background(self):
+        """Lance compact() dans un thread démon (un seul à la fois)."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+
+# -----------------------
+# Écritures CSV concurrentes (group commit)
+# -----------------------
+class _Ticket:
+    def __init__(self, row):
+        self.row = row
+        self.done = threading.Event()
+        self.error = None
+
+
+class RegistryWriter:
+    """
+    Ajouts à un registre (PatientJournal ou SQLiteRegistry), sûrs entre sessions et processus.
+
+    Le premier appelant devient « leader » : il attend GROUP_COMMIT_WINDOW, récupère
+    toutes les lignes arrivées entre-temps, puis les écrit en un seul
+    store.append_many (un verrou, un fsync). Les autres appelants attendent
+    simplement la fin de ce commit groupé. on_commit(lignes, store.last_write()) est
+    appelé par le leader avant de libérer les appelants (mise à jour d'un cache).
+    """
+
+    def __init__(self, store, window=GROUP_COMMIT_WINDOW, on_commit=None):
+        self.store = store
+        self.window = window
+        self.on_commit = on_commit
+        self._mutex = threading.Lock()
+        self._queue = []
+        self._leader = False
+
+    def append(self, row):
+        ticket = _Ticket(row)
+        with self._mutex:
+            self._queue.append(ticket)
+            lead = not self._leader
+            self._leader = True
+        if lead:
+            time.sleep(self.window)
+            with self._mutex:
+                batch, self._queue = self._queue, []
+                self._leader = False
+            self._commit(batch)
+        ticket.done.wait()
+        if ticket.error is not None:
+            raise ticket.error
+
+    def _commit(self, batch):
+        try:
+            rows = [t.row for t in batch]
+            self.store.append_many(rows)
+            if self.on_commit is not None:
+                self.on_commit(rows, self.store.last_write())
+        except Exception as e:
+            for t in batch:
+                t.error = e
+        finally:
+            for t in batch:
+                t.done.set()
+
+
+# -----------------------
+# Allocation des IDs patients
+# -----------------------
+def _max_numeric_id(csv_path, column, prefix):
+    """Plus grand numéro déjà attribué dans un registre existant (amorçage unique)."""
+    if not os.path.exists(csv_path):
+        return 0
+    try:
+        ids = pd.read_csv(csv_path, usecols=[column])[column].dropna().astype(str)
+    except (ValueError, pd.errors.EmptyDataError):
+        return 0
+    # Suffixes entièrement numériques seulement : les anciens IDs H-<hex uuid> (H-12E45678...) sont ignorés
+    digits = ids.str.extract(f"^{re.escape(prefix)}-(\\d+)$", expand=False).dropna()
+    return max((int(d) for d in digits), default=0)
+
+
+class IdAllocator:
+    """
+    Attribution d'IDs patients séquentiels (H-001, H-002...) sans collision.
+
+    Le dernier numéro attribué est persisté dans <registre>.seq et incrémenté sous
+    le verrou de ce compteur (<registre>.seq.lock, pas celui du registre) :
+    l'allocation ne lit jamais le fichier de données. Avec block > 1,
+    chaque processus réserve un bloc de numéros et le distribue en mémoire.
+
+    Un compteur correspond à une seule série d'IDs (colonne, préfixe, largeur) :
+    une autre série dans le même fichier prend son propre counter_path.
+    """
+
+    def __init__(self, registry_path, prefix="H", width=3, block=1, seed_column=None, counter_path=None):
+        self.counter_path = counter_path or registry_path + ".seq"
+        self.registry_path = registry_path
+        self.prefix = prefix
+        self.width = width
+        self.block = block
+        self.seed_column = seed_column
+        self._mutex = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def _read_counter(self):
+        if os.path.exists(self.counter_path):
+            with open(self.counter_path, "r") as f:
+                return int(f.read().strip() or 0)
+        # Premier lancement : reprendre après les IDs déjà présents dans le registre
+        if self.seed_column is not None:
+            return _max_numeric_id(self.registry_path, self.seed_column, self.prefix)
+        return 0
+
+    def _reserve(self, n):
+        with file_lock(self.counter_path):
+            last = self._read_counter()
+            tmp_path = f"{self.counter_path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w") as f:
+                f.write(str(last + n))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.counter_path)
+        return last + 1, last + n + 1
+
+    def next_number(self):
+        with self._mutex:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve(self.block)
+            number = self._next
+            self._next += 1
+            return number
+
+    def next_id(self):
+        return f"{self.prefix}-{str(self.next_number()).zfill(self.width)}"
+
+
+# -----------------------
+# Choix du backend
+# -----------------------
+def open_registry(path, key="ID", migrations=()):
+    """
+    Retourne le registre adapté à l'extension du fichier :
+    .db / .sqlite -> SQLiteRegistry, sinon CSV + journal (PatientJournal).
+    """
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        from vigior_sqlite import SQLiteRegistry
+        return SQLiteRegistry(path, key=key, migrations=migrations)
+    return PatientJournal(path, key=key, migrations=migrations)
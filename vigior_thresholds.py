@@ -0,0 +1,411 @@
+# vigior_thresholds.py
+"""
+Recherche sur grille des seuils de décision (sensibilité / spécificité / Youden).
+
+Les seuils des pages sont des constantes : score_avn >= 50, score_pseu >= 30
+(AMI.py, AVGH01.py), pourcentage > 50 (app.py), score <= 5 / <= 10
+(vigior_simp.py). Ici, à partir de données dont l'évolution est connue
+(SdL de vigior_base_donnees.csv, colonne de suivi du registre), toutes les
+combinaisons de seuils sont évaluées d'un coup.
+
+Principe : chaque prédicteur est ramené à l'indice de sa case dans la grille
+de seuils (np.searchsorted), puis les patients sont comptés par case
+(histogramme à k dimensions, positifs et négatifs séparément). Les vrais /
+faux positifs de toutes les combinaisons s'obtiennent par sommes cumulées
+le long de chaque axe :
+
+    combine="all"  positif si tous les prédicteurs dépassent leur seuil
+    combine="any"  positif si au moins un dépasse (cascade « ... or ... »)
+
+Le coût est O(patients + combinaisons) au lieu de O(patients x combinaisons) :
+une grille de 10^6 combinaisons se calcule en moins d'une seconde. Le seul
+passage sur les données (histogramme) est réparti par morceaux entre les
+cœurs (ProcessPoolExecutor) pour les gros registres.
+
+    python vigior_thresholds.py                                   # sdl + app sur vigior_base_donnees.csv
+    python vigior_thresholds.py --preset humerus --data registre.csv      # étiquette : colonne complication
+    python vigior_thresholds.py --verify                          # grille == calcul direct + benchmark
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from vigior_features import FeatureTransformer
+from vigior_scoring import as_flag, score_frame, sdl_score_batch
+
+DATASET = "vigior_base_donnees.csv"
+CHUNKSIZE = 1000000
+OPERATORS = (">=", ">", "<=", "<")
+
+
+class Predictor:
+    """Variable seuillée : positif si valeur <op> seuil, pour chaque seuil de la grille (croissante)."""
+
+    def __init__(self, name, thresholds, op=">="):
+        if op not in OPERATORS:
+            raise ValueError(f"Opérateur inconnu : {op} ({', '.join(OPERATORS)})")
+        thresholds = np.unique(np.asarray(thresholds, dtype=float))
+        if not len(thresholds):
+            raise ValueError(f"{name} : grille de seuils vide")
+        self.name = name
+        self.thresholds = thresholds
+        self.op = op
+
+    def __repr__(self):
+        return f"<Predictor {self.name} {self.op} [{self.thresholds[0]:g} .. {self.thresholds[-1]:g}] x{len(self)}>"
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    @property
+    def upper(self):
+        return self.op in (">=", ">")
+
+    def bins(self, values):
+        """
+        Case de chaque valeur (0..T) telle que « positif au seuil j <=> j < case », en
+        comptant les seuils dans l'ordre croissant (>=, >) ou décroissant (<=, <).
+        """
+        t = self.thresholds
+        if self.op == ">=":
+            return np.searchsorted(t, values, side="right")
+        if self.op == ">":
+            return np.searchsorted(t, values, side="left")
+        if self.op == "<=":
+            return len(t) - np.searchsorted(t, values, side="left")
+        return len(t) - np.searchsorted(t, values, side="right")
+
+
+def _histogram(task):
+    """Patients par case (positifs, négatifs) sur un morceau : deux tableaux aplatis."""
+    predictors, values, labels = task
+    shape = tuple(len(p) + 1 for p in predictors)
+    flat = np.ravel_multi_index([p.bins(v) for p, v in zip(predictors, values)], shape)
+    size = int(np.prod(shape))
+    return (np.bincount(flat[labels], minlength=size), np.bincount(flat[~labels], minlength=size))
+
+
+class GridResult:
+    """Vrais / faux positifs de chaque combinaison de seuils (tableaux de forme (T1, ..., Tk))."""
+
+    def __init__(self, predictors, combine, tp, fp, positives, negatives, dropped=0, seconds=0.0):
+        self.predictors = predictors
+        self.combine = combine
+        self.tp = tp
+        self.fp = fp
+        self.positives = positives
+        self.negatives = negatives
+        self.dropped = dropped
+        self.seconds = seconds
+
+    @property
+    def shape(self):
+        return self.tp.shape
+
+    @property
+    def size(self):
+        return self.tp.size
+
+    @property
+    def sensitivity(self):
+        return self.tp / self.positives if self.positives else np.full(self.shape, np.nan)
+
+    @property
+    def specificity(self):
+        return 1 - self.fp / self.negatives if self.negatives else np.full(self.shape, np.nan)
+
+    @property
+    def youden(self):
+        return self.sensitivity + self.specificity - 1
+
+    def _rows(self, flat):
+        index = np.unravel_index(flat, self.shape)
+        data = {p.name: p.thresholds[i] for p, i in zip(self.predictors, index)}
+        tp, fp = self.tp.ravel()[flat], self.fp.ravel()[flat]
+        data.update({
+            "TP": tp, "FP": fp, "FN": self.positives - tp, "TN": self.negatives - fp,
+            "sensitivity": self.sensitivity.ravel()[flat], "specificity": self.specificity.ravel()[flat],
+            "youden": self.youden.ravel()[flat],
+        })
+        with np.errstate(invalid="ignore", divide="ignore"):
+            data["ppv"] = np.where(tp + fp > 0, tp / (tp + fp), np.nan)
+        return pd.DataFrame(data)
+
+    def frame(self):
+        """Toutes les combinaisons au format long (une ligne par combinaison)."""
+        return self._rows(np.arange(self.size))
+
+    def at(self, **thresholds):
+        """Métriques d'une combinaison (seuils actuels des pages, par exemple)."""
+        index = []
+        for p in self.predictors:
+            j = np.flatnonzero(p.thresholds == thresholds[p.name])
+            if not len(j):
+                raise KeyError(f"{p.name} = {thresholds[p.name]} absent de la grille")
+            index.append(j[0])
+        return self._rows(np.array([np.ravel_multi_index(index, self.shape)])).iloc[0]
+
+    def best(self, top=10, by="youden", min_sensitivity=None, min_specificity=None):
+        """Meilleures combinaisons (contraintes de sensibilité / spécificité minimales en option)."""
+        score = getattr(self, by).ravel().copy()
+        if min_sensitivity is not None:
+            score[self.sensitivity.ravel() < min_sensitivity] = np.nan
+        if min_specificity is not None:
+            score[self.specificity.ravel() < min_specificity] = np.nan
+        valid = np.flatnonzero(~np.isnan(score))
+        order = valid[np.argsort(-score[valid], kind="stable")[:top]]
+        return self._rows(order).reset_index(drop=True)
+
+    def frontier(self):
+        """Compromis sensibilité / spécificité non dominés (une combinaison par point)."""
+        sens, spec = self.sensitivity.ravel(), self.specificity.ravel()
+        order = np.lexsort((-spec, -sens))
+        best_spec = np.maximum.accumulate(spec[order])
+        keep = np.r_[True, best_spec[1:] > best_spec[:-1]]
+        return self._rows(order[keep]).reset_index(drop=True)
+
+
+def grid_search(values, labels, predictors, combine="any", workers=1, chunksize=CHUNKSIZE):
+    """
+    values : {nom du prédicteur: tableau}, labels : tableau bool (évolution observée).
+    Patients sans étiquette ou avec un prédicteur manquant : ignorés (comptés dans dropped).
+    workers > 1 : histogramme calculé par morceaux dans un pool de processus.
+    """
+    if combine not in ("any", "all"):
+        raise ValueError("combine : 'any' ou 'all'")
+    start = time.perf_counter()
+    columns = [np.asarray(values[p.name], dtype=float) for p in predictors]
+    labels = pd.Series(labels)
+    keep = labels.notna().to_numpy() & np.logical_and.reduce([~np.isnan(c) for c in columns])
+    labels = labels.to_numpy()[keep].astype(bool)
+    columns = [c[keep] for c in columns]
+    n = len(labels)
+
+    bounds = range(0, n, chunksize)
+    tasks = [(predictors, [c[i:i + chunksize] for c in columns], labels[i:i + chunksize]) for i in bounds]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_histogram, tasks))
+    else:
+        parts = [_histogram(t) for t in tasks]
+    shape = tuple(len(p) + 1 for p in predictors)
+    hist_pos = sum((p[0] for p in parts), np.zeros(int(np.prod(shape)), dtype=np.int64)).reshape(shape)
+    hist_neg = sum((p[1] for p in parts), np.zeros(int(np.prod(shape)), dtype=np.int64)).reshape(shape)
+
+    tp, fp = (_predicted_positive(h, combine) for h in (hist_pos, hist_neg))
+    # Axes des opérateurs <= / < : seuils comptés en ordre décroissant, remis en ordre croissant
+    flip = tuple(axis for axis, p in enumerate(predictors) if not p.upper)
+    if flip:
+        tp, fp = np.flip(tp, flip), np.flip(fp, flip)
+    return GridResult(predictors, combine, np.ascontiguousarray(tp), np.ascontiguousarray(fp),
+                      int(labels.sum()), int((~labels).sum()), dropped=int((~keep).sum()),
+                      seconds=time.perf_counter() - start)
+
+
+def _predicted_positive(hist, combine):
+    """Positifs prédits pour chaque combinaison j : cases b avec b > j sur tous les axes (all) ou un axe (any)."""
+    out = hist
+    if combine == "all":
+        for axis in range(hist.ndim):
+            out = np.flip(np.cumsum(np.flip(out, axis), axis=axis), axis)
+        return out[(slice(1, None),) * hist.ndim]
+    for axis in range(hist.ndim):
+        out = np.cumsum(out, axis=axis)
+    return hist.sum() - out[(slice(None, -1),) * hist.ndim]
+
+
+# -----------------------
+# Préréglages
+# -----------------------
+SCHATZKER = {"Schatzker I": 1, "Schatzker II": 2, "Schatzker III": 3, "Schatzker IV": 4, "Schatzker V": 5,
+             "Schatzker VI": 6}
+
+
+def sdl_preset(df):
+    """
+    Score /15 de vigior_simp.py calculé sur vigior_base_donnees.csv.
+    score > 5 : fixateur externe ou fasciotomie ; score > 10 : fasciotomie.
+
+    vigior_simp.py compte +2 si la largeur de la fracture est >= 30 mm. Cette mesure
+    n'existe pas dans vigior_base_donnees.csv (largeur_hematome, ~2-6, n'est pas la
+    même grandeur) : sans colonne largeur_fracture_mm, le terme est compté à 0 et
+    le rapport l'indique (« sans largeur de fracture », score ramené à /13).
+    """
+    if "largeur_fracture_mm" in df.columns:
+        largeur, note = df["largeur_fracture_mm"], ""
+    else:
+        largeur, note = np.zeros(len(df)), " (sans largeur de fracture : /13)"
+    score = sdl_score_batch(df["age"], df["sexe"].map({"H": "Homme", "F": "Femme"}),
+                            df["fracture_type"].map(SCHATZKER), df["fragments"], largeur,
+                            df["ratio_muscle_graisse"])
+    return ({"score": score}, [Predictor("score", np.arange(-1, 16), ">")],
+            {f"vigior_simp.py score > 5{note}": {"score": 5}, f"vigior_simp.py score > 10{note}": {"score": 10}})
+
+
+def app_preset(df, folds=5, seed=42):
+    """
+    Risque (%) du RandomForest d'app.py, prédit hors échantillon (validation croisée stratifiée)
+    pour que le seuil ne soit pas choisi sur des patients vus à l'entraînement.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    if df["SdL"].nunique() < 2:
+        raise ValueError("une seule classe de SdL : validation croisée du RandomForest impossible")
+    # Même transformation que train_model_loges.py
+    X = FeatureTransformer.fit(df).frame(df)
+    model = RandomForestClassifier(n_estimators=100, random_state=seed)
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    proba = cross_val_predict(model, X, df["SdL"], cv=cv, method="predict_proba")[:, 1]
+    pourcentage = np.round(proba * 100, 2)
+    return ({"pourcentage": pourcentage}, [Predictor("pourcentage", np.arange(0, 100.5, 0.5), ">")],
+            {"app.py pourcentage > 50": {"pourcentage": 50}})
+
+
+def humerus_preset(df, step=1):
+    """Scores VIGIOR-H du registre ; arthroplastie / ORIF si S_AVN >= a ou S_PSEU >= b ou S_FAIL_FIX >= c."""
+    scores = score_frame(df)
+    grid = np.arange(0, 100 + step / 2, step)
+    names = ["S_AVN", "S_PSEU", "S_FAIL_FIX"]
+    return ({c: scores[c].to_numpy() for c in names}, [Predictor(c, grid, ">=") for c in names],
+            {"AMI.py / AVGH01.py": {"S_AVN": 50, "S_PSEU": 30, "S_FAIL_FIX": 30}})
+
+
+PRESETS = {"sdl": sdl_preset, "app": app_preset, "humerus": humerus_preset}
+# Colonne de l'évolution observée de chaque préréglage (--label la remplace)
+LABELS = {"sdl": "SdL", "app": "SdL", "humerus": "complication"}
+
+
+def outcome_labels(values, positive=None):
+    """
+    Étiquettes 0/1, booléennes ou Oui/Non (même normalisation que as_flag), ou texte libre
+    (outcome_reel) : positif si le texte correspond à `positive`. Vide ou manquant : NaN.
+    """
+    values = pd.Series(values)
+    if positive is None:
+        missing = values.isna() | values.astype(str).str.strip().eq("")
+        return pd.Series(as_flag(values), index=values.index, dtype=object).mask(missing)
+    pattern = re.compile(positive, re.IGNORECASE)
+    return values.map(lambda v: np.nan if pd.isna(v) or not str(v).strip() else bool(pattern.search(str(v))))
+
+
+# -----------------------
+# Vérification / benchmark
+# -----------------------
+def verify(n=5000, samples=300, seed=0):
+    """Compare la grille au calcul direct patient par patient sur des combinaisons tirées au hasard."""
+    rng = np.random.default_rng(seed)
+    values = {"a": rng.integers(0, 30, n).astype(float), "b": rng.normal(0, 1, n).round(1),
+              "c": rng.integers(0, 10, n).astype(float)}
+    labels = rng.random(n) < 0.3
+    mismatches = 0
+    for combine in ("any", "all"):
+        for ops in ((">=", ">", "<"), ("<=", ">=", ">")):
+            predictors = [Predictor("a", np.arange(0, 31, 2), ops[0]), Predictor("b", np.arange(-2, 2.01, 0.25), ops[1]),
+                          Predictor("c", np.arange(-1, 11), ops[2])]
+            result = grid_search(values, labels, predictors, combine=combine)
+            for _ in range(samples):
+                j = tuple(rng.integers(0, len(p)) for p in predictors)
+                fires = [_compare(values[p.name], p.op, p.thresholds[i]) for p, i in zip(predictors, j)]
+                pred = np.logical_and.reduce(fires) if combine == "all" else np.logical_or.reduce(fires)
+                if int((pred & labels).sum()) != result.tp[j] or int((pred & ~labels).sum()) != result.fp[j]:
+                    mismatches += 1
+    return mismatches
+
+
+def _compare(values, op, threshold):
+    return {">=": values >= threshold, ">": values > threshold, "<=": values <= threshold,
+            "<": values < threshold}[op]
+
+
+def benchmark(n=1000000, workers=None, seed=0):
+    """Grille 101^3 (≈ 10^6 combinaisons) des scores VIGIOR-H sur n patients synthétiques."""
+    from vigior_scoring import random_cohort
+
+    df = random_cohort(n, seed)
+    values, predictors, _ = humerus_preset(df)
+    labels = np.random.default_rng(seed + 1).random(n) < values["S_AVN"] / 150
+    timings = {}
+    for w in sorted({1, workers or os.cpu_count() or 1}):
+        result = grid_search(values, labels, predictors, combine="any", workers=w, chunksize=n // 4 or 1)
+        timings[w] = result.seconds
+    return result, timings
+
+
+# -----------------------
+# Ligne de commande
+# -----------------------
+def print_report(title, result, current, top=10, min_sensitivity=None):
+    print(f"== {title} : {result.positives} positifs / {result.negatives} négatifs"
+          f"{f' ({result.dropped} ignorés)' if result.dropped else ''}, "
+          f"{result.size} combinaisons en {result.seconds * 1000:.0f} ms")
+    for name, thresholds in current.items():
+        r = result.at(**thresholds)
+        print(f"  seuil actuel {name} : sensibilité {r['sensitivity']:.3f}, spécificité {r['specificity']:.3f}, "
+              f"Youden {r['youden']:.3f}")
+    by = "youden"
+    if not (result.positives and result.negatives):
+        print("  une seule classe observée : spécificité et Youden non calculables")
+        by = "sensitivity" if result.positives else "specificity"
+    print(result.best(top, by=by, min_sensitivity=min_sensitivity).round(3).to_string(index=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recherche sur grille des seuils de décision VIGIOR.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), action="append",
+                        help="prédicteurs et seuils actuels (défaut : sdl et app)")
+    parser.add_argument("--data", help=f"CSV étiqueté (défaut : {DATASET}, ou registre humérus pour humerus)")
+    parser.add_argument("--label", help="colonne de l'évolution observée (défaut : SdL ; complication pour humerus)")
+    parser.add_argument("--positive", help="expression régulière : étiquette texte positive (outcome_reel)")
+    parser.add_argument("--combine", choices=["any", "all"], default="any")
+    parser.add_argument("--min-sensitivity", type=float)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--workers", type=int, help="processus pour l'histogramme (défaut : tous les cœurs)")
+    parser.add_argument("--csv", help="écrit toutes les combinaisons (une seule recherche)")
+    parser.add_argument("--verify", action="store_true", help="vérification contre le calcul direct + benchmark")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        bad = verify()
+        result, timings = benchmark(workers=args.workers)
+        print(f"grille == calcul direct : {bad} écart(s)")
+        for w, s in timings.items():
+            print(f"{result.size} combinaisons x {result.positives + result.negatives} patients, "
+                  f"{w} processus : {s:.2f} s")
+        return 0 if bad == 0 else 1
+
+    presets = args.preset or ["sdl", "app"]
+    for name in presets:
+        if args.data:
+            df = pd.read_csv(args.data)
+        elif name == "humerus":
+            from vigior_engine import get_engine
+            df = get_engine().frame("humerus")
+        else:
+            df = pd.read_csv(DATASET)
+        label = args.label or LABELS[name]
+        if label not in df.columns:
+            print(f"{name} : colonne d'étiquette {label} absente ({', '.join(df.columns)})")
+            return 1
+        try:
+            values, predictors, current = PRESETS[name](df)
+        except ValueError as e:
+            print(f"== {name} : {e}")
+            continue
+        labels = outcome_labels(df[label], args.positive)
+        result = grid_search(values, labels, predictors, combine=args.combine, workers=args.workers)
+        print_report(name, result, current, args.top, args.min_sensitivity)
+        if args.csv:
+            result.frame().to_csv(args.csv, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+# vigior_training.py
+"""
+Recherche d'hyperparamètres du RandomForest d'app.py (train_model_loges.py --search).
+
+train_model_loges.py entraîne une seule forêt (n_estimators=100) sur une
+seule coupe 80/20. Ici, chaque combinaison de la grille
+
+    n_estimators x max_depth x min_samples_leaf
+
+est évaluée par validation croisée stratifiée à k plis (mêmes plis pour
+toutes les combinaisons), les essais étant répartis entre les cœurs
+(ProcessPoolExecutor, une forêt mono-thread par processus). Le classement
+se fait sur l'AUC moyenne hors pli, puis la log-vraisemblance.
+
+Cache : un fichier JSON par essai, rangé sous l'empreinte des données
+(SHA-256 de X et y) et des paramètres de validation croisée ; relancer la
+recherche ne recalcule que les essais absents. Changer une seule ligne du
+CSV change l'empreinte, donc tous les essais sont refaits.
+
+Entraînement par morceaux (train_model_loges.py --stream) : le CSV n'est
+jamais chargé en entier. Une première passe ne lit que fracture_type et SdL
+(nombre de lignes, catégories, classes) ; la seconde lit chunksize lignes à
+la fois, les encode avec la transformation ajustée sur le fichier entier
+(vigior_features, mêmes codes que l'encodage complet), et ajoute à la
+forêt quelques arbres ajustés sur ce morceau (warm_start), ou sur un
+échantillon uniforme des morceaux lus depuis le dernier ajustement quand
+il y a plus de morceaux que d'arbres. La forêt finale a toujours
+n_estimators arbres ; la mémoire de pointe est celle de deux morceaux plus
+la forêt, quelle que soit la taille du fichier.
+
+    python train_model_loges.py --search                  # meilleur modèle + classement CSV
+    python train_model_loges.py --stream --chunksize 100000
+    python vigior_training.py                             # grille par défaut, sans sauvegarder de modèle
+    python vigior_training.py --stream-benchmark          # mémoire de pointe : lecture complète vs morceaux
+"""
+import argparse
+import hashlib
+import itertools
+import math
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from vigior_features import SCHATZKER, FeatureTransformer
+
+DATASET = "vigior_base_donnees.csv"
+LABEL = "SdL"
+CACHE_DIR = ".vigior_cv_cache"
+LEADERBOARD = "model_loges_cv.csv"
+PARAM_GRID = {
+    "n_estimators": [100, 300],
+    "max_depth": [None, 4, 8],
+    "min_samples_leaf": [1, 3, 5],
+}
+FOLDS = 5
+SEED = 42
+CHUNKSIZE = 100000
+
+
+# -----------------------
+# Données
+# -----------------------
+def load_dataset(path=DATASET, label=LABEL):
+    """(X, y, transformation ajustée sur le fichier) ; X dans l'ordre de FEATURES."""
+    df = pd.read_csv(path)
+    transformer = FeatureTransformer.fit(df)
+    return transformer.frame(df), df[label], transformer
+
+
+def data_hash(X, y):
+    """Empreinte du jeu d'entraînement : colonnes, valeurs et étiquettes."""
+    h = hashlib.sha256()
+    h.update(json.dumps([list(map(str, X.columns)), str(y.name)]).encode())
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def param_grid(**values):
+    """Produit cartésien des valeurs ; paramètres absents : PARAM_GRID."""
+    grid = {**PARAM_GRID, **values}
+    names = list(grid)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(grid[n] for n in names))]
+
+
+def trial_key(params):
+    return "_".join(f"{k}={params[k]}" for k in sorted(params))
+
+
+# -----------------------
+# Essais
+# -----------------------
+_DATA = None
+
+
+def _init_worker(X, y):
+    global _DATA
+    _DATA = (X, y)
+
+
+def _run_trial(task):
+    """Une combinaison, tous les plis : métriques hors pli moyennes."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, brier_score_loss, log_loss, roc_auc_score
+
+    params, folds, seed = task
+    X, y = _DATA
+    start = time.perf_counter()
+    scores = {"auc": [], "log_loss": [], "brier": [], "accuracy": []}
+    for train, test in folds:
+        model = RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+        model.fit(X.iloc[train], y.iloc[train])
+        proba = model.predict_proba(X.iloc[test])[:, 1]
+        truth = y.iloc[test].to_numpy()
+        scores["auc"].append(roc_auc_score(truth, proba))
+        scores["log_loss"].append(log_loss(truth, proba, labels=model.classes_))
+        scores["brier"].append(brier_score_loss(truth, proba, pos_label=model.classes_[1]))
+        scores["accuracy"].append(accuracy_score(truth, model.classes_[(proba > 0.5).astype(int)]))
+    result = {"params": params}
+    for name, values in scores.items():
+        result[f"{name}_mean"] = float(np.mean(values))
+        result[f"{name}_std"] = float(np.std(values))
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+class TrialCache:
+    """Un JSON par essai sous <root>/<empreinte données + validation croisée>/."""
+
+    def __init__(self, root, digest):
+        self.path = os.path.join(root, digest)
+
+    def _file(self, params):
+        return os.path.join(self.path, trial_key(params) + ".json")
+
+    def get(self, params):
+        try:
+            with open(self._file(params), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, result):
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(result["params"])
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+
+
+class SearchResult:
+    """Essais classés ; best_params et leaderboard() pour train_model_loges.py."""
+
+    def __init__(self, trials, digest, cached, seconds):
+        self.trials = trials
+        self.digest = digest
+        self.cached = cached
+        self.seconds = seconds
+
+    def ranked(self):
+        """Meilleure AUC, puis meilleure log-vraisemblance, puis la forêt la plus petite."""
+        return sorted(self.trials, key=lambda t: (-t["auc_mean"], t["log_loss_mean"], t["params"]["n_estimators"]))
+
+    def leaderboard(self):
+        rows = [{"rank": i, **t["params"], **{k: v for k, v in t.items() if k != "params"}}
+                for i, t in enumerate(self.ranked(), start=1)]
+        return pd.DataFrame(rows)
+
+    @property
+    def best_params(self):
+        return dict(self.ranked()[0]["params"])
+
+
+def search(X, y, grid=None, folds=FOLDS, seed=SEED, workers=None, cache_dir=CACHE_DIR):
+    """
+    Validation croisée stratifiée de chaque combinaison de grid (liste de dicts, défaut param_grid()).
+    Essais déjà en cache (même données, mêmes plis) : relus, pas recalculés.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    grid = param_grid() if grid is None else grid
+    counts = y.value_counts()
+    if len(counts) != 2:
+        raise ValueError(f"{len(counts)} classe(s) de {y.name} : validation croisée stratifiée impossible")
+    if counts.min() < folds:
+        raise ValueError(f"{counts.min()} patient(s) dans la classe minoritaire pour {folds} plis")
+    start = time.perf_counter()
+    digest = hashlib.sha256(f"{data_hash(X, y)}|folds={folds}|seed={seed}".encode()).hexdigest()[:16]
+    cache = TrialCache(cache_dir, digest) if cache_dir else None
+
+    cached = {trial_key(p): cache.get(p) for p in grid} if cache else {}
+    todo = [p for p in grid if cached.get(trial_key(p)) is None]
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y))
+    tasks = [(p, splits, seed) for p in todo]
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    fresh = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+            # Chaque essai est mis en cache dès qu'il se termine : une recherche interrompue reprend là
+            for future in as_completed([pool.submit(_run_trial, t) for t in tasks]):
+                result = future.result()
+                if cache:
+                    cache.put(result)
+                fresh.append(result)
+    else:
+        _init_worker(X, y)
+        for task in tasks:
+            result = _run_trial(task)
+            if cache:
+                cache.put(result)
+            fresh.append(result)
+    done = {trial_key(r["params"]): r for r in fresh}
+    trials = [cached.get(trial_key(p)) or done[trial_key(p)] for p in grid]
+    return SearchResult(trials, digest, len(grid) - len(todo), time.perf_counter() - start)
+
+
+def fit_best(X, y, result, seed=SEED):
+    """Forêt finale : meilleure combinaison, ajustée sur toutes les données."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    return RandomForestClassifier(random_state=seed, **result.best_params).fit(X, y)
+
+
+# -----------------------
+# Entraînement par morceaux
+# -----------------------
+def scan_dataset(path=DATASET, label=LABEL, chunksize=CHUNKSIZE):
+    """Première passe (deux colonnes seulement) : nombre de lignes, catégories de fracture_type, classes."""
+    rows, categories, classes = 0, set(), set()
+    for chunk in pd.read_csv(path, usecols=["fracture_type", label], chunksize=chunksize):
+        rows += len(chunk)
+        categories.update(chunk["fracture_type"].dropna().unique())
+        classes.update(chunk[label].dropna().unique())
+    # Catégories triées : mêmes codes que FeatureTransformer.fit sur le fichier entier
+    return rows, sorted(categories), sorted(classes)
+
+
+def iter_chunks(transformer, path=DATASET, label=LABEL, chunksize=CHUNKSIZE):
+    """(X, y) encodés par transformer, chunksize lignes à la fois."""
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        yield transformer.frame(chunk), chunk[label].reset_index(drop=True)
+
+
+class StreamingResult:
+    def __init__(self, model, transformer, rows, chunks, fits, seconds):
+        self.model = model
+        self.transformer = transformer
+        self.rows = rows
+        self.chunks = chunks
+        self.fits = fits
+        self.seconds = seconds
+
+
+def train_streaming(path=DATASET, label=LABEL, chunksize=CHUNKSIZE, n_estimators=100, seed=SEED, **params):
+    """
+    Forêt de exactement n_estimators arbres construite morceau par morceau. Après le morceau i
+    (sur k), la forêt compte n_estimators * (i + 1) // k arbres ; les nouveaux arbres sont ajustés
+    sur un échantillon uniforme d'au plus chunksize lignes parmi celles lues depuis le dernier
+    ajustement (clés aléatoires, on garde les chunksize plus petites). Avec k <= n_estimators,
+    l'échantillon est le morceau lui-même ; au-delà, la mémoire reste bornée (deux morceaux au plus)
+    et toutes les lignes ont la même chance d'être vues. Un échantillon où une classe manque est
+    complété par les morceaux suivants (tous les arbres doivent voir les mêmes classes).
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    start = time.perf_counter()
+    rows, categories, classes = scan_dataset(path, label, chunksize)
+    if not rows:
+        raise ValueError(f"{path} : aucune ligne")
+    transformer = FeatureTransformer(categories)
+    n_chunks = math.ceil(rows / chunksize)
+    rng = np.random.default_rng(seed)
+    model = RandomForestClassifier(n_estimators=0, warm_start=True, random_state=seed, **params)
+    sample, last, fits = None, None, 0
+    for i, (X, y) in enumerate(iter_chunks(transformer, path, label, chunksize)):
+        keys = rng.random(len(y))
+        if sample is not None:
+            X = pd.concat([sample[0], X], ignore_index=True)
+            y = pd.concat([sample[1], y], ignore_index=True)
+            keys = np.concatenate([sample[2], keys])
+        if len(y) > chunksize:
+            keep = np.sort(np.argpartition(keys, chunksize)[:chunksize])
+            X, y, keys = X.iloc[keep].reset_index(drop=True), y.iloc[keep].reset_index(drop=True), keys[keep]
+        sample = (X, y, keys)
+        target = n_estimators * (i + 1) // n_chunks
+        if target > model.n_estimators and y.nunique() == len(classes):
+            model.n_estimators = target
+            model.fit(X, y)
+            last, sample, fits = (X, y), None, fits + 1
+    if model.n_estimators < n_estimators:
+        # Dernier échantillon sans toutes les classes : complété par l'échantillon précédent
+        X, y = sample[0], sample[1]
+        if last is not None:
+            X, y = pd.concat([last[0], X], ignore_index=True), pd.concat([last[1], y], ignore_index=True)
+        model.n_estimators = n_estimators
+        model.fit(X, y)
+        fits += 1
+    return StreamingResult(model, transformer, rows, n_chunks, fits, time.perf_counter() - start)
+
+
+def write_synthetic(path, rows, chunksize=CHUNKSIZE, seed=0):
+    """CSV au format de vigior_base_donnees.csv (deux classes de SdL), écrit par morceaux."""
+    rng = np.random.default_rng(seed)
+    for i, start in enumerate(range(0, rows, chunksize)):
+        n = min(chunksize, rows - start)
+        chunk = pd.DataFrame({
+            "age": rng.integers(18, 90, n), "sexe": rng.choice(["H", "F"], n),
+            "energie": rng.choice(["haute", "basse"], n), "polytrauma": rng.integers(0, 2, n),
+            "fracture_type": rng.choice(SCHATZKER, n), "fragments": rng.integers(1, 6, n),
+            "largeur_hematome": np.round(rng.normal(30, 10, n), 1),
+            "ratio_muscle_graisse": np.round(rng.normal(1.2, 0.3, n), 2),
+        })
+        logit = 0.08 * (chunk["largeur_hematome"] - 30) + 0.5 * (chunk["energie"] == "haute") - 0.2
+        chunk["SdL"] = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int)
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+
+
+def _peak_mb(fn):
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def stream_benchmark(sizes=(100000, 400000), chunksize=10000, n_estimators=20):
+    """
+    Mémoire de pointe (tracemalloc) : lecture + encodage complets vs entraînement par morceaux
+    (10 puis 40 morceaux pour 20 arbres : moins, puis plus de morceaux que d'arbres).
+    """
+    import tempfile
+
+    # Import de sklearn hors mesure (sinon compté dans la pointe du premier essai)
+    import sklearn.ensemble  # noqa: F401
+
+    out = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"sdl_{rows}.csv")
+            write_synthetic(path, rows)
+            _, full_mb = _peak_mb(lambda: load_dataset(path))
+            result, stream_mb = _peak_mb(lambda: train_streaming(path, chunksize=chunksize,
+                                                                 n_estimators=n_estimators, max_depth=12))
+            out.append({"rows": rows, "chunks": result.chunks, "fits": result.fits,
+                        "trees": len(result.model.estimators_),
+                        "full_read_mb": full_mb, "stream_train_mb": stream_mb, "stream_s": result.seconds})
+    return pd.DataFrame(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recherche d'hyperparamètres / entraînement par morceaux.")
+    parser.add_argument("--stream-benchmark", action="store_true",
+                        help="mémoire de pointe : lecture complète vs entraînement par morceaux")
+    args = parser.parse_args(argv)
+    if args.stream_benchmark:
+        result = stream_benchmark()
+        print(result.round(2).to_string(index=False))
+        # La mémoire et la taille de la forêt ne doivent pas suivre la taille du fichier
+        bounded = result["stream_train_mb"].iloc[-1] < 2 * result["stream_train_mb"].iloc[0]
+        return 0 if bounded and (result["trees"] == 20).all() else 1
+
+    X, y, _ = load_dataset()
+    try:
+        result = search(X, y)
+    except ValueError as e:
+        print(f"Recherche impossible : {e}")
+        return 1
+    print(result.leaderboard().round(4).to_string(index=False))
+    print(f"{len(result.trials)} essais ({result.cached} en cache) en {result.seconds:.1f} s ; "
+          f"meilleur : {result.best_params}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
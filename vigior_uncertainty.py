@@ -0,0 +1,138 @@
+# vigior_uncertainty.py
+"""
+Propagation de l'incertitude de mesure radiographique (Monte Carlo).
+
+L'angle HSA et l'écart interfragmentaire sont mesurés avec une erreur
+inter-observateur de quelques degrés / millimètres, alors que compute_scores
+les traite comme exacts. Ici, des milliers de mesures perturbées sont tirées
+pour un patient, et les scores puis le traitement proposé sont évalués sur
+tous les tirages en un seul lot (compute_scores_batch + vigior_decision) :
+
+  - intervalle de confiance de chaque score (percentiles des tirages) ;
+  - probabilité de chaque traitement, et probabilité que la recommandation
+    change par rapport à celle des mesures telles que saisies.
+
+Erreurs par défaut (écart-type, loi normale) : HSA 5°, écart 1,5 mm ; l'écart
+perturbé est ramené à 0 s'il devient négatif. Le tirage est reproductible
+(seed fixe) : la page n'affiche pas des valeurs différentes à chaque rerun.
+
+Latence par patient (objectif : bien moins de 100 ms) :
+    python vigior_uncertainty.py
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from vigior_decision import propose_treatment_batch
+from vigior_scoring import SCORE_COLUMNS, compute_scores_batch
+
+# Erreur de mesure inter-observateur (écart-type)
+HSA_SD = 5.0
+GAP_SD = 1.5
+SAMPLES = 5000
+
+
+class UncertaintyResult:
+    """Tirages d'un patient : le premier tirage est la mesure saisie (non perturbée)."""
+
+    def __init__(self, scores, treatment, HSA, gap, level):
+        self.scores = scores
+        self.treatment = treatment
+        self.HSA = HSA
+        self.gap = gap
+        self.level = level
+
+    @property
+    def n(self):
+        return len(self.treatment) - 1
+
+    @property
+    def point_treatment(self):
+        return self.treatment[0]
+
+    def intervals(self, level=None):
+        """Score saisi, moyenne et intervalle [bas, haut] au niveau demandé (0,95 par défaut)."""
+        level = self.level if level is None else level
+        q = [(1 - level) / 2 * 100, (1 + level) / 2 * 100]
+        rows = {}
+        for name in SCORE_COLUMNS:
+            values = self.scores[name][1:]
+            low, high = np.percentile(values, q)
+            rows[name] = {"point": self.scores[name][0], "mean": values.mean(), "low": low, "high": high}
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def treatment_probabilities(self):
+        """Probabilité de chaque traitement proposé sur les mesures perturbées."""
+        return pd.Series(self.treatment[1:]).value_counts(normalize=True, sort=True)
+
+    @property
+    def flip_probability(self):
+        """Probabilité que la recommandation diffère de celle des mesures saisies."""
+        codes = self.treatment.codes
+        return float((codes[1:] != codes[0]).mean())
+
+
+def simulate(age, tabac, fragments, HSA, gap, bone_quality, comorbidities, tuberosities_irreparable=None,
+             n=SAMPLES, hsa_sd=HSA_SD, gap_sd=GAP_SD, level=0.95, seed=0, table="vigior_h", lang="fr"):
+    """
+    n mesures perturbées (HSA ~ N(HSA, hsa_sd), gap ~ N(gap, gap_sd) tronqué à 0)
+    évaluées en un seul lot ; retourne un UncertaintyResult.
+    """
+    rng = np.random.default_rng(seed)
+    HSA_s = np.empty(n + 1)
+    gap_s = np.empty(n + 1)
+    HSA_s[0], gap_s[0] = HSA, gap
+    HSA_s[1:] = rng.normal(HSA, hsa_sd, n)
+    gap_s[1:] = np.maximum(rng.normal(gap, gap_sd, n), 0.0)
+
+    size = n + 1
+    age_s = np.full(size, age, dtype=float)
+    fragments_s = np.full(size, fragments, dtype=float)
+    comorbidities_s = np.full(size, comorbidities, dtype=float)
+    bone_s = np.full(size, bone_quality, dtype=object)
+    # AMI.py : tubérosités irréparables et scores non bornés (comme vigior_decision.verify)
+    clip = tuberosities_irreparable is None
+    scores = compute_scores_batch(age_s, bool(tabac), fragments_s, HSA_s, gap_s, bone_s, comorbidities_s,
+                                  tuberosities_irreparable=tuberosities_irreparable, clip=clip)
+    decision = propose_treatment_batch(scores["S_AVN"], scores["S_PSEU"], scores["S_FAIL_FIX"], age_s, fragments_s,
+                                       gap_s, bone_s, comorbidities_s,
+                                       tuberosities_irreparable=bool(tuberosities_irreparable),
+                                       table=table, lang=lang)
+    return UncertaintyResult(scores, decision["Treatment"].array, HSA_s, gap_s, level)
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def benchmark(patients=200, n=SAMPLES, seed=0):
+    """Latence par patient (ms) sur des patients tirés au hasard : médiane et 95e percentile."""
+    from vigior_scoring import random_cohort
+
+    df = random_cohort(patients, seed)
+    timings, flips = [], []
+    for r in df.itertuples(index=False):
+        start = time.perf_counter()
+        result = simulate(r.Age, r.Tabac == "Yes", r.Fragments, r.HSA, r.Gap, r.BoneQuality, r.Comorbidities, n=n)
+        result.intervals()
+        flips.append(result.flip_probability)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings = np.array(timings)
+    return {"n": n, "patients": patients, "median_ms": float(np.median(timings)),
+            "p95_ms": float(np.percentile(timings, 95)), "flip_any": float(np.mean(np.array(flips) > 0))}
+
+
+if __name__ == "__main__":
+    result = simulate(72, True, 3, 128, 4, "poor", 1)
+    print(f"Patient exemple : {result.n} tirages, recommandation « {result.point_treatment} »")
+    print(result.intervals().round(1).to_string())
+    print(f"Probabilité de changement de recommandation : {result.flip_probability:.1%}")
+    print()
+    ok = True
+    for n in (1000, 5000, 20000):
+        r = benchmark(n=n)
+        ok &= r["p95_ms"] < 100
+        print(f"{n:>6} tirages : médiane {r['median_ms']:.1f} ms, p95 {r['p95_ms']:.1f} ms "
+              f"({r['flip_any']:.0%} des patients avec un risque de changement > 0)")
+    sys.exit(0 if ok else 1)
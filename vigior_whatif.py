@@ -0,0 +1,202 @@
+# vigior_whatif.py
+"""
+Balayage de sensibilité « et si ? » pour un patient (page Nouvelle évaluation).
+
+Au lieu de relancer la page à chaque mouvement du curseur HSA ou de l'écart,
+toute la grille HSA × écart (et, en option, âge) est calculée en un seul
+appel vectoriel : S_AVN / S_PSEU / S_FAIL_FIX / S_SURG (compute_scores_batch)
+et traitement proposé (vigior_decision). La grille est mise en cache par
+patient (une fois par processus) ; changer de score affiché ou de tranche
+d'âge ne fait que relire le cache.
+
+heatmap_figure(grid, ...) trace le score choisi avec le contour de chaque
+zone de traitement et la position actuelle du patient.
+
+Temps de calcul / relecture du cache :
+    python vigior_whatif.py
+"""
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from vigior_decision import propose_treatment, propose_treatment_batch
+from vigior_scoring import SCORE_COLUMNS, compute_scores, compute_scores_batch, flag_one, get_rules
+
+# Bornes des widgets de la page (curseur HSA 60-180°, écart 0-50 mm)
+HSA_RANGE = (60, 180, 1)
+GAP_RANGE = (0, 50, 1)
+AGE_RANGE = (18, 110, 4)
+# Grilles gardées en cache par processus : ~0,2 Mo par grille HSA × écart, ~5 Mo avec le balayage d'âge
+GRID_CACHE_SIZE = 16
+
+
+def _axis(bounds):
+    lo, hi, step = bounds
+    return np.arange(lo, hi + step / 2, step, dtype=float)
+
+
+class SensitivityGrid:
+    """Scores et traitement sur la grille âge × HSA × écart d'un patient (tableaux de forme (âge, HSA, écart))."""
+
+    def __init__(self, ages, hsa, gap, scores, treatment_codes, treatments, rule_codes, rule_ids):
+        self.ages = ages
+        self.hsa = hsa
+        self.gap = gap
+        self.scores = scores
+        self.treatment_codes = treatment_codes
+        self.treatments = treatments
+        self.rule_codes = rule_codes
+        self.rule_ids = rule_ids
+
+    @property
+    def shape(self):
+        return self.treatment_codes.shape
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.scores.values()) + self.treatment_codes.nbytes + self.rule_codes.nbytes
+
+    def age_index(self, age=None):
+        """Tranche d'âge la plus proche (la seule tranche si l'âge n'est pas balayé)."""
+        if age is None or len(self.ages) == 1:
+            return 0
+        return int(np.abs(self.ages - age).argmin())
+
+    def point(self, age, HSA, gap):
+        """Scores et traitement du point de grille le plus proche."""
+        i = self.age_index(age)
+        j = int(np.abs(self.hsa - HSA).argmin())
+        k = int(np.abs(self.gap - gap).argmin())
+        out = {name: float(values[i, j, k]) for name, values in self.scores.items()}
+        out["Treatment"] = self.treatments[self.treatment_codes[i, j, k]]
+        return out
+
+    def frame(self, age=None):
+        """Tranche d'âge au format long (HSA, Gap, scores, Treatment)."""
+        i = self.age_index(age)
+        hsa, gap = np.meshgrid(self.hsa, self.gap, indexing="ij")
+        data = {"HSA": hsa.ravel(), "Gap": gap.ravel()}
+        data.update({name: values[i].ravel() for name, values in self.scores.items()})
+        data["Treatment"] = pd.Categorical.from_codes(self.treatment_codes[i].ravel(), self.treatments)
+        return pd.DataFrame(data)
+
+
+@lru_cache(maxsize=GRID_CACHE_SIZE)
+def _cached_grid(age, tabac, fragments, bone_quality, comorbidities, ages, hsa_range, gap_range, table, lang,
+                 rules_version):
+    # rules_version : seulement dans la clé, une modification de vigior_rules.json invalide les grilles
+    ages = np.asarray(ages, dtype=float) if ages else np.array([age], dtype=float)
+    hsa, gap = _axis(hsa_range), _axis(gap_range)
+    shape = (len(ages), len(hsa), len(gap))
+    A, H, G = (np.broadcast_to(v, shape).ravel() for v in
+               (ages[:, None, None], hsa[None, :, None], gap[None, None, :]))
+    n = A.size
+    fragments = np.full(n, fragments)
+    bone_quality = np.full(n, bone_quality, dtype=object)
+    comorbidities = np.full(n, comorbidities)
+
+    scores = compute_scores_batch(A, tabac, fragments, H, G, bone_quality, comorbidities)
+    decision = propose_treatment_batch(scores["S_AVN"], scores["S_PSEU"], scores["S_FAIL_FIX"], A, fragments, G,
+                                       bone_quality, comorbidities, table=table, lang=lang)
+    treatment = decision["Treatment"].array
+    grid = SensitivityGrid(
+        ages, hsa, gap,
+        {name: scores[name].reshape(shape) for name in SCORE_COLUMNS},
+        np.asarray(treatment.codes).reshape(shape), list(treatment.categories),
+        np.asarray(decision["rule"].array.codes).reshape(shape), list(decision["rule"].array.categories),
+    )
+    # Partagée entre sessions : lecture seule
+    for values in [*grid.scores.values(), grid.treatment_codes, grid.rule_codes]:
+        values.flags.writeable = False
+    return grid
+
+
+def sensitivity_grid(age, tabac, fragments, bone_quality, comorbidities, sweep_age=False,
+                     hsa_range=HSA_RANGE, gap_range=GAP_RANGE, age_range=AGE_RANGE, table="vigior_h", lang="fr"):
+    """
+    Grille HSA × écart (× âge si sweep_age) d'un patient, calculée une seule fois :
+    les appels suivants avec les mêmes caractéristiques (et la même version des règles) relisent le cache.
+    """
+    ages = tuple(_axis(age_range).tolist()) if sweep_age else ()
+    return _cached_grid(int(age), flag_one(tabac), int(fragments), str(bone_quality), int(comorbidities), ages,
+                        tuple(hsa_range), tuple(gap_range), table, lang, get_rules("vigior_h").version)
+
+
+# -----------------------
+# Affichage
+# -----------------------
+def heatmap_figure(grid, score="S_SURG", age=None, patient=None, title=None):
+    """
+    Carte du score (HSA en abscisse, écart en ordonnée) avec le contour de chaque
+    zone de traitement ; patient = (HSA, gap) actuel, marqué d'une croix.
+    """
+    import matplotlib.pyplot as plt
+
+    i = grid.age_index(age)
+    values = grid.scores[score][i].T            # (écart, HSA)
+    codes = grid.treatment_codes[i].T
+    extent = (grid.hsa[0], grid.hsa[-1], grid.gap[0], grid.gap[-1])
+
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    image = ax.imshow(values, origin="lower", aspect="auto", extent=extent, cmap="RdYlGn_r", vmin=0, vmax=100)
+    fig.colorbar(image, ax=ax, label=f"{score} (%)")
+
+    # Une ligne de contour par zone de traitement présente dans la tranche
+    colors = plt.cm.tab10.colors
+    handles = []
+    for code in np.unique(codes):
+        mask = (codes == code).astype(float)
+        color = colors[code % len(colors)]
+        if 0 < mask.mean() < 1:
+            ax.contour(grid.hsa, grid.gap, mask, levels=[0.5], colors=[color], linewidths=2)
+        handles.append(plt.Line2D([], [], color=color, lw=2, label=grid.treatments[code]))
+    if patient is not None:
+        ax.plot(*patient, marker="x", color="black", markersize=12, mew=3)
+    ax.set_xlabel("HSA (°)")
+    ax.set_ylabel("Gap (mm)")
+    if title is None:
+        title = score if len(grid.ages) == 1 else f"{score} — {grid.ages[i]:.0f} ans"
+    ax.set_title(title)
+    ax.legend(handles=handles, loc="upper center", bbox_to_anchor=(0.5, -0.15), fontsize=8, frameon=False)
+    fig.tight_layout()
+    return fig
+
+
+# -----------------------
+# Vérification / benchmark
+# -----------------------
+def verify(grid, tabac, fragments, bone_quality, comorbidities, samples=500, seed=0, lang="fr"):
+    """Compare des points tirés au hasard à compute_scores / propose_treatment (un patient)."""
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for _ in range(samples):
+        i, j, k = (rng.integers(0, n) for n in grid.shape)
+        # Nombres Python comme dans les pages (round() d'un np.float64 n'arrondit pas pareil)
+        age, HSA, gap = grid.ages[i].item(), grid.hsa[j].item(), grid.gap[k].item()
+        expected = compute_scores(age, tabac, fragments, HSA, gap, bone_quality, comorbidities)
+        treatment, _ = propose_treatment(*expected[:3], age, fragments, gap, bone_quality, comorbidities, lang=lang)
+        got = grid.point(age, HSA, gap)
+        if list(expected) != [got[c] for c in SCORE_COLUMNS] or treatment != got["Treatment"]:
+            mismatches += 1
+    return mismatches
+
+
+if __name__ == "__main__":
+    patient = dict(age=72, tabac=True, fragments=3, bone_quality="poor", comorbidities=1)
+    ok = True
+    for sweep_age in (False, True):
+        start = time.perf_counter()
+        grid = sensitivity_grid(**patient, sweep_age=sweep_age)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        sensitivity_grid(**patient, sweep_age=sweep_age)
+        cached = time.perf_counter() - start
+        bad = verify(grid, **{k: v for k, v in patient.items() if k != "age"})
+        ok &= bad == 0
+        print(f"grille {' × '.join(map(str, grid.shape))} ({grid.treatment_codes.size} points, "
+              f"{grid.nbytes / 1024:.0f} Ko) : calcul {first * 1000:.1f} ms, cache {cached * 1e6:.1f} µs, "
+              f"écarts {bad}/500")
+    sys.exit(0 if ok else 1)